@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, ProcessingHistory, SupportTicket, ContactMessage
+from .models import UserProfile, ProcessingHistory, ProcessingJob, SupportTicket, ContactMessage
 
 
 @admin.register(UserProfile)
@@ -21,6 +21,14 @@ class ProcessingHistoryAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('user')
 
 
+@admin.register(ProcessingJob)
+class ProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'operation', 'status', 'user', 'created_at', 'finished_at')
+    list_filter = ('operation', 'status', 'created_at')
+    search_fields = ('id', 'user__username', 'result_filename')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
 @admin.register(SupportTicket)
 class SupportTicketAdmin(admin.ModelAdmin):
     list_display = ('id', 'subject', 'name', 'email', 'category', 'status', 'priority', 'created_at')
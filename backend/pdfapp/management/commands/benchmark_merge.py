@@ -0,0 +1,78 @@
+import os
+import time
+
+import fitz
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from pdfapp.utils.pdf_helpers import PDFProcessor
+from pdfapp.utils.streaming import file_size
+
+
+MERGE_ENGINES = ('pypdf', 'fitz')
+
+
+def _sample_pdf(pages):
+    """Statement-like PDF: columns of figures on every page and a logo image shared by all pages"""
+    doc = fitz.open()
+    logo = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 400, 200), False)
+    logo.set_rect(logo.irect, (20, 60, 140))
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_image(fitz.Rect(36, 36, 236, 136), pixmap=logo)
+        for line in range(45):
+            page.insert_text((36, 170 + line * 14), f'{page_num:04d}-{line:02d}  Transaction  {line * 13.7:>10.2f}',
+                             fontname='cour')
+    data = doc.tobytes(garbage=3, deflate=True)
+    doc.close()
+    return data
+
+
+class Command(BaseCommand):
+    help = 'Time the pypdf and PyMuPDF merge engines on the same inputs and recommend PDF_MERGE_ENGINE'
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='*', help='PDF files to merge (generated samples when omitted)')
+        parser.add_argument('--copies', type=int, default=30, help='Number of generated inputs')
+        parser.add_argument('--pages', type=int, default=40, help='Pages per generated input')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per engine (the fastest counts)')
+
+    def handle(self, *args, **options):
+        if options['files']:
+            paths = options['files']
+            temp_paths = []
+        else:
+            import tempfile
+
+            data = _sample_pdf(options['pages'])
+            temp_paths = []
+            for _ in range(options['copies']):
+                fd, path = tempfile.mkstemp(suffix='.pdf')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                temp_paths.append(path)
+            paths = temp_paths
+
+        try:
+            results = {}
+            for engine in MERGE_ENGINES:
+                timings = []
+                for _ in range(options['repeat']):
+                    files = [File(open(path, 'rb'), name=os.path.basename(path)) for path in paths]
+                    try:
+                        started = time.perf_counter()
+                        output = PDFProcessor.merge_pdfs(files, engine=engine)
+                        timings.append(time.perf_counter() - started)
+                        size = file_size(output)
+                        output.close()
+                    finally:
+                        for f in files:
+                            f.close()
+                results[engine] = (min(timings), size)
+                self.stdout.write(f'{engine:>6}: {min(timings):.2f}s, {size / (1024 * 1024):.1f} MB')
+        finally:
+            for path in temp_paths:
+                os.unlink(path)
+
+        fastest = min(results, key=lambda engine: results[engine][0])
+        self.stdout.write(self.style.SUCCESS(f'Recommended: PDF_MERGE_ENGINE={fastest}'))
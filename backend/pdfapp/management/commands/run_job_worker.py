@@ -0,0 +1,31 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from pdfapp.utils.job_queue import process_pending_jobs
+
+
+class Command(BaseCommand):
+    help = 'Run a dedicated worker process for queued PDF jobs (?async=1 requests)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit')
+        parser.add_argument(
+            '--poll-interval', type=float,
+            default=getattr(settings, 'JOB_POLL_INTERVAL_SECONDS', 5),
+            help='Seconds to wait between queue checks when idle'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write('PDF job worker started')
+        while True:
+            close_old_connections()
+            processed = process_pending_jobs()
+            if processed:
+                self.stdout.write(f'Processed {processed} job(s)')
+            if options['once']:
+                break
+            if not processed:
+                time.sleep(options['poll_interval'])
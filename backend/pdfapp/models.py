@@ -105,6 +105,46 @@ class ProcessingHistory(models.Model):
         return f"{self.user.username} - {self.get_operation_display()} - {self.filename}"
 
 
+class ProcessingJob(models.Model):
+    """Background PDF operation queued through an endpoint's async mode"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    operation = models.CharField(max_length=50)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    params = models.JSONField(default=dict, blank=True)
+    input_files = models.JSONField(default=list, blank=True)  # [{'path': ..., 'name': ...}]
+
+    # Result file (stored under MEDIA_ROOT/temp so it expires with other temp files)
+    result_path = models.CharField(max_length=500, blank=True)
+    result_filename = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=100, default='application/pdf')
+    error_message = models.TextField(blank=True)
+
+    # Owner - authenticated user or anonymous session
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    session_key = models.CharField(max_length=100, blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.operation} job {self.id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+
 class SupportTicket(models.Model):
     CATEGORY_CHOICES = [
         ('general', 'General Questions'),
@@ -9,6 +9,7 @@ urlpatterns = [
     path('merge/', views.MergePDFView.as_view(), name='merge-pdf'),
     path('split/', views.SplitPDFView.as_view(), name='split-pdf'),
     path('compress/', views.CompressPDFView.as_view(), name='compress-pdf'),
+    path('compress/estimate/', views.CompressEstimateView.as_view(), name='compress-estimate'),
     path('convert/pdf-to-img/', views.PDFToImageView.as_view(), name='pdf-to-image'),
     path('convert/img-to-pdf/', views.ImageToPDFView.as_view(), name='image-to-pdf'),
     path('convert/docx-to-pdf/', views.DOCXToPDFView.as_view(), name='docx-to-pdf'),
@@ -17,6 +18,8 @@ urlpatterns = [
     path('rotate/', views.RotateView.as_view(), name='rotate'),
     path('secure/', views.SecurePDFView.as_view(), name='secure-pdf'),
     path('unlock/', views.UnlockPDFView.as_view(), name='unlock-pdf'),
+    path('pipeline/', views.PipelineView.as_view(), name='pipeline'),
+    path('batch/<str:operation>/', views.BatchView.as_view(), name='batch'),
     
     # Advanced Document Conversions
     path('convert/pdf-to-word/', views.PDFToWordView.as_view(), name='pdf-to-word'),
@@ -29,6 +32,16 @@ urlpatterns = [
     # PDF Organization
     path('organize/', views.OrganizePDFView.as_view(), name='organize-pdf'),
     path('preview/', views.PDFPreviewView.as_view(), name='pdf-preview'),
+    path('preview/sessions/', views.PreviewSessionView.as_view(), name='preview-session'),
+    path('preview/sessions/<uuid:session_id>/pages/<int:page>/', views.PreviewPageView.as_view(), name='preview-page'),
+    
+    # Upload-once documents (pass document_id in place of a file)
+    path('documents/', views.DocumentUploadView.as_view(), name='document-upload'),
+    path('documents/<uuid:document_id>/', views.DocumentDetailView.as_view(), name='document-detail'),
+    
+    # Background jobs (?async=1)
+    path('jobs/<uuid:job_id>/', views.JobStatusView.as_view(), name='job-status'),
+    path('jobs/<uuid:job_id>/result/', views.JobResultView.as_view(), name='job-result'),
     
     # Support System
     path('support/contact/', views.ContactView.as_view(), name='contact'),
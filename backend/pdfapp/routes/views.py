@@ -3,17 +3,27 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser
-from django.http import HttpResponse
+from rest_framework.exceptions import APIException
+from django.http import HttpResponse, FileResponse
 from django.core.files.uploadedfile import InMemoryUploadedFile
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
+from django.urls import reverse
 import time
-from io import BytesIO
 import zipfile
 
-from pdfapp.utils.pdf_helpers import PDFProcessor, DocumentConverter
-from pdfapp.models import ProcessingHistory
-from pdfapp.utils.usage_tracking import check_usage_limit, increment_usage_count, get_usage_info
+from pdfapp.utils.pdf_helpers import PDFProcessor, DocumentConverter, PDFPipeline, PIPELINE_STEPS, COMPRESSION_MODES, NUMPY_AVAILABLE
+from pdfapp.models import ProcessingHistory, ProcessingJob
+from pdfapp.utils.usage_tracking import check_usage_limit, increment_usage_count, get_usage_info, get_or_create_session_id
+from pdfapp.utils.job_queue import enqueue_job
+from pdfapp.utils.executor import run_pdf_task
+from pdfapp.utils.operations import run_batch, BATCH_OPERATIONS
+from pdfapp.utils.preflight import preflight_pdfs, preflight_error
+from pdfapp.utils.profiler import profile_pdf, profile_header
+from pdfapp.utils.size_estimate import parse_size, compress_to_target, estimate_presets
+from pdfapp.utils.streaming import file_streaming_response, spool_zip
+from pdfapp.utils.result_cache import result_cache, request_cache_key, CACHED_HEADERS
+from pdfapp.utils.document_store import store_document, get_document, delete_document, document_ttl_seconds
 
 
 class HealthCheckView(APIView):
@@ -45,11 +55,107 @@ class HealthCheckView(APIView):
         })
 
 
+class RejectedUpload(APIException):
+    status_code = 400
+    default_code = 'invalid_file'
+
+
 @method_decorator(csrf_exempt, name='dispatch')
 class BasePDFView(APIView):
     """Base class for PDF processing views"""
     permission_classes = []  # Disable authentication
     parser_classes = [MultiPartParser, FormParser]
+    cache_results = True  # Serve repeated identical requests from the result cache
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == 'POST':
+            self.resolve_document_handles(request)
+            self.check_rejected_uploads(request)
+            if self.cache_results and result_cache.enabled:
+                self.post = self.cached_handler(self.post)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        for stored_file in getattr(self, 'stored_files', []):
+            stored_file.close()
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def resolve_document_handles(self, request):
+        """Let any file field carry a handle from /documents/ instead of an upload"""
+        from django.core.files import File
+
+        self.stored_files = []
+        if not hasattr(request.data, 'lists'):
+            return
+
+        for field, values in list(request.data.lists()):
+            if field in request.FILES or not all(isinstance(value, str) for value in values):
+                continue
+            documents = [get_document(value.strip()) for value in values]
+            if not documents or not all(documents):
+                continue
+            for data_path, metadata in documents:
+                stored_file = File(open(data_path, 'rb'), name=metadata['name'])
+                stored_file.sha256 = metadata.get('sha256')
+                request.FILES.appendlist(field, stored_file)
+                self.stored_files.append(stored_file)
+
+    def check_rejected_uploads(self, request):
+        """Refuse the request if the upload handler skipped a file whose content did not match its type"""
+        rejected = getattr(request, 'rejected_uploads', None)
+        if rejected:
+            raise RejectedUpload({
+                'error': f'File content does not match its type: {", ".join(rejected)}'
+            })
+
+    def cached_handler(self, handler):
+        """Wrap a POST handler with the content-addressed result cache"""
+        def cached_post(request, *args, **kwargs):
+            if self.wants_async(request):
+                return handler(request, *args, **kwargs)
+
+            try:
+                cache_key = request_cache_key(request, self.__class__.__name__)
+            except Exception as e:
+                print(f"Result cache key error: {e}")
+                return handler(request, *args, **kwargs)
+
+            cached = result_cache.get(cache_key)
+            if cached:
+                limit_check = self.check_user_limits(request)
+                if limit_check:
+                    return limit_check
+
+                data_path, metadata = cached
+                response = FileResponse(open(data_path, 'rb'), content_type=metadata['content_type'])
+                for header, value in metadata['headers'].items():
+                    response[header] = value
+                response['X-File-Size'] = str(data_path.stat().st_size)
+                response['X-Cache'] = 'HIT'
+                self.log_operation(request, metadata['operation'], metadata.get('filename', 'processed_file'))
+                return response
+
+            self.logged_operation = None
+            response = handler(request, *args, **kwargs)
+            # Only file-backed responses are stored; on-the-fly zip streams cannot be replayed
+            if (isinstance(response, FileResponse) and response.file_to_stream is not None
+                    and response.status_code == 200 and response.has_header('Content-Disposition')):
+                result_cache.put(cache_key, response.file_to_stream, {
+                    'operation': self.logged_operation or self.__class__.__name__,
+                    'content_type': response['Content-Type'],
+                    'headers': {header: response[header] for header in self.cached_headers(response)},
+                })
+                response['X-Cache'] = 'MISS'
+            return response
+
+        return cached_post
+
+    def cached_headers(self, response):
+        """Headers replayed on a cache hit: Content-Disposition plus the view's X- headers"""
+        return [
+            header for header, _ in response.items()
+            if header in CACHED_HEADERS or (header.startswith('X-') and header != 'X-File-Size')
+        ]
 
     def check_user_limits(self, request):
         """Check if user can perform operation"""
@@ -66,8 +172,12 @@ class BasePDFView(APIView):
         
         return None
 
-    def log_operation(self, request, operation, filename='processed_file', file_size=0, processing_time=0, success=True):
+    def log_operation(self, request, operation, filename='processed_file', file_size=0, processing_time=0, success=True,
+                      error_message=None):
         """Log processing operation"""
+        self.logged_operation = operation
+        if not success:
+            print(f"{operation} failed after {processing_time:.2f}s: {error_message}")
         try:
             increment_usage_count(request, operation)
         except Exception as e:
@@ -77,14 +187,31 @@ class BasePDFView(APIView):
             traceback.print_exc()
             pass
 
+    def wants_async(self, request):
+        """Check whether the client asked for background processing (?async=1)"""
+        value = request.query_params.get('async') or request.data.get('async')
+        return str(value).lower() in ('1', 'true', 'yes')
+
+    def enqueue_operation(self, request, operation, files, params=None):
+        """Queue an operation as a background job and return its job ID"""
+        job = enqueue_job(
+            operation, files, params,
+            user=request.user,
+            session_key=get_or_create_session_id(request)
+        )
+        self.log_operation(request, operation, files[0].name if files else 'processed_file',
+                           sum(file.size for file in files))
+
+        return Response({
+            'job_id': str(job.id),
+            'status': job.status,
+            'status_url': request.build_absolute_uri(f'/api/pdf/jobs/{job.id}/'),
+            'result_url': request.build_absolute_uri(f'/api/pdf/jobs/{job.id}/result/'),
+        }, status=202)
+
     def create_response(self, output, filename, content_type='application/pdf'):
-        """Create HTTP response with file"""
-        output.seek(0)  # Ensure pointer is at the beginning
-        file_content = output.read()
-        response = HttpResponse(file_content, content_type=content_type)
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        response['X-File-Size'] = str(len(file_content))  # Add actual file size header
-        return response
+        """Create HTTP response that streams the output file without copying it"""
+        return file_streaming_response(output, filename, content_type)
 
 
 class MergePDFView(BasePDFView):
@@ -150,8 +277,16 @@ class MergePDFView(BasePDFView):
                         'error': f'File at position {i+1} ({file.name}) is not a PDF file'
                     }, status=400)
 
+            # Check every input concurrently before any merge work starts
+            inputs_ok, preflight_report = preflight_pdfs(ordered_files)
+            if not inputs_ok:
+                return Response({'error': preflight_error(preflight_report), 'files': preflight_report}, status=400)
+
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'merge', ordered_files)
+
             # Process merge with ordered files
-            output = PDFProcessor.merge_pdfs(ordered_files)
+            output = run_pdf_task(PDFProcessor.merge_pdfs, ordered_files)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
             
@@ -218,13 +353,18 @@ class SplitPDFView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'Only PDF files are allowed'}, status=400)
 
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'split', [pdf_file], {
+                    'split_type': split_type, 'split_value': split_value
+                })
+
             # Process split
-            outputs = PDFProcessor.split_pdf(pdf_file, split_type, split_value)
-            processing_time = time.time() - start_time
+            outputs = run_pdf_task(PDFProcessor.split_pdf, pdf_file, split_type, split_value)
 
             if len(outputs) == 1:
                 # Single output file
                 outputs[0].seek(0)  # Reset pointer before creating response
+                processing_time = time.time() - start_time
                 self.log_operation(
                     request, 'split', pdf_file.name, 
                     pdf_file.size, processing_time
@@ -233,26 +373,16 @@ class SplitPDFView(BasePDFView):
                 return self.create_response(outputs[0], f'split_{pdf_file.name}')
             
             else:
-                # Multiple output files - create zip
-                zip_buffer = BytesIO()
-                with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                    for i, output in enumerate(outputs):
-                        output.seek(0)  # Reset pointer before reading
-                        zip_file.writestr(f'page_{i+1}.pdf', output.read())
-                
-                zip_buffer.seek(0)
-                
+                # Multiple output files - zipped into a spooled file before the response starts
+                archive = spool_zip((f'page_{i + 1}.pdf', output) for i, output in enumerate(outputs))
+                processing_time = time.time() - start_time
                 self.log_operation(
                     request, 'split', pdf_file.name, 
                     pdf_file.size, processing_time
                 )
                 # increment_daily_count(request.user)  # Disabled
                 
-                return self.create_response(
-                    zip_buffer, 
-                    f'split_{pdf_file.name}.zip', 
-                    'application/zip'
-                )
+                return self.create_response(archive, f'split_{pdf_file.name}.zip', 'application/zip')
 
         except Exception as e:
             processing_time = time.time() - start_time
@@ -273,7 +403,8 @@ class CompressPDFView(BasePDFView):
         
         try:
             pdf_file = request.FILES.get('file')
-            quality = request.data.get('quality', 'medium')  # 'low', 'medium', 'high'
+            quality = request.data.get('quality', 'medium')  # 'low', 'medium', 'high', 'lossless'
+            mode = request.data.get('mode', 'auto')  # 'auto', 'images', 'rasterize', 'mrc', 'basic'
 
             if not pdf_file:
                 return Response({'error': 'PDF file is required'}, status=400)
@@ -281,8 +412,36 @@ class CompressPDFView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'Only PDF files are allowed'}, status=400)
 
-            # Process compression
-            output = PDFProcessor.compress_pdf(pdf_file, quality)
+            if mode not in COMPRESSION_MODES:
+                return Response({'error': f'Invalid compression mode: {mode}'}, status=400)
+
+            if mode == 'mrc' and quality != 'lossless' and not NUMPY_AVAILABLE:
+                return Response({'error': 'MRC compression is not available on this server (numpy is not installed)'}, status=400)
+
+            target_size = request.data.get('target_size')  # e.g. '2MB', 'under 500 KB'
+            if target_size:
+                try:
+                    target_bytes = parse_size(target_size)
+                except ValueError as e:
+                    return Response({'error': str(e)}, status=400)
+
+            if self.wants_async(request):
+                params = {'quality': quality, 'mode': mode}
+                if target_size:
+                    params['target_size'] = target_size
+                return self.enqueue_operation(request, 'compress', [pdf_file], params)
+
+            profile = target = None
+            if target_size:
+                # Settings are chosen from sampled pages; the file is compressed once
+                output, target = compress_to_target(pdf_file, target_bytes)
+            else:
+                # Profile first so the chosen strategy can be reported (lossless has only one)
+                profile = run_pdf_task(profile_pdf, pdf_file) if mode == 'auto' and quality != 'lossless' else None
+
+                # Process compression
+                # Compression fans out over the process pool page by page
+                output = PDFProcessor.compress_pdf(pdf_file, quality, mode, profile)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
 
@@ -292,7 +451,23 @@ class CompressPDFView(BasePDFView):
             )
             # increment_daily_count(request.user)  # Disabled
 
-            return self.create_response(output, f'compressed_{pdf_file.name}')
+            response = self.create_response(output, f'compressed_{pdf_file.name}')
+            if target:
+                response['X-Compression-Strategy'] = target['strategy']
+                response['X-Compression-Target'] = profile_header(target)
+            else:
+                if quality == 'lossless':
+                    response['X-Compression-Strategy'] = 'lossless'
+                else:
+                    response['X-Compression-Strategy'] = profile['strategy'] if profile else mode
+                if profile:
+                    response['X-Compression-Profile'] = profile_header(profile)
+
+            # Bytes saved per font by the lossless font stage (largest savings first)
+            font_savings = [entry for entry in getattr(output, 'font_report', []) if entry['saved_bytes'] > 0]
+            if font_savings:
+                response['X-Font-Savings'] = profile_header({entry['font']: entry['saved_bytes'] for entry in font_savings[:20]})
+            return response
 
         except Exception as e:
             processing_time = time.time() - start_time
@@ -303,6 +478,25 @@ class CompressPDFView(BasePDFView):
             return Response({'error': str(e)}, status=500)
 
 
+class CompressEstimateView(BasePDFView):
+    """Predict output size and processing time of each compression quality from sampled pages"""
+    cache_results = False
+
+    def post(self, request):
+        pdf_file = request.FILES.get('file')
+        if not pdf_file:
+            return Response({'error': 'PDF file is required'}, status=400)
+
+        if not pdf_file.name.lower().endswith('.pdf'):
+            return Response({'error': 'Only PDF files are allowed'}, status=400)
+
+        try:
+            # An estimate is not an operation, so it does not count against usage limits
+            return Response(estimate_presets(pdf_file))
+        except Exception as e:
+            return Response({'error': f'Could not estimate compression: {str(e)}'}, status=400)
+
+
 class PDFToImageView(BasePDFView):
     def post(self, request):
         limit_check = self.check_user_limits(request)
@@ -325,8 +519,16 @@ class PDFToImageView(BasePDFView):
             if image_format not in ['PNG', 'JPG', 'JPEG']:
                 return Response({'error': 'Supported formats: PNG, JPG'}, status=400)
 
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'pdf_to_img', [pdf_file], {
+                    'format': image_format, 'dpi': dpi
+                })
+
             # Process conversion
-            output = PDFProcessor.pdf_to_images(pdf_file, image_format, dpi)
+            # Rendering fans out over the process pool page by page and each
+            # page is zipped as soon as it is ready; images are already
+            # compressed, so they are stored as-is
+            archive = spool_zip(PDFProcessor.page_images(pdf_file, image_format, dpi), zipfile.ZIP_STORED)
             processing_time = time.time() - start_time
 
             self.log_operation(
@@ -336,9 +538,7 @@ class PDFToImageView(BasePDFView):
             # increment_daily_count(request.user)  # Disabled
 
             return self.create_response(
-                output, 
-                f'{pdf_file.name.rsplit(".", 1)[0]}_images.zip', 
-                'application/zip'
+                archive, f'{pdf_file.name.rsplit(".", 1)[0]}_images.zip', 'application/zip'
             )
 
         except Exception as e:
@@ -379,7 +579,7 @@ class ImageToPDFView(BasePDFView):
                     return Response({'error': 'Only image files are allowed'}, status=400)
 
             # Process conversion with rotations
-            output = PDFProcessor.images_to_pdf(image_files, rotations)
+            output = run_pdf_task(PDFProcessor.images_to_pdf, image_files, rotations)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
 
@@ -419,7 +619,7 @@ class DOCXToPDFView(BasePDFView):
                 return Response({'error': 'Only DOCX files are allowed'}, status=400)
 
             # Process conversion
-            output = DocumentConverter.docx_to_pdf(docx_file)
+            output = run_pdf_task(DocumentConverter.docx_to_pdf, docx_file)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
 
@@ -461,8 +661,11 @@ class ExtractTextView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'Only PDF files are allowed'}, status=400)
 
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'extract_text', [pdf_file])
+
             # Extract text
-            text_content = PDFProcessor.extract_text(pdf_file)
+            text_content = run_pdf_task(PDFProcessor.extract_text, pdf_file)
             processing_time = time.time() - start_time
 
             self.log_operation(
@@ -516,7 +719,15 @@ class WatermarkView(BasePDFView):
                 color = request.data.get('color', 'gray')
                 rotation = int(request.data.get('rotation', 0))
                 
-                output = PDFProcessor.add_watermark(
+                if self.wants_async(request):
+                    return self.enqueue_operation(request, 'watermark', [pdf_file], {
+                        'type': 'text', 'text': watermark_text, 'position': position,
+                        'opacity': opacity, 'font_size': font_size, 'color': color,
+                        'rotation': rotation, 'x_offset': x_offset, 'y_offset': y_offset
+                    })
+                
+                output = run_pdf_task(
+                    PDFProcessor.add_watermark,
                     pdf_file, watermark_text, position, opacity, 
                     font_size, color, rotation, x_offset, y_offset
                 )
@@ -528,7 +739,14 @@ class WatermarkView(BasePDFView):
                 
                 scale = float(request.data.get('scale', 1.0))
                 
-                output = PDFProcessor.add_image_watermark(
+                if self.wants_async(request):
+                    return self.enqueue_operation(request, 'watermark', [pdf_file, image_file], {
+                        'type': 'image', 'position': position, 'opacity': opacity,
+                        'scale': scale, 'x_offset': x_offset, 'y_offset': y_offset
+                    })
+                
+                output = run_pdf_task(
+                    PDFProcessor.add_image_watermark,
                     pdf_file, image_file, position, opacity, 
                     scale, x_offset, y_offset
                 )
@@ -594,28 +812,14 @@ class RotateView(BasePDFView):
                 total_pages = len(reader.pages)
                 pdf_file.seek(0)  # Reset for later use
                 
-                if pages_str == 'all':
-                    # Apply rotation to all pages
-                    rotations = {i: angle for i in range(1, total_pages + 1)}
-                else:
-                    # Parse specific pages (e.g., "1,3,5" or "1-5")
-                    page_numbers = []
-                    for part in pages_str.split(','):
-                        part = part.strip()
-                        if '-' in part:
-                            # Handle range like "1-5"
-                            start, end = part.split('-', 1)
-                            start, end = int(start.strip()), int(end.strip())
-                            page_numbers.extend(range(start, end + 1))
-                        else:
-                            # Handle single page
-                            page_numbers.append(int(part))
-                    
-                    # Apply rotation to specified pages
-                    rotations = {page: angle for page in page_numbers if 1 <= page <= total_pages}
+                # Parse 'all' or specific pages (e.g., "1,3,5" or "1-5")
+                rotations = PDFProcessor.rotations_for_pages(pages_str, angle, total_pages)
+
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'rotate', [pdf_file], {'rotations': rotations})
 
             # Rotate pages
-            output = PDFProcessor.rotate_pages(pdf_file, rotations)
+            output = run_pdf_task(PDFProcessor.rotate_pages, pdf_file, rotations)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
 
@@ -659,8 +863,13 @@ class SecurePDFView(BasePDFView):
             if not user_password:
                 return Response({'error': 'Password is required'}, status=400)
 
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'secure', [pdf_file], {
+                    'user_password': user_password, 'owner_password': owner_password
+                })
+
             # Secure PDF
-            output = PDFProcessor.secure_pdf(pdf_file, user_password, owner_password)
+            output = run_pdf_task(PDFProcessor.secure_pdf, pdf_file, user_password, owner_password)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
 
@@ -682,6 +891,8 @@ class SecurePDFView(BasePDFView):
 
 
 class UnlockPDFView(BasePDFView):
+    cache_results = False  # Never keep decrypted copies on disk
+
     def post(self, request):
         limit_check = self.check_user_limits(request)
         if limit_check:
@@ -703,7 +914,7 @@ class UnlockPDFView(BasePDFView):
                 return Response({'error': 'Password is required'}, status=400)
 
             # Unlock PDF
-            output = PDFProcessor.unlock_pdf(pdf_file, password)
+            output = run_pdf_task(PDFProcessor.unlock_pdf, pdf_file, password)
             output.seek(0)  # Ensure pointer is at start
             processing_time = time.time() - start_time
 
@@ -750,8 +961,11 @@ class PDFToWordView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'File must be a PDF'}, status=400)
             
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'pdf_to_word', [pdf_file])
+            
             # Convert PDF to DOCX
-            output = DocumentConverter.pdf_to_docx(pdf_file)
+            output = run_pdf_task(DocumentConverter.pdf_to_docx, pdf_file)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -800,7 +1014,7 @@ class WordToPDFView(BasePDFView):
                 return Response({'error': 'File must be a DOCX document'}, status=400)
             
             # Convert DOCX to PDF
-            output = DocumentConverter.docx_to_pdf(docx_file)
+            output = run_pdf_task(DocumentConverter.docx_to_pdf, docx_file)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -845,8 +1059,11 @@ class PDFToPowerPointView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'File must be a PDF'}, status=400)
             
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'pdf_to_powerpoint', [pdf_file])
+            
             # Convert PDF to PPTX
-            output = DocumentConverter.pdf_to_pptx(pdf_file)
+            output = run_pdf_task(DocumentConverter.pdf_to_pptx, pdf_file)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -895,7 +1112,7 @@ class PowerPointToPDFView(BasePDFView):
                 return Response({'error': 'File must be a PPTX presentation'}, status=400)
             
             # Convert PPTX to PDF
-            output = DocumentConverter.pptx_to_pdf(pptx_file)
+            output = run_pdf_task(DocumentConverter.pptx_to_pdf, pptx_file)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -940,8 +1157,11 @@ class PDFToExcelView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'File must be a PDF'}, status=400)
             
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'pdf_to_excel', [pdf_file])
+            
             # Convert PDF to Excel
-            output = DocumentConverter.pdf_to_excel(pdf_file)
+            output = run_pdf_task(DocumentConverter.pdf_to_excel, pdf_file)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -990,7 +1210,7 @@ class ExcelToPDFView(BasePDFView):
                 return Response({'error': 'File must be an Excel document (.xlsx or .xls)'}, status=400)
             
             # Convert Excel to PDF
-            output = DocumentConverter.excel_to_pdf(excel_file)
+            output = run_pdf_task(DocumentConverter.excel_to_pdf, excel_file)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -1053,8 +1273,13 @@ class OrganizePDFView(BasePDFView):
                 else:
                     return Response({'error': 'Page order required for manual operation'}, status=400)
             
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'organize', [pdf_file], {
+                    'operation': operation, 'page_order': page_order
+                })
+            
             # Organize PDF
-            output = PDFOrganizer.organize_pdf(pdf_file, operation, page_order)
+            output = run_pdf_task(PDFOrganizer.organize_pdf, pdf_file, operation, page_order)
             
             processing_time = time.time() - start_time
             self.log_operation(
@@ -1082,7 +1307,204 @@ class OrganizePDFView(BasePDFView):
             return Response({'error': str(e)}, status=500)
 
 
+class PipelineView(BasePDFView):
+    """Run several operations on one document, parsing and serializing it only once"""
+
+    def post(self, request):
+        limit_check = self.check_user_limits(request)
+        if limit_check:
+            return limit_check
+
+        start_time = time.time()
+        pdf_files = []
+        
+        try:
+            import json
+
+            pdf_files = request.FILES.getlist('files') or request.FILES.getlist('file')
+            watermark_image = request.FILES.get('watermark_image')
+
+            if not pdf_files:
+                return Response({'error': 'PDF file is required'}, status=400)
+
+            for i, pdf_file in enumerate(pdf_files):
+                if not pdf_file.name.lower().endswith('.pdf'):
+                    return Response({
+                        'error': f'File at position {i+1} ({pdf_file.name}) is not a PDF file'
+                    }, status=400)
+
+            try:
+                steps = json.loads(request.data.get('steps') or '[]')
+            except json.JSONDecodeError:
+                return Response({'error': 'Invalid steps format'}, status=400)
+
+            if not isinstance(steps, list) or not steps or not all(isinstance(step, dict) for step in steps):
+                return Response({'error': 'steps must be a non-empty JSON list of step objects'}, status=400)
+
+            unknown = [step.get('step') for step in steps if step.get('step') not in PIPELINE_STEPS]
+            if unknown:
+                return Response({
+                    'error': f'Unknown pipeline step: {unknown[0]}',
+                    'allowed_steps': list(PIPELINE_STEPS)
+                }, status=400)
+
+            if self.wants_async(request):
+                files = pdf_files + ([watermark_image] if watermark_image else [])
+                return self.enqueue_operation(request, 'pipeline', files, {
+                    'steps': steps, 'watermark_image': bool(watermark_image)
+                })
+
+            output = run_pdf_task(PDFPipeline.run, pdf_files, steps, watermark_image)
+            processing_time = time.time() - start_time
+
+            self.log_operation(
+                request, 'pipeline', pdf_files[0].name,
+                sum(pdf_file.size for pdf_file in pdf_files), processing_time
+            )
+
+            return self.create_response(output, f'processed_{pdf_files[0].name}')
+
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
+
+class BatchView(BasePDFView):
+    """Apply one operation with shared parameters to many PDFs and return a single zip"""
+    cache_results = False
+
+    def batch_params(self, request, operation):
+        """Shared parameters for the operation, parsed like the single-file views"""
+        import json
+
+        data = request.data
+        if operation == 'compress':
+            params = {'quality': data.get('quality', 'medium'), 'mode': data.get('mode', 'auto')}
+            if data.get('target_size'):
+                parse_size(data['target_size'])  # Reject bad sizes before any file is processed
+                params['target_size'] = data['target_size']
+            return params
+
+        if operation == 'rotate':
+            if data.get('rotations'):
+                return {'rotations': json.loads(data['rotations'])}
+            return {'pages': data.get('pages', 'all'), 'angle': int(data.get('angle', 90))}
+
+        if operation == 'watermark':
+            params = {
+                'type': data.get('type', 'text'), 'position': data.get('position', 'center'),
+                'opacity': float(data.get('opacity', 0.3)),
+                'x_offset': int(data.get('x_offset', 0)), 'y_offset': int(data.get('y_offset', 0)),
+            }
+            if params['type'] == 'image':
+                if not request.FILES.get('watermark_image'):
+                    raise ValueError('Watermark image file is required')
+                params['scale'] = float(data.get('scale', 1.0))
+            elif params['type'] == 'text':
+                params.update({
+                    'text': data.get('text', 'WATERMARK'), 'font_size': int(data.get('font_size', 36)),
+                    'color': data.get('color', 'gray'), 'rotation': int(data.get('rotation', 0)),
+                })
+            else:
+                raise ValueError('Invalid watermark type. Use "text" or "image"')
+            return params
+
+        if operation == 'secure':
+            user_password = data.get('user_password') or data.get('password')
+            if not user_password:
+                raise ValueError('Password is required')
+            return {'user_password': user_password, 'owner_password': data.get('owner_password')}
+
+        # pdf_to_img
+        image_format = data.get('format', 'PNG').upper()
+        if image_format not in ['PNG', 'JPG', 'JPEG']:
+            raise ValueError('Supported formats: PNG, JPG')
+        return {'format': image_format, 'dpi': int(data.get('dpi', 200))}
+
+    def post(self, request, operation):
+        from django.conf import settings
+
+        if operation not in BATCH_OPERATIONS:
+            return Response({
+                'error': f'Operation not available in batch mode: {operation}',
+                'allowed_operations': list(BATCH_OPERATIONS)
+            }, status=404)
+
+        limit_check = self.check_user_limits(request)
+        if limit_check:
+            return limit_check
+
+        start_time = time.time()
+        
+        try:
+            pdf_files = request.FILES.getlist('files')
+            max_files = getattr(settings, 'BATCH_MAX_FILES', 250)
+
+            if not pdf_files:
+                return Response({'error': 'At least one PDF file is required'}, status=400)
+
+            if len(pdf_files) > max_files:
+                return Response({'error': f'A batch can contain at most {max_files} files'}, status=400)
+
+            for i, pdf_file in enumerate(pdf_files):
+                if not pdf_file.name.lower().endswith('.pdf'):
+                    return Response({
+                        'error': f'File at position {i+1} ({pdf_file.name}) is not a PDF file'
+                    }, status=400)
+
+            try:
+                params = self.batch_params(request, operation)
+            except (ValueError, TypeError) as e:
+                return Response({'error': str(e)}, status=400)
+
+            watermark_image = request.FILES.get('watermark_image') if params.get('type') == 'image' else None
+            shared_files = [watermark_image] if watermark_image else []
+
+            if self.wants_async(request):
+                return self.enqueue_operation(request, 'batch', pdf_files + shared_files, {
+                    'operation': operation, 'params': params, 'watermark_image': bool(watermark_image)
+                })
+
+            archive, manifest = run_batch(operation, pdf_files, params, shared_files)
+            succeeded = sum(1 for item in manifest if item['status'] == 'success')
+            processing_time = time.time() - start_time
+
+            if not succeeded:
+                archive.close()
+                return Response({'error': 'None of the files could be processed', 'files': manifest}, status=400)
+
+            # One usage entry for the whole batch
+            self.log_operation(
+                request, f'batch_{operation}', f'{len(pdf_files)}_files',
+                sum(pdf_file.size for pdf_file in pdf_files), processing_time
+            )
+
+            response = FileResponse(
+                archive, as_attachment=True, filename=f'batch_{operation}.zip', content_type='application/zip'
+            )
+            response['X-Batch-Succeeded'] = str(succeeded)
+            response['X-Batch-Failed'] = str(len(manifest) - succeeded)
+            return response
+
+        except Exception as e:
+            return Response({'error': str(e)}, status=500)
+
+
 class PDFPreviewView(BasePDFView):
+    """Deprecated: returns every page as a base64 PNG in one response
+    Use PreviewSessionView and PreviewPageView instead. Documents over
+    PREVIEW_MAX_PAGES pages are refused rather than rendered whole.
+    """
+    cache_results = False
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        response['Deprecation'] = 'true'
+        response['Link'] = f'<{reverse("preview-session")}>; rel="successor-version"'
+        return response
+
     def post(self, request):
         start_time = time.time()
         pdf_file = None
@@ -1095,8 +1517,14 @@ class PDFPreviewView(BasePDFView):
             if not pdf_file.name.lower().endswith('.pdf'):
                 return Response({'error': 'File must be a PDF'}, status=400)
             
+            max_pages = getattr(settings, 'PREVIEW_MAX_PAGES', 50)
+            if run_pdf_task(PDFProcessor.page_count, pdf_file) > max_pages:
+                return Response({
+                    'error': f'Previews of more than {max_pages} pages are only available through /preview/sessions/'
+                }, status=400)
+
             # Generate preview images for all pages
-            preview_urls = PDFProcessor.generate_preview_images(pdf_file)
+            preview_urls = run_pdf_task(PDFProcessor.generate_preview_images, pdf_file)
             
             processing_time = time.time() - start_time
             # Preview operations should NOT count against usage limits
@@ -1114,6 +1542,217 @@ class PDFPreviewView(BasePDFView):
             return Response({'error': str(e)}, status=500)
 
 
+class DocumentUploadView(BasePDFView):
+    """Store a PDF once and return a handle usable in place of the file on every endpoint"""
+    cache_results = False
+
+    def post(self, request):
+        pdf_file = request.FILES.get('file') or request.FILES.get('pdf')
+        if not pdf_file:
+            return Response({'error': 'PDF file is required'}, status=400)
+
+        if not pdf_file.name.lower().endswith('.pdf'):
+            return Response({'error': 'Only PDF files are allowed'}, status=400)
+
+        document_id = store_document(pdf_file)
+        data_path, _ = get_document(document_id)
+        try:
+            page_count = len(run_pdf_task(PDFProcessor.get_page_sizes, str(data_path)))
+        except Exception as e:
+            delete_document(document_id)
+            return Response({'error': f'Could not read PDF: {str(e)}'}, status=400)
+
+        # Storing a document is not an operation, so it does not count against usage limits
+        return Response({
+            'document_id': document_id,
+            'filename': pdf_file.name,
+            'size': pdf_file.size,
+            'total_pages': page_count,
+            'expires_in': document_ttl_seconds(),
+        }, status=201)
+
+
+class DocumentDetailView(APIView):
+    """Check (and keep alive) or discard a stored document"""
+    permission_classes = []
+
+    def get(self, request, document_id):
+        document = get_document(document_id)
+        if not document:
+            return Response({'error': 'Document not found or expired'}, status=404)
+
+        data_path, metadata = document
+        return Response({
+            'document_id': str(document_id),
+            'filename': metadata['name'],
+            'size': data_path.stat().st_size,
+            'expires_in': document_ttl_seconds(),
+        })
+
+    def delete(self, request, document_id):
+        delete_document(document_id)
+        return Response(status=204)
+
+
+class PreviewSessionView(BasePDFView):
+    """Store a PDF for previewing and return its page layout without rendering anything"""
+    cache_results = False
+
+    def post(self, request):
+        pdf_file = request.FILES.get('pdf') or request.FILES.get('file')
+        if not pdf_file:
+            return Response({'error': 'No PDF file provided'}, status=400)
+
+        if not pdf_file.name.lower().endswith('.pdf'):
+            return Response({'error': 'File must be a PDF'}, status=400)
+
+        session_id = store_document(pdf_file)
+        try:
+            data_path, _ = get_document(session_id)
+            page_sizes = run_pdf_task(PDFProcessor.get_page_sizes, str(data_path))
+        except Exception as e:
+            delete_document(session_id)
+            return Response({'error': f'Could not read PDF: {str(e)}'}, status=400)
+
+        # Preview operations should NOT count against usage limits;
+        # the session doubles as a document handle for the follow-up operation
+        return Response({
+            'session_id': session_id,
+            'document_id': session_id,
+            'total_pages': len(page_sizes),
+            'pages': [
+                {'page': i + 1, 'width': width, 'height': height}
+                for i, (width, height) in enumerate(page_sizes)
+            ],
+            'thumbnail_url': request.build_absolute_uri(f'/api/pdf/preview/sessions/{session_id}/pages/'),
+            'expires_in': document_ttl_seconds(),
+        }, status=201)
+
+
+class PreviewPageView(APIView):
+    """Render one page of a preview session as a WebP/JPEG thumbnail
+    Query params: size (pixel width, default 200), format (webp or jpeg)
+    """
+    permission_classes = []
+    thumbnail_formats = {'webp': 'webp', 'jpeg': 'jpeg', 'jpg': 'jpeg'}
+
+    def perform_content_negotiation(self, request, force=False):
+        # ?format= picks the image encoding here, not a DRF renderer
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, session_id, page):
+        document = get_document(session_id)
+        if not document:
+            return Response({'error': 'Preview session not found or expired'}, status=404)
+
+        image_format = self.thumbnail_formats.get(request.query_params.get('format', 'webp').lower())
+        if not image_format:
+            return Response({'error': 'Format must be webp or jpeg'}, status=400)
+
+        try:
+            width = int(request.query_params.get('size', 200))
+        except ValueError:
+            return Response({'error': 'Size must be a number of pixels'}, status=400)
+        width = max(32, min(width, 2000))
+
+        # Session files never change, so the ETag only depends on what was asked for
+        etag = f'"{session_id}-{page}-{width}-{image_format}"'
+        cache_control = f'private, max-age={document_ttl_seconds()}'
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            response = HttpResponse(status=304)
+            response['ETag'] = etag
+            response['Cache-Control'] = cache_control
+            return response
+
+        data_path, _ = document
+        try:
+            image_data = run_pdf_task(PDFProcessor.render_page_thumbnail, str(data_path), page - 1, width, image_format)
+        except IndexError as e:
+            return Response({'error': str(e)}, status=404)
+        except Exception as e:
+            return Response({'error': f'Failed to render page: {str(e)}'}, status=500)
+
+        response = HttpResponse(image_data, content_type=f'image/{image_format}')
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        return response
+
+
+class JobAccessMixin:
+    """Look up a background job owned by the current user or session"""
+
+    def get_job(self, request, job_id):
+        try:
+            job = ProcessingJob.objects.get(id=job_id)
+        except ProcessingJob.DoesNotExist:
+            return None
+
+        if job.user_id:
+            if not request.user.is_authenticated or request.user.id != job.user_id:
+                return None
+        elif job.session_key and job.session_key != request.session.session_key:
+            return None
+
+        return job
+
+
+class JobStatusView(JobAccessMixin, APIView):
+    """Poll the status of a background PDF job"""
+    permission_classes = []
+
+    def get(self, request, job_id):
+        job = self.get_job(request, job_id)
+        if not job:
+            return Response({'error': 'Job not found'}, status=404)
+
+        data = {
+            'job_id': str(job.id),
+            'operation': job.operation,
+            'status': job.status,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at,
+        }
+        if job.status == 'completed':
+            data['filename'] = job.result_filename
+            data['result_url'] = request.build_absolute_uri(f'/api/pdf/jobs/{job.id}/result/')
+        elif job.status == 'failed':
+            data['error'] = job.error_message
+
+        return Response(data)
+
+
+class JobResultView(JobAccessMixin, APIView):
+    """Download the output of a completed background PDF job"""
+    permission_classes = []
+
+    def get(self, request, job_id):
+        from django.http import FileResponse
+        import os
+
+        job = self.get_job(request, job_id)
+        if not job:
+            return Response({'error': 'Job not found'}, status=404)
+
+        if job.status == 'failed':
+            return Response({'error': job.error_message, 'status': job.status}, status=409)
+
+        if job.status != 'completed':
+            return Response({'error': 'Job is not finished yet', 'status': job.status}, status=409)
+
+        if not job.result_path or not os.path.exists(job.result_path):
+            return Response({'error': 'Job result has expired'}, status=410)
+
+        response = FileResponse(
+            open(job.result_path, 'rb'),
+            as_attachment=True,
+            filename=job.result_filename,
+            content_type=job.content_type
+        )
+        response['X-File-Size'] = str(os.path.getsize(job.result_path))
+        return response
+
+
 # Support System Views
 from pdfapp.models import ContactMessage, SupportTicket
 from pdfapp.serializers import ContactMessageSerializer, SupportTicketSerializer
@@ -1,9 +1,25 @@
-from django.test import TestCase
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from io import BytesIO
+from unittest import mock
+
+import fitz
+from PIL import Image, ImageDraw
+from django.test import TestCase, override_settings
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 from pdfapp.models import UserProfile, ProcessingHistory
+from pdfapp.utils.pdf_helpers import PDFProcessor
 
 
 class UserProfileTestCase(TestCase):
@@ -85,4 +101,934 @@ class PDFProcessingTestCase(APITestCase):
         self.client.force_authenticate(user=None)
         url = reverse('merge-pdf')
         response = self.client.post(url, {})
-        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
\ No newline at end of file
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+class OCRReaderPoolTestCase(TestCase):
+    def setUp(self):
+        from pdfapp.utils.ocr_pool import OCRReaderPool
+        self.created = []
+
+        def factory(languages, gpu):
+            self.created.append(languages)
+            return object()
+
+        self.pool = OCRReaderPool(reader_factory=factory, idle_seconds=60)
+
+    def test_reader_is_reused_per_language_set(self):
+        """Test that a reader is built once and shared for equivalent language sets"""
+        with self.pool.reader(['en', 'fr']) as first:
+            pass
+        with self.pool.reader(['fr', 'en']) as second:
+            pass
+        self.assertIs(first, second)
+        self.assertEqual(self.created, [['en', 'fr']])
+
+    def test_idle_readers_are_evicted(self):
+        """Test that readers past the idle window are released"""
+        with self.pool.reader(['en']):
+            pass
+        self.pool._idle_seconds = 0
+        self.assertEqual(len(self.pool.evict_idle()), 1)
+        self.assertEqual(self.pool.loaded_languages(), [])
+
+    @override_settings(PDF_EXECUTOR_WORKERS=0)
+    def test_idle_readers_are_released_before_each_task(self):
+        """Test that the process running a PDF task drops its idle readers first"""
+        from pdfapp.utils.executor import run_pdf_task
+        from pdfapp.utils.ocr_pool import ocr_reader_pool
+
+        with mock.patch.object(ocr_reader_pool, '_entries', {}), mock.patch.object(ocr_reader_pool, '_idle_seconds', 0):
+            with mock.patch.object(ocr_reader_pool, '_reader_factory', lambda languages, gpu: object()):
+                with ocr_reader_pool.reader(['en']):
+                    pass
+            self.assertEqual(run_pdf_task(len, 'abc'), 3)
+            self.assertEqual(ocr_reader_pool.loaded_languages(), [])
+
+
+class TemporaryMediaMixin:
+    """Point MEDIA_ROOT at a throwaway directory so jobs, documents and cached results never touch media/"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls._media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls._media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls._media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+
+def make_test_pdf(pages=2):
+    """Build a small in-memory PDF for processing tests"""
+    doc = fitz.open()
+    for page_num in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Test page {page_num + 1}")
+    return pdf_upload(pdf_bytes(doc))
+
+
+def pdf_bytes(doc, **options):
+    """Serialize a fitz document and close it"""
+    data = doc.tobytes(**options)
+    doc.close()
+    return data
+
+
+def pdf_upload(data, name='test.pdf'):
+    """Wrap PDF bytes as an uploaded file"""
+    return SimpleUploadedFile(name, data, content_type='application/pdf')
+
+
+def scanned_pdf(*images, **options):
+    """PDF bytes with one page per PIL image, each image covering its whole page like a scan"""
+    doc = fitz.open()
+    for image in images:
+        png = BytesIO()
+        image.save(png, format='PNG')
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=png.getvalue())
+    return pdf_bytes(doc, **options)
+
+
+def encrypted_pdf(name='locked.pdf'):
+    """Password-protected upload"""
+    doc = fitz.open(stream=make_test_pdf().read(), filetype='pdf')
+    data = pdf_bytes(doc, encryption=fitz.PDF_ENCRYPT_AES_256, user_pw='secret', owner_pw='owner')
+    return pdf_upload(data, name)
+
+
+@override_settings(JOB_WORKER_THREADS=0)
+class AsyncJobTestCase(TemporaryMediaMixin, APITestCase):
+    def test_async_rotate_job(self):
+        """Test that ?async=1 queues a job that can be polled and downloaded"""
+        from pdfapp.utils.job_queue import process_pending_jobs
+
+        response = self.client.post(
+            reverse('rotate') + '?async=1',
+            {'file': make_test_pdf(), 'pages': 'all', 'angle': 90},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+
+        status_response = self.client.get(reverse('job-status', args=[job_id]))
+        self.assertEqual(status_response.data['status'], 'queued')
+
+        self.assertEqual(process_pending_jobs(), 1)
+
+        status_response = self.client.get(reverse('job-status', args=[job_id]))
+        self.assertEqual(status_response.data['status'], 'completed')
+
+        result_response = self.client.get(reverse('job-result', args=[job_id]))
+        self.assertEqual(result_response.status_code, 200)
+        self.assertTrue(b''.join(result_response.streaming_content).startswith(b'%PDF'))
+
+    def test_queued_passwords_are_not_stored_in_plain_text(self):
+        """Test that a queued secure job keeps its password encrypted and drops it once run"""
+        from pdfapp.models import ProcessingJob
+        from pdfapp.utils.job_queue import process_pending_jobs
+
+        response = self.client.post(
+            reverse('secure-pdf') + '?async=1',
+            {'file': make_test_pdf(), 'user_password': 'hunter2-secret'},
+            format='multipart'
+        )
+        self.assertEqual(response.status_code, 202)
+        job = ProcessingJob.objects.get(id=response.data['job_id'])
+        self.assertNotIn('hunter2-secret', json.dumps(job.params))
+
+        self.assertEqual(process_pending_jobs(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertNotIn('user_password', job.params)
+        with fitz.open(job.result_path) as doc:
+            self.assertTrue(doc.authenticate('hunter2-secret'))
+
+    def test_jobs_of_dead_workers_are_failed(self):
+        """Test that a job left running past JOB_RUNNING_TIMEOUT_SECONDS is marked failed"""
+        from datetime import timedelta
+        from django.utils import timezone
+        from pdfapp.models import ProcessingJob
+        from pdfapp.utils.job_queue import claim_next_job
+
+        stale = ProcessingJob.objects.create(
+            operation='rotate', status='running', params={'password': 'x'},
+            started_at=timezone.now() - timedelta(hours=2)
+        )
+        live = ProcessingJob.objects.create(operation='rotate', status='running', started_at=timezone.now())
+
+        self.assertIsNone(claim_next_job())
+        stale.refresh_from_db()
+        live.refresh_from_db()
+        self.assertEqual((stale.status, live.status), ('failed', 'running'))
+        self.assertEqual(stale.params, {})
+
+    def test_reaped_job_is_not_overwritten(self):
+        """Test that a job reaped by fail_stale_jobs mid-run keeps its failed status"""
+        from pdfapp.models import ProcessingJob
+        from pdfapp.utils import job_queue
+
+        response = self.client.post(
+            reverse('rotate') + '?async=1', {'file': make_test_pdf(), 'pages': 'all', 'angle': 90}, format='multipart'
+        )
+        job = job_queue.claim_next_job()
+        dispatch = job_queue.dispatch_operation
+
+        def reaped_dispatch(*args):
+            ProcessingJob.objects.filter(id=job.id).update(status='failed', error_message='interrupted')
+            return dispatch(*args)
+
+        with mock.patch('pdfapp.utils.job_queue.dispatch_operation', side_effect=reaped_dispatch):
+            job = job_queue.run_job(job)
+        self.assertEqual(str(job.id), response.data['job_id'])
+        self.assertEqual((job.status, job.error_message), ('failed', 'interrupted'))
+        self.assertEqual(list(job_queue.get_job_dir(job.id).glob('result_*')), [])
+
+
+@override_settings(PDF_EXECUTOR_WORKERS=1)
+class PDFTaskExecutorTestCase(TestCase):
+    def setUp(self):
+        from pdfapp.utils.executor import PDFTaskExecutor
+        self.executor = PDFTaskExecutor()
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    @override_settings(PDF_EXECUTOR_MAX_TASKS_PER_CHILD=2)
+    def test_workers_are_recycled(self):
+        """Test that a fresh pool takes over after the task budget without deadlocking"""
+        pids = {self.executor.run(os.getpid) for _ in range(5)}
+        self.assertGreater(len(pids), 1)
+        self.assertEqual(list(self.executor.map_ordered(abs, [(-1,), (-2,), (-3,)])), [1, 2, 3])
+
+    @override_settings(PDF_EXECUTOR_TASK_TIMEOUT=1)
+    def test_timed_out_task_releases_its_worker(self):
+        """Test that a task past the timeout is stopped and the next task gets a fresh worker"""
+        with self.assertRaisesMessage(Exception, 'longer than 1 seconds'):
+            self.executor.run(time.sleep, 30)
+        self.assertIsNone(self.executor._executor)
+
+        started = time.monotonic()
+        self.assertEqual(self.executor.run(abs, -4), 4)
+        self.assertLess(time.monotonic() - started, 10)
+
+        with self.assertRaisesMessage(Exception, 'longer than 1 seconds'):
+            list(self.executor.map_ordered(time.sleep, [(0,), (30,)]))
+
+    def test_deadline_ends_iteration_early(self):
+        """Test that map_ordered stops waiting at the deadline and cancels tasks not yet started"""
+        started = time.monotonic()
+        results = list(self.executor.map_ordered(time.sleep, [(0,), (2,), (2,), (2,)], deadline=started + 1))
+        self.assertEqual(results, [None])
+        self.assertLess(time.monotonic() - started, 2)
+
+
+class PixmapAdapterTestCase(TestCase):
+    def test_pixmap_to_pil_matches_samples(self):
+        """Test that rendered pixels reach PIL without a PNG round trip"""
+        from pdfapp.utils.pixmap import pixmap_to_pil, pixmap_to_jpeg
+
+        doc = fitz.open()
+        page = doc.new_page()
+        page.draw_rect(fitz.Rect(0, 0, 100, 100), color=None, fill=(1, 0, 0))
+        pix = page.get_pixmap()
+
+        image = pixmap_to_pil(pix)
+        self.assertEqual(image.size, (pix.width, pix.height))
+        self.assertEqual(image.getpixel((10, 10)), (255, 0, 0))
+        self.assertTrue(pixmap_to_jpeg(pix, 50).startswith(b'\xff\xd8'))
+
+
+class ResultCacheTestCase(TemporaryMediaMixin, APITestCase):
+    def setUp(self):
+        from pdfapp.utils.result_cache import ResultCache
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = ResultCache(cache_dir=self.cache_dir, max_bytes=10, ttl_seconds=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        """Test that the store stays under its size cap by dropping the oldest entries"""
+        self.cache.put('a' * 64, b'123456', {'operation': 'compress'})
+        self.cache.put('b' * 64, b'123456', {'operation': 'compress'})
+        self.assertIsNone(self.cache.get('a' * 64))
+        self.assertIsNotNone(self.cache.get('b' * 64))
+
+    def test_repeated_request_is_served_from_cache(self):
+        """Test that an identical second request is a cache hit"""
+        self.cache._max_bytes = 1024 * 1024
+        pdf_file = make_test_pdf()
+        with mock.patch('pdfapp.routes.views.result_cache', self.cache):
+            responses = []
+            for i in range(2):
+                pdf_file.seek(0)
+                responses.append(self.client.post(
+                    reverse('rotate'), {'file': pdf_file, 'pages': 'all', 'angle': 90}, format='multipart'
+                ))
+
+        self.assertEqual(responses[0]['X-Cache'], 'MISS')
+        self.assertEqual(responses[1]['X-Cache'], 'HIT')
+        self.assertEqual(responses[0].getvalue(), responses[1].getvalue())
+
+
+class PreviewSessionTestCase(TemporaryMediaMixin, APITestCase):
+    def test_thumbnails_are_rendered_per_page(self):
+        """Test that a preview session lists pages and serves cacheable thumbnails"""
+        response = self.client.post(reverse('preview-session'), {'pdf': make_test_pdf(3)}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['total_pages'], 3)
+        session_id = response.data['session_id']
+
+        page_url = reverse('preview-page', args=[session_id, 2])
+        thumbnail = self.client.get(page_url, {'size': 120, 'format': 'jpeg'})
+        self.assertEqual(thumbnail.status_code, 200)
+        self.assertEqual(thumbnail['Content-Type'], 'image/jpeg')
+
+        cached = self.client.get(page_url, {'size': 120, 'format': 'jpeg'}, HTTP_IF_NONE_MATCH=thumbnail['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertEqual(self.client.get(reverse('preview-page', args=[session_id, 4])).status_code, 404)
+
+    @override_settings(PREVIEW_MAX_PAGES=2)
+    def test_legacy_preview_is_capped_and_deprecated(self):
+        """Test that the inline base64 preview refuses long documents and points at preview sessions"""
+        response = self.client.post(reverse('pdf-preview'), {'pdf': pdf_upload(make_test_pdf(2).read())}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_pages'], 2)
+        self.assertEqual(response['Deprecation'], 'true')
+        self.assertIn(reverse('preview-session'), response['Link'])
+
+        response = self.client.post(reverse('pdf-preview'), {'pdf': pdf_upload(make_test_pdf(3).read())}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('/preview/sessions/', response.data['error'])
+
+
+class DocumentHandleTestCase(TemporaryMediaMixin, APITestCase):
+    def test_handle_replaces_file_upload(self):
+        """Test that a stored document handle can be sent instead of the file"""
+        response = self.client.post(reverse('document-upload'), {'file': make_test_pdf()}, format='multipart')
+        self.assertEqual(response.status_code, 201)
+        document_id = response.data['document_id']
+
+        response = self.client.post(reverse('rotate'), {'file': document_id, 'pages': 'all', 'angle': 90})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="rotated_test.pdf"')
+
+        self.client.delete(reverse('document-detail', args=[document_id]))
+        self.assertEqual(self.client.get(reverse('document-detail', args=[document_id])).status_code, 404)
+
+
+class PipelineTestCase(TemporaryMediaMixin, APITestCase):
+    def test_steps_run_on_one_document(self):
+        """Test that merge, rotate and watermark run in one request and write a single PDF"""
+        steps = [
+            {'step': 'merge'},
+            {'step': 'rotate', 'pages': '1', 'angle': 90},
+            {'step': 'watermark', 'text': 'DRAFT'},
+            {'step': 'compress'},
+        ]
+        response = self.client.post(reverse('pipeline'), {
+            'files': [make_test_pdf(2), make_test_pdf(1)],
+            'steps': json.dumps(steps),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+
+        doc = fitz.open(stream=response.getvalue(), filetype='pdf')
+        self.assertEqual(doc.page_count, 3)
+        self.assertEqual(doc[0].rotation, 90)
+        self.assertEqual(doc[1].rotation, 0)
+        self.assertIn('DRAFT', doc[2].get_text())
+        doc.close()
+
+        response = self.client.post(reverse('pipeline'), {
+            'file': make_test_pdf(), 'steps': json.dumps([{'step': 'split'}])
+        }, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class BatchTestCase(TemporaryMediaMixin, APITestCase):
+    def test_batch_rotate_returns_zip_with_manifest(self):
+        """Test that one request rotates many files and reports failures per file"""
+        broken = pdf_upload(b'%PDF-1.4 truncated', 'broken.pdf')
+        response = self.client.post(reverse('batch', args=['rotate']), {
+            'files': [make_test_pdf(), make_test_pdf(3), broken], 'pages': 'all', 'angle': 90
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Batch-Succeeded'], '2')
+
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        manifest = json.loads(archive.read('manifest.json'))
+        self.assertEqual([item['status'] for item in manifest['files']], ['success', 'success', 'error'])
+        self.assertEqual(
+            sorted(name for name in archive.namelist() if name != 'manifest.json'),
+            ['rotated_test.pdf', 'rotated_test_2.pdf']
+        )
+
+        response = self.client.post(reverse('batch', args=['split']), {'files': [make_test_pdf()]}, format='multipart')
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(PDF_EXECUTOR_WORKERS=2, BATCH_CONCURRENCY=3)
+    def test_concurrent_self_parallel_operations_keep_pymupdf_in_workers(self):
+        """Test that compress and pdf_to_img batches never open a document on the batch threads"""
+        from pdfapp.utils.operations import run_batch
+
+        opened_on = []
+        real_open = fitz.open
+
+        def recording_open(*args, **kwargs):
+            opened_on.append(threading.current_thread().name)
+            return real_open(*args, **kwargs)
+
+        scan = Image.effect_noise((600, 800), 40).convert('RGB')
+        with mock.patch('fitz.open', recording_open):
+            for operation, params in (('compress', {'mode': 'rasterize'}), ('pdf_to_img', {'dpi': 50})):
+                files = [pdf_upload(scanned_pdf(scan, scan), f'scan_{i}.pdf') for i in range(4)]
+                archive, manifest = run_batch(operation, files, params)
+                self.assertEqual({item['status'] for item in manifest}, {'success'}, manifest)
+                archive.close()
+
+        self.assertEqual([name for name in opened_on if name != threading.main_thread().name], [])
+
+
+class StreamingResponseTestCase(TemporaryMediaMixin, APITestCase):
+    @override_settings(RESULT_CACHE_MAX_BYTES=10 * 1024 * 1024)
+    def test_split_zip_is_spooled_and_cached(self):
+        """Test that multi-part outputs are zipped before the response and served from the cache"""
+        pdf_file = make_test_pdf(3)
+        responses = []
+        for i in range(2):
+            pdf_file.seek(0)
+            responses.append(self.client.post(
+                reverse('split-pdf'), {'file': pdf_file, 'split_type': 'each'}, format='multipart'
+            ))
+        self.assertEqual(responses[0].status_code, 200)
+        self.assertTrue(responses[0].streaming)
+        self.assertEqual([response['X-Cache'] for response in responses], ['MISS', 'HIT'])
+
+        archive = zipfile.ZipFile(BytesIO(responses[1].getvalue()))
+        self.assertEqual(archive.namelist(), ['page_1.pdf', 'page_2.pdf', 'page_3.pdf'])
+        self.assertIsNone(archive.testzip())
+
+    def test_failure_mid_archive_is_an_error_response(self):
+        """Test that a page failing after others were rendered gives a 500, not a truncated zip"""
+        def pages(*args):
+            yield 'page_1.png', b'image'
+            raise RuntimeError('page 2 could not be rendered')
+
+        with mock.patch.object(PDFProcessor, 'page_images', side_effect=pages):
+            response = self.client.post(reverse('pdf-to-image'), {'file': make_test_pdf(2)}, format='multipart')
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json()['error'], 'page 2 could not be rendered')
+
+
+class UploadIngestTestCase(TestCase):
+    def test_spooled_uploads_travel_by_path(self):
+        """Test that uploads on disk reach PyMuPDF and pool workers by path, not by copy"""
+        from django.core.files.uploadedfile import TemporaryUploadedFile
+        from pdfapp.utils.executor import make_portable
+        from pdfapp.utils.ingest import UploadPath, open_pdf, upload_path
+
+        data = make_test_pdf(3).read()
+        upload = TemporaryUploadedFile('big.pdf', 'application/pdf', len(data), None)
+        upload.write(data)
+        upload.seek(0)
+
+        self.assertEqual(upload_path(upload), upload.temporary_file_path())
+        portable = pickle.loads(pickle.dumps(make_portable(upload)))
+        self.assertIsInstance(portable, UploadPath)
+        self.assertEqual((portable.name, portable.size), ('big.pdf', len(data)))
+        self.assertEqual(portable.read(), data)
+
+        in_memory = make_test_pdf(3)
+        self.assertIsNone(upload_path(in_memory))
+        doc = open_pdf(in_memory)
+        self.assertEqual(doc.page_count, 3)
+        doc.close()
+        upload.close()
+
+
+class UploadHandlerTestCase(TemporaryMediaMixin, APITestCase):
+    def test_mismatched_content_is_rejected(self):
+        """Test that a file whose bytes are not a PDF is refused before it reaches a view"""
+        fake = pdf_upload(b'MZ\x90\x00' * 512, 'invoice.pdf')
+        response = self.client.post(reverse('rotate'), {'file': fake, 'pages': 'all', 'angle': 90}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('invoice.pdf', response.data['error'])
+
+    def test_rejected_upload_is_not_read_to_the_end(self):
+        """Test that a mismatched upload stops parsing without draining the rest of the body"""
+        from django.http import multipartparser
+
+        fake = pdf_upload(b'MZ\x90\x00' * 256 * 1024, 'invoice.pdf')  # 1 MB, many chunks
+        with mock.patch.object(multipartparser, 'exhaust', wraps=multipartparser.exhaust) as exhaust:
+            response = self.client.post(reverse('rotate'), {'file': fake, 'pages': 'all'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        exhaust.assert_not_called()
+
+    def test_hash_is_computed_while_streaming(self):
+        """Test that the upload's SHA-256 is available without rereading the file"""
+        from pdfapp.utils.document_store import get_document
+
+        pdf_file = make_test_pdf()
+        expected = hashlib.sha256(pdf_file.read()).hexdigest()
+        pdf_file.seek(0)
+
+        response = self.client.post(reverse('document-upload'), {'file': pdf_file}, format='multipart')
+        _, metadata = get_document(response.data['document_id'])
+        self.assertEqual(metadata['sha256'], expected)
+
+
+class ImageRecompressionTestCase(TestCase):
+    def test_images_shrink_and_text_survives(self):
+        """Test that image-only mode downsamples embedded images and leaves text alone"""
+        # 2000x2000 noise photo drawn in a 2 inch square (~1000 DPI)
+        image_bytes = BytesIO()
+        Image.effect_noise((2000, 2000), 64).convert('RGB').save(image_bytes, format='JPEG', quality=95)
+
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((72, 72), 'Vector text stays searchable')
+        page.insert_image(fitz.Rect(72, 100, 216, 244), stream=image_bytes.getvalue())
+        data = pdf_bytes(doc)
+
+        output = PDFProcessor.compress_pdf(pdf_upload(data, 'photo.pdf'), 'medium', mode='images')
+        result = fitz.open(stream=output.getvalue(), filetype='pdf')
+        self.assertEqual(result.page_count, 1)
+        self.assertIn('Vector text stays searchable', result[0].get_text())
+        info = result[0].get_image_info()[0]
+        self.assertLess(info['width'], 2000)
+        self.assertLess(len(output.getvalue()), len(data))
+        result.close()
+
+
+class CompressionProfileTestCase(TemporaryMediaMixin, APITestCase):
+    def test_text_pdf_is_compressed_losslessly(self):
+        """Test that a text-only PDF is routed to lossless optimization and reported in headers"""
+        response = self.client.post(reverse('compress-pdf'), {'file': make_test_pdf(3)}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Compression-Strategy'], 'basic')
+        profile = json.loads(response['X-Compression-Profile'])
+        self.assertEqual(profile['pages'], 3)
+        self.assertEqual(profile['image_area'], 0.0)
+
+    def test_scanned_pdf_is_rasterized(self):
+        """Test that pages covered by a single image without text are treated as scans"""
+        from pdfapp.utils.profiler import profile_pdf
+
+        pdf_file = pdf_upload(scanned_pdf(Image.new('L', (850, 1100), 255)), 'scan.pdf')
+        self.assertEqual(profile_pdf(pdf_file)['strategy'], 'rasterize')
+
+    @override_settings(PDF_EXECUTOR_WORKERS=0, PDF_COMPRESS_INFLIGHT_PAGES=2)
+    def test_rasterized_pages_are_assembled_a_window_at_a_time(self):
+        """Test that encoded pages are appended to the output in window-sized chunks"""
+        pages = [Image.effect_noise((300, 400), 40 + i).convert('RGB') for i in range(5)]
+        append = PDFProcessor._append_pages
+        with mock.patch.object(PDFProcessor, '_append_pages', side_effect=append) as appended:
+            output = PDFProcessor.advanced_compress_pdf(pdf_upload(scanned_pdf(*pages), 'scan.pdf'), 'medium')
+        self.assertEqual([len(call.args[1]) for call in appended.call_args_list], [2, 2, 1])
+
+        with fitz.open(stream=output.getvalue(), filetype='pdf') as doc:
+            self.assertEqual(doc.page_count, 5)
+            self.assertEqual(len(doc[4].get_images()), 1)
+
+
+class TargetSizeCompressionTestCase(TemporaryMediaMixin, APITestCase):
+    def test_parse_size(self):
+        """Test that human-readable target sizes are converted to bytes"""
+        from pdfapp.utils.size_estimate import parse_size
+
+        self.assertEqual(parse_size('under 2 MB'), 2 * 1024 * 1024)
+        self.assertEqual(parse_size('500kb'), 500 * 1024)
+        self.assertEqual(parse_size('12345'), 12345)
+        with self.assertRaises(ValueError):
+            parse_size('small please')
+
+    def test_target_size_is_met_in_one_pass(self):
+        """Test that a target below the current size rasterizes with estimated settings"""
+        pages = [Image.effect_noise((1200, 1600), 40).convert('RGB') for _ in range(3)]
+        data = scanned_pdf(*pages, deflate=True)
+        target = len(data) // 4
+
+        response = self.client.post(
+            reverse('compress-pdf'), {'file': pdf_upload(data, 'scan.pdf'), 'target_size': str(target)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Compression-Strategy'], 'rasterize')
+        self.assertTrue(json.loads(response['X-Compression-Target'])['target_met'])
+        self.assertLessEqual(int(response['X-File-Size']), target)
+
+    def test_target_uses_the_auto_strategy_when_it_fits(self):
+        """Test that an image-heavy text document meets its target by recompressing images, not rasterizing"""
+        png = BytesIO()
+        Image.effect_noise((1200, 1200), 30).convert('RGB').save(png, format='PNG')
+        doc = fitz.open()
+        for i in range(3):
+            page = doc.new_page()
+            for line in range(30):
+                page.insert_text((72, 72 + line * 14), f'Line {line} of page {i}')
+            page.insert_image(fitz.Rect(72, 500, 272, 700), stream=png.getvalue())
+        data = pdf_bytes(doc, deflate=True)
+        target = len(data) // 3
+
+        response = self.client.post(
+            reverse('compress-pdf'), {'file': pdf_upload(data, 'report.pdf'), 'target_size': str(target)}, format='multipart'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Compression-Strategy'], 'images')
+        self.assertLessEqual(int(response['X-File-Size']), target)
+
+        result = fitz.open(stream=response.getvalue(), filetype='pdf')
+        self.assertIn('Line 29 of page 2', result[2].get_text())
+        result.close()
+
+    @override_settings(PDF_EXECUTOR_WORKERS=0)
+    def test_file_under_target_is_never_grown(self):
+        """Test that a file already under target is returned as-is when optimizing would grow it"""
+        from pdfapp.utils.size_estimate import compress_to_target
+
+        data = make_test_pdf().read()
+        grown = BytesIO(data + b'\n' * 4096)
+        with mock.patch.object(PDFProcessor, 'basic_compress_pdf', return_value=grown):
+            output, report = compress_to_target(BytesIO(data), len(data) * 2)
+        self.assertEqual(output.getvalue(), data)
+        self.assertEqual(report['strategy'], 'original')
+        self.assertEqual(report['estimated_size'], len(data))
+
+        output, report = compress_to_target(BytesIO(data), len(data) * 2)
+        self.assertLessEqual(report['estimated_size'], len(data))
+        self.assertEqual(report['estimated_size'], len(output.getvalue()))
+
+    def test_invalid_target_size(self):
+        """Test that an unparseable target size is rejected"""
+        response = self.client.post(reverse('compress-pdf'), {'file': make_test_pdf(), 'target_size': 'tiny'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+
+
+class CompressEstimateTestCase(TemporaryMediaMixin, APITestCase):
+    def test_estimate_per_quality(self):
+        """Test that every quality preset gets a predicted size and time"""
+        response = self.client.post(reverse('compress-estimate'), {'file': make_test_pdf(6)}, format='multipart')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['pages'], 6)
+        self.assertEqual(set(response.data['estimates']), {'low', 'medium', 'high'})
+        self.assertGreaterEqual(response.data['sampled_pages'], 1)
+        # A text document is estimated with the strategy auto mode picks for it
+        self.assertEqual(response.data['strategy'], 'basic')
+
+    def test_time_budget_stops_sampling(self):
+        """Test that an exhausted time budget still samples the first page and nothing more"""
+        from pdfapp.utils.size_estimate import estimate_presets
+
+        pages = [Image.effect_noise((600, 800), 40).convert('RGB') for _ in range(4)]
+        result = estimate_presets(pdf_upload(scanned_pdf(*pages), 'scan.pdf'), time_budget=0)
+        self.assertEqual(result['strategy'], 'rasterize')
+        self.assertEqual(result['sampled_pages'], 1)
+        self.assertFalse(result['complete_sample'])
+        # Rasterized size falls with the preset; the structural strategies barely depend on it
+        estimates = result['estimates']
+        self.assertLessEqual(estimates['low']['estimated_size'], estimates['high']['estimated_size'])
+
+
+class BilevelCompressionTestCase(TestCase):
+    def test_black_and_white_scan_is_stored_as_1_bit(self):
+        """Test that a monochrome scanned page becomes a 1-bit image and colour stays JPEG"""
+        scan = Image.new('RGB', (1700, 2200), 'white')
+        draw = ImageDraw.Draw(scan)
+        for y in range(100, 2100, 40):
+            draw.text((100, y), 'Signed and agreed by both parties ' * 3, fill='black')
+        photo = Image.effect_noise((1700, 2200), 60).convert('RGB')
+        photo.paste(Image.new('RGB', (600, 600), 'red'), (200, 200))
+
+        output = PDFProcessor.advanced_compress_pdf(pdf_upload(scanned_pdf(scan, photo), 'scan.pdf'), 'medium')
+        result = fitz.open(stream=output.getvalue(), filetype='pdf')
+        first = result[0].get_images()[0]
+        second = result[1].get_images()[0]
+        self.assertEqual(first[4], 1)  # Bits per component
+        self.assertIn(first[8], ('CCITTFaxDecode', 'FlateDecode'))
+        self.assertEqual(second[8], 'DCTDecode')
+        result.close()
+
+    def test_pages_stay_jpeg_without_numpy(self):
+        """Test that rasterizing still works, all in JPEG, when numpy is not installed"""
+        from pdfapp.utils.ingest import local_pdf_path
+        from pdfapp.utils.pdf_helpers import COMPRESSION_PRESETS
+
+        scan = Image.new('RGB', (850, 1100), 'white')
+        ImageDraw.Draw(scan).text((100, 100), 'Signed and agreed', fill='black')
+        pdf_file = pdf_upload(scanned_pdf(scan), 'scan.pdf')
+
+        with mock.patch('pdfapp.utils.pdf_helpers.NUMPY_AVAILABLE', False), \
+                mock.patch.object(PDFProcessor, '_is_bilevel_page', side_effect=ImportError('numpy')):
+            with local_pdf_path(pdf_file) as path:
+                _, image_data = PDFProcessor._compress_page(path, 0, COMPRESSION_PRESETS['medium'])
+        self.assertIsInstance(image_data, bytes)
+        self.assertEqual(image_data[:3], b'\xff\xd8\xff')
+
+
+class MRCCompressionTestCase(TemporaryMediaMixin, APITestCase):
+    def test_colour_scan_is_split_into_layers(self):
+        """Test that MRC mode stores a background plus a masked text-colour layer"""
+        scan = Image.new('RGB', (1700, 2200), (235, 225, 200))
+        draw = ImageDraw.Draw(scan)
+        draw.rectangle((100, 100, 1600, 400), fill=(60, 120, 200))
+        for y in range(500, 2100, 40):
+            draw.text((100, y), 'Invoice total due within thirty days ' * 3, fill=(20, 20, 90))
+        data = scanned_pdf(scan)
+
+        output = PDFProcessor.compress_pdf(pdf_upload(data, 'scan.pdf'), 'medium', mode='mrc')
+        result = fitz.open(stream=output.getvalue(), filetype='pdf')
+        images = result[0].get_images()
+        self.assertEqual(len(images), 2)
+        masked = [xref for xref, *_ in images if result.xref_get_key(xref, 'Mask')[0] == 'xref']
+        self.assertEqual(len(masked), 1)
+        self.assertLess(len(output.getvalue()), len(data))
+        result.close()
+
+    def test_unavailable_mrc_is_refused(self):
+        """Test that mode=mrc without numpy is a 400, not a silent switch to another strategy"""
+        with mock.patch('pdfapp.routes.views.NUMPY_AVAILABLE', False):
+            response = self.client.post(reverse('compress-pdf'), {'file': make_test_pdf(), 'mode': 'mrc'}, format='multipart')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('MRC', response.data['error'])
+
+        with mock.patch('pdfapp.utils.pdf_helpers.NUMPY_AVAILABLE', False):
+            with self.assertRaisesMessage(ValueError, 'requires numpy'):
+                PDFProcessor.compress_pdf(make_test_pdf(), 'medium', mode='mrc')
+
+
+class FontOptimizationTestCase(TestCase):
+    def test_duplicate_fonts_are_merged_and_subset(self):
+        """Test that the same embedded font from two merged sources is stored once, subset"""
+        from pdfapp.utils.profiler import font_files
+
+        font_buffer = fitz.Font('cjk').buffer  # Large font shipped with PyMuPDF
+        merged = fitz.open()
+        for text in ('First source', 'Second source'):
+            doc = fitz.open()
+            page = doc.new_page()
+            page.insert_font(fontname='F0', fontbuffer=font_buffer)
+            page.insert_text((72, 72), text, fontname='F0')
+            with fitz.open(stream=pdf_bytes(doc), filetype='pdf') as source:
+                merged.insert_pdf(source)
+        data = pdf_bytes(merged)
+
+        output = PDFProcessor.basic_compress_pdf(pdf_upload(data, 'merged.pdf'), 'medium')
+        self.assertTrue(any(entry['saved_bytes'] > 0 for entry in output.font_report))
+        self.assertLess(len(output.getvalue()), len(data))
+
+        result = fitz.open(stream=output.getvalue(), filetype='pdf')
+        self.assertEqual(len({font_xref for _, _, font_xref, _ in font_files(result)}), 1)
+        self.assertIn('Second source', result[1].get_text())
+        result.close()
+
+
+class PDFWriterTestCase(TestCase):
+    def test_profiles(self):
+        """Test that compact output drops unused objects and web output is linearized where MuPDF can"""
+        from pdfapp.utils.pdf_writer import linearization_supported, write_options, write_pdf
+
+        doc = fitz.open(stream=make_test_pdf(5).read(), filetype='pdf')
+        orphan = doc.get_new_xref()
+        doc.update_object(orphan, '<</Unused true>>')
+
+        fast = write_pdf(doc, 'fast').getvalue()
+        compact = write_pdf(doc, 'compact').getvalue()
+        self.assertLess(len(compact), len(fast))
+        self.assertNotIn(b'/Unused', compact)
+
+        with override_settings(PDF_WRITER_PROFILE='web'):
+            output = write_pdf(doc)
+            web = fitz.open(stream=output.getvalue(), filetype='pdf')
+            if linearization_supported():
+                self.assertTrue(web.is_fast_webaccess)
+                self.assertFalse(hasattr(output, 'writer_fallback'))
+            else:
+                # Newer MuPDF releases dropped linearization: the downgrade is reported
+                self.assertEqual(output.writer_fallback, ['linear'])
+            web.close()
+        doc.close()
+
+        # Operations can only add work on top of the profile
+        self.assertEqual(write_options('compact', garbage=4, clean=True)['garbage'], 4)
+        self.assertEqual(write_options('compact', garbage=1)['garbage'], 3)
+
+    @override_settings(PDF_WRITER_PROFILE='compact')
+    def test_operations_use_profile(self):
+        """Test that rotate, secure and unlock are written with the writer profile"""
+        rotated = PDFProcessor.rotate_pages(make_test_pdf(3), {'1': 90}).getvalue()
+        self.assertIn(b'/ObjStm', rotated)
+
+        secured = PDFProcessor.secure_pdf(make_test_pdf(3), 'secret')
+        with fitz.open(stream=secured.getvalue(), filetype='pdf') as doc:
+            self.assertTrue(doc.needs_pass)
+            self.assertTrue(doc.authenticate('secret'))
+        self.assertEqual(secured.writer_fallback, ['use_objstms'])  # MuPDF cannot encrypt object streams
+
+        secured.seek(0)
+        unlocked = PDFProcessor.unlock_pdf(pdf_upload(secured.read(), 'locked.pdf'), 'secret')
+        with fitz.open(stream=unlocked.getvalue(), filetype='pdf') as doc:
+            self.assertFalse(doc.needs_pass)
+            self.assertEqual(doc.page_count, 3)
+
+    def test_fallback_is_reported(self):
+        """Test that options MuPDF refuses are dropped, recorded on the output and sent as a header"""
+        from pdfapp.utils.pdf_writer import _with_fallback
+        from pdfapp.utils.streaming import file_streaming_response
+
+        def write(options):
+            if options.get('use_objstms'):
+                raise ValueError('object streams not supported')
+            return BytesIO(b'%PDF-1.7')
+
+        output, dropped = _with_fallback(write, {'garbage': 3, 'use_objstms': 1})
+        self.assertEqual(dropped, ['use_objstms'])
+        output.writer_fallback = dropped
+        response = file_streaming_response(output, 'out.pdf', 'application/pdf')
+        self.assertEqual(response['X-Writer-Fallback'], 'use_objstms')
+
+
+def contract_pdf():
+    """Three pages of text with a 288 dpi image, written with uncompressed content streams"""
+    png = BytesIO()
+    Image.linear_gradient('L').resize((800, 800)).convert('RGB').save(png, format='PNG')
+    doc = fitz.open()
+    for i in range(3):
+        page = doc.new_page()
+        for line in range(40):
+            page.insert_text((72, 72 + line * 16), f'Clause {i}.{line}: the parties agree to the terms')
+        page.insert_image(fitz.Rect(300, 500, 500, 700), stream=png.getvalue())
+    return pdf_bytes(doc)
+
+
+class LosslessCompressionTestCase(TestCase):
+    def test_lossless_keeps_content_identical(self):
+        """Test that lossless quality shrinks streams without changing text or image pixels"""
+        data = contract_pdf()
+        with fitz.open(stream=data, filetype='pdf') as doc:
+            original_pixels = fitz.Pixmap(doc, doc[0].get_images()[0][0]).samples
+
+        output = PDFProcessor.compress_pdf(pdf_upload(data, 'contract.pdf'), 'lossless', mode='rasterize')
+        self.assertLess(len(output.getvalue()), len(data))
+
+        original = fitz.open(stream=data, filetype='pdf')
+        result = fitz.open(stream=output.getvalue(), filetype='pdf')
+        self.assertEqual([page.get_text() for page in original], [page.get_text() for page in result])
+        self.assertEqual(fitz.Pixmap(result, result[0].get_images()[0][0]).samples, original_pixels)
+        original.close()
+        result.close()
+
+    def test_pipeline_lossless_leaves_images_alone(self):
+        """Test that a lossless pipeline compress step re-deflates streams even in images mode"""
+        from pdfapp.utils.pdf_helpers import PDFPipeline
+
+        data = contract_pdf()
+        output = PDFPipeline.run([pdf_upload(data, 'contract.pdf')],
+                                 [{'step': 'compress', 'mode': 'images', 'quality': 'lossless'}])
+        self.assertLess(len(output.getvalue()), len(data))
+
+        original = fitz.open(stream=data, filetype='pdf')
+        result = fitz.open(stream=output.getvalue(), filetype='pdf')
+        original_image = fitz.Pixmap(original, original[0].get_images()[0][0])
+        result_image = fitz.Pixmap(result, result[0].get_images()[0][0])
+        self.assertEqual((result_image.width, result_image.height), (original_image.width, original_image.height))
+        self.assertEqual(result_image.samples, original_image.samples)
+        self.assertEqual([page.get_text() for page in original], [page.get_text() for page in result])
+        original.close()
+        result.close()
+
+    def test_one_shot_inputs_are_not_kept_open(self):
+        """Test that per-page and per-stream worker tasks leave nothing in the worker's document cache"""
+        from pdfapp.utils.document_cache import document_cache
+        from pdfapp.utils.pdf_helpers import COMPRESSION_PRESETS
+        from pdfapp.utils.size_estimate import _measure_page
+
+        fd, path = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(scanned_pdf(Image.linear_gradient('L').convert('RGB')))
+        self.addCleanup(os.unlink, path)
+
+        document_cache.clear()
+        PDFProcessor._compress_page(path, 0, COMPRESSION_PRESETS['medium'])
+        PDFProcessor._mrc_page(path, 0, COMPRESSION_PRESETS['medium'])
+        PDFProcessor._deflate_stream_batch(path, PDFProcessor._stream_batches(path, 1)[0])
+        _measure_page(path, 0, (0.5,), (50,))
+        self.assertEqual(len(document_cache._entries), 0)
+
+    def test_cached_documents_follow_the_file_on_disk(self):
+        """Test that the document cache closes entries whose file was deleted or rewritten"""
+        from pdfapp.utils.document_cache import DocumentCache
+
+        cache = DocumentCache(max_documents=4)
+        paths = []
+        for pages in (1, 2):
+            fd, path = tempfile.mkstemp(suffix='.pdf')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(make_test_pdf(pages).read())
+            paths.append(path)
+        self.addCleanup(lambda: [os.unlink(path) for path in paths if os.path.exists(path)])
+
+        with cache.open(paths[0]) as doc:
+            deleted = doc
+        os.unlink(paths[0])
+        with cache.open(paths[1]) as doc:
+            self.assertEqual(len(doc), 2)
+        self.assertTrue(deleted.is_closed)
+        self.assertEqual(list(cache._entries), [paths[1]])
+
+        with open(paths[1], 'wb') as f:
+            f.write(make_test_pdf(3).read())
+        os.utime(paths[1], ns=(0, 0))
+        with cache.open(paths[1]) as doc:
+            self.assertEqual(len(doc), 3)
+        with self.assertRaises(FileNotFoundError):
+            with cache.open(paths[0]):
+                pass
+
+
+class MergeEngineTestCase(TestCase):
+    def test_engines_agree_and_temporary_output_is_removed(self):
+        """Test that both merge engines keep page order and the fitz output file is deleted once closed"""
+        from pdfapp.utils.pdf_writer import TemporaryOutput
+
+        page_texts = {}
+        for engine in ('pypdf', 'fitz'):
+            output = PDFProcessor.merge_pdfs([make_test_pdf(2), make_test_pdf(3)], engine=engine)
+            output.seek(0)
+            with fitz.open(stream=output.read(), filetype='pdf') as merged:
+                page_texts[engine] = [page.get_text() for page in merged]
+            if engine == 'fitz':
+                self.assertIsInstance(output, TemporaryOutput)
+                output.close()
+                self.assertFalse(os.path.exists(output.path))
+
+        self.assertEqual(len(page_texts['fitz']), 5)
+        self.assertEqual(page_texts['fitz'], page_texts['pypdf'])
+
+    def test_encrypted_input_is_reported(self):
+        """Test that a password-protected input names the offending file"""
+        with self.assertRaisesMessage(Exception, 'locked.pdf'):
+            PDFProcessor.merge_pdfs([make_test_pdf(), encrypted_pdf()], engine='fitz')
+
+
+class MergePreflightTestCase(TestCase):
+    def test_bad_inputs_are_reported_per_file(self):
+        """Test that preflight reports broken and encrypted inputs before merging"""
+        from pdfapp.utils.preflight import preflight_pdfs, preflight_error
+
+        ok, report = preflight_pdfs([make_test_pdf(2), make_test_pdf(3)])
+        self.assertTrue(ok)
+        self.assertEqual([entry['pages'] for entry in report], [2, 3])
+        self.assertEqual({entry['status'] for entry in report}, {'ok'})
+
+        ok, report = preflight_pdfs([make_test_pdf(), encrypted_pdf()])
+        self.assertFalse(ok)
+        self.assertTrue(report[1]['encrypted'])
+        self.assertIn('locked.pdf', preflight_error(report))
+
+        ok, report = preflight_pdfs([pdf_upload(b'plain text, not a PDF', 'notes.pdf')])
+        self.assertFalse(ok)
+        self.assertIn('%PDF', report[0]['error'])
@@ -0,0 +1,128 @@
+"""
+Per-process LRU of parsed PyMuPDF documents for NexaPDF
+Opening a PDF means parsing its xref and page tree, so work that touches the
+same file over and over (thumbnails and page sizes of stored documents) keeps
+the parsed document warm here instead of re-opening it every time.
+Only long-lived files belong here. Every pool worker has its own cache that
+the web process cannot clear, so each lookup re-checks every cached file and
+closes documents whose file was deleted or rewritten since it was opened.
+"""
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import fitz
+from django.conf import settings
+
+
+class DocumentCache:
+    """Thread-safe LRU of open fitz documents keyed by file path"""
+
+    def __init__(self, max_documents=None):
+        self._max_documents = max_documents
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    @property
+    def max_documents(self):
+        if self._max_documents is not None:
+            return self._max_documents
+        return getattr(settings, 'DOCUMENT_CACHE_SIZE', 8)
+
+    @staticmethod
+    def _file_id(path):
+        """Identity of the file at path, or None if it no longer exists"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def _prune(self):
+        """Close documents whose file was deleted or changed on disk"""
+        with self._lock:
+            stale = [path for path, entry in self._entries.items() if self._file_id(path) != entry['file_id']]
+            entries = [self._entries.pop(path) for path in stale]
+        for entry in entries:
+            self._close_entry(entry)
+
+    def _get_entry(self, path, file_id):
+        """Return the entry for path, replacing it if the file on disk changed"""
+        stale = None
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry['file_id'] != file_id:
+                stale, entry = self._entries.pop(path), None
+            if entry is None:
+                entry = {'document': None, 'lock': threading.Lock(), 'file_id': file_id}
+                self._entries[path] = entry
+            self._entries.move_to_end(path)
+
+        if stale is not None:
+            self._close_entry(stale)
+        return entry
+
+    @staticmethod
+    def _close_entry(entry):
+        # Wait for a current user to finish before closing under them
+        with entry['lock']:
+            if entry['document'] is not None:
+                entry['document'].close()
+                entry['document'] = None
+
+    def _trim(self):
+        with self._lock:
+            evicted = []
+            while len(self._entries) > self.max_documents:
+                _, entry = self._entries.popitem(last=False)
+                evicted.append(entry)
+        for entry in evicted:
+            self._close_entry(entry)
+
+    @contextmanager
+    def open(self, path):
+        """Check out a parsed document for exclusive use
+
+        Usage:
+            with document_cache.open(pdf_path) as doc:
+                page = doc[0]
+        """
+        path = str(path)
+        if self.max_documents <= 0:
+            doc = fitz.open(path)
+            try:
+                yield doc
+            finally:
+                doc.close()
+            return
+
+        self._prune()
+        file_id = self._file_id(path)
+        if file_id is None:
+            raise FileNotFoundError(f"No such file: '{path}'")
+        entry = self._get_entry(path, file_id)
+
+        # fitz documents are not safe to use from two threads at once
+        with entry['lock']:
+            if entry['document'] is None:
+                entry['document'] = fitz.open(path)
+            yield entry['document']
+
+        self._trim()
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+        for entry in entries:
+            self._close_entry(entry)
+
+
+# Global document cache instance (one per web/pool worker process)
+document_cache = DocumentCache()
+
+
+def open_document(path):
+    """Check out a cached fitz document; use as a context manager"""
+    return document_cache.open(path)
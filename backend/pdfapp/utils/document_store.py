@@ -0,0 +1,91 @@
+"""
+Upload-once document store for NexaPDF
+Uploaded PDFs are kept under MEDIA_ROOT/temp/documents and addressed by a
+random UUID. Every access refreshes the file's mtime, so a document lives
+until it has been unused for TEMP_FILE_CLEANUP_MINUTES and the
+FileCleanupManager sweeps it.
+"""
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+
+def get_documents_dir():
+    documents_dir = Path(settings.MEDIA_ROOT) / 'temp' / 'documents'
+    documents_dir.mkdir(parents=True, exist_ok=True)
+    return documents_dir
+
+
+def document_ttl_seconds():
+    """How long a stored document survives without being used"""
+    return getattr(settings, 'TEMP_FILE_CLEANUP_MINUTES', 30) * 60
+
+
+def _paths(document_id):
+    documents_dir = get_documents_dir()
+    return documents_dir / f'{document_id}.pdf', documents_dir / f'{document_id}.json'
+
+
+def store_document(uploaded_file, metadata=None):
+    """Save an uploaded file and return its new document ID"""
+    document_id = str(uuid.uuid4())
+    data_path, meta_path = _paths(document_id)
+
+    uploaded_file.seek(0)
+    with open(data_path, 'wb') as f:
+        for chunk in uploaded_file.chunks():
+            f.write(chunk)
+    uploaded_file.seek(0)
+
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        stored = {'name': uploaded_file.name, **(metadata or {})}
+        if getattr(uploaded_file, 'sha256', None):
+            stored['sha256'] = uploaded_file.sha256
+        json.dump(stored, f)
+
+    return document_id
+
+
+def _valid_id(document_id):
+    try:
+        return str(uuid.UUID(str(document_id)))
+    except ValueError:
+        return None
+
+
+def get_document(document_id):
+    """Return (path, metadata) for a stored document and extend its lifetime
+    Returns None when the ID is unknown or the document has expired.
+    """
+    document_id = _valid_id(document_id)
+    if not document_id:
+        return None
+
+    data_path, meta_path = _paths(document_id)
+    try:
+        if time.time() - data_path.stat().st_mtime > document_ttl_seconds():
+            return None
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            metadata = json.load(f)
+        now = time.time()
+        os.utime(data_path, (now, now))
+        os.utime(meta_path, (now, now))
+    except (OSError, ValueError):
+        return None
+
+    return data_path, metadata
+
+
+def delete_document(document_id):
+    document_id = _valid_id(document_id)
+    if not document_id:
+        return
+    for path in _paths(document_id):
+        try:
+            path.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,266 @@
+"""
+Process-pool execution backend for NexaPDF
+PDF work is CPU-bound and the helpers are plain static methods, so they are
+dispatched to a pool of warm worker processes that have already imported
+PyMuPDF, pypdf, reportlab and Pillow. With PDF_EXECUTOR_WORKERS=0 every task
+runs inline on the calling thread, exactly as before.
+"""
+import atexit
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TaskTimeout
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+from django.conf import settings
+
+from pdfapp.utils.ingest import UploadPath, upload_path, upload_buffer
+
+
+# Set inside pool workers so nested helpers run inline instead of re-dispatching
+_in_worker = False
+
+
+def _init_worker(memory_limit_mb):
+    """Pool worker initializer: cap memory and warm up the PDF libraries"""
+    global _in_worker
+    _in_worker = True
+
+    if memory_limit_mb:
+        try:
+            import resource
+            limit = int(memory_limit_mb) * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError) as e:
+            print(f"Could not apply worker memory limit: {e}")
+
+    import fitz  # noqa: F401
+    import pypdf  # noqa: F401
+    import reportlab.pdfgen.canvas  # noqa: F401
+    from PIL import Image  # noqa: F401
+    import pdfapp.utils.pdf_helpers  # noqa: F401
+
+
+def _run_task(func, args, kwargs):
+    """Run one task in the process executing it, after releasing that process's idle OCR readers"""
+    from pdfapp.utils.ocr_pool import ocr_reader_pool
+
+    try:
+        ocr_reader_pool.evict_idle()
+    except Exception as e:
+        print(f"Error releasing idle OCR readers: {e}")
+    return func(*args, **kwargs)
+
+
+class DeadlineReached(Exception):
+    """A caller's deadline passed before the task it was waiting for finished"""
+
+
+def in_worker_process():
+    """True when running inside a PDF executor worker process"""
+    return _in_worker
+
+
+def make_portable(value):
+    """Replace uploaded files with picklable stand-ins (paths or in-memory copies) for the worker"""
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        # NamedTuples (e.g. encoded pages) take their fields positionally
+        return type(value)(*(make_portable(item) for item in value))
+
+    if isinstance(value, (list, tuple)):
+        return type(value)(make_portable(item) for item in value)
+
+    if isinstance(value, dict):
+        return {key: make_portable(item) for key, item in value.items()}
+
+    if hasattr(value, 'read') and hasattr(value, 'seek') and not isinstance(value, (BytesIO, UploadPath)):
+        # Uploads already on disk travel as their path; the worker opens the file itself
+        path = upload_path(value)
+        if path:
+            return UploadPath(path, getattr(value, 'name', None))
+
+        buffer = BytesIO(upload_buffer(value))
+        # BytesIO pickles its __dict__, so the helpers still see name/size
+        buffer.name = getattr(value, 'name', None)
+        buffer.size = buffer.getbuffer().nbytes
+        return buffer
+
+    return value
+
+
+class PDFTaskExecutor:
+    """Lazily created, per-process ProcessPoolExecutor for PDF operations
+
+    Workers are recycled by replacing the whole pool once it has run
+    PDF_EXECUTOR_MAX_TASKS_PER_CHILD tasks per worker; ProcessPoolExecutor's
+    own max_tasks_per_child can deadlock when a worker exits (Python 3.11).
+    A task that outlives PDF_EXECUTOR_TASK_TIMEOUT takes its pool down with
+    it, so it cannot keep holding a worker after the caller has given up.
+    """
+
+    def __init__(self):
+        self._executor = None
+        self._submitted = 0
+        self._lock = threading.Lock()
+
+    @property
+    def max_workers(self):
+        workers = getattr(settings, 'PDF_EXECUTOR_WORKERS', 0)
+        return max(0, int(workers))
+
+    @property
+    def enabled(self):
+        return self.max_workers > 0 and not in_worker_process()
+
+    @property
+    def task_timeout(self):
+        return getattr(settings, 'PDF_EXECUTOR_TASK_TIMEOUT', None) or None
+
+    @property
+    def recycle_after(self):
+        """Tasks a pool runs before it is replaced by fresh workers (0 = never)"""
+        tasks_per_child = getattr(settings, 'PDF_EXECUTOR_MAX_TASKS_PER_CHILD', 0) or 0
+        return tasks_per_child * self.max_workers
+
+    def get_executor(self):
+        """Create the pool on first use, and a fresh one once it is due for recycling"""
+        retired = None
+        with self._lock:
+            if self._executor is not None and self.recycle_after and self._submitted >= self.recycle_after:
+                retired, self._executor = self._executor, None
+
+            if self._executor is None:
+                context = multiprocessing.get_context('forkserver')
+                # Preloaded modules are imported once in the fork server, so
+                # every worker forked from it starts with them warm.
+                context.set_forkserver_preload(['pdfapp.utils.pdf_helpers'])
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=context,
+                    initializer=_init_worker,
+                    initargs=(getattr(settings, 'PDF_EXECUTOR_MEMORY_LIMIT_MB', 0),),
+                )
+                self._submitted = 0
+
+            self._submitted += 1
+            executor = self._executor
+
+        if retired is not None:
+            # The old pool finishes the tasks it already has, then its workers exit
+            retired.shutdown(wait=False)
+        return executor
+
+    def submit(self, func, *args, **kwargs):
+        """Submit a task to the pool and return its Future"""
+        return self.get_executor().submit(_run_task, func, make_portable(args), make_portable(kwargs))
+
+    def result(self, future, deadline=None):
+        """Wait for a task's result for at most PDF_EXECUTOR_TASK_TIMEOUT seconds
+        deadline: time.monotonic() value; if it comes first DeadlineReached is raised
+        and the task is cancelled, or left to finish if it has already started
+        """
+        if deadline is not None:
+            remaining = max(0.0, deadline - time.monotonic())
+            if self.task_timeout is None or remaining < self.task_timeout:
+                try:
+                    return future.result(timeout=remaining)
+                except TaskTimeout:
+                    future.cancel()
+                    raise DeadlineReached()
+
+        try:
+            return future.result(timeout=self.task_timeout)
+        except TaskTimeout:
+            if not future.cancel():
+                # Still running in a worker: stop the pool's workers rather than leave it busy
+                self.reset(terminate=True)
+            raise Exception(f"PDF processing took longer than {self.task_timeout} seconds")
+
+    def run(self, func, *args, **kwargs):
+        """Run func in a worker process and wait for its result"""
+        if not self.enabled:
+            return _run_task(func, args, kwargs)
+
+        try:
+            return self.result(self.submit(func, *args, **kwargs))
+        except BrokenProcessPool:
+            self.reset()
+            raise Exception("PDF worker process stopped unexpectedly (the file may exceed the memory limit)")
+
+    def map_ordered(self, func, args_list, window=None, deadline=None):
+        """Run func(*args) for each args tuple in the pool, yielding results in input order
+
+        At most `window` tasks are in flight at once so results that the caller
+        has not consumed yet cannot pile up in memory. Once the optional
+        deadline (a time.monotonic() value) passes, iteration stops early and
+        tasks that have not started are cancelled.
+        """
+        if not self.enabled:
+            for args in args_list:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                yield _run_task(func, args, {})
+            return
+
+        window = window or self.max_workers * 2
+        pending = deque()
+        try:
+            for args in args_list:
+                pending.append(self.submit(func, *args))
+                if len(pending) >= window:
+                    yield self.result(pending.popleft(), deadline)
+            while pending:
+                yield self.result(pending.popleft(), deadline)
+        except DeadlineReached:
+            return
+        except BrokenProcessPool:
+            self.reset()
+            raise Exception("PDF worker process stopped unexpectedly (the file may exceed the memory limit)")
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def reset(self, terminate=False):
+        """Discard the pool so the next task starts a fresh one
+        terminate: also stop its worker processes; tasks other threads have
+        running in them fail with BrokenProcessPool
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is None:
+            return
+
+        processes = list((getattr(executor, '_processes', None) or {}).values()) if terminate else []
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+# Global executor instance (one pool per web/job worker process)
+pdf_executor = PDFTaskExecutor()
+atexit.register(pdf_executor.shutdown)
+
+
+def run_pdf_task(func, *args, **kwargs):
+    """Run a PDFProcessor / DocumentConverter / PDFOrganizer call on the process pool"""
+    return pdf_executor.run(func, *args, **kwargs)
+
+
+def map_pdf_tasks(func, args_list, window=None, deadline=None):
+    """Fan independent calls out over the process pool, yielding results in order
+    (stopping early once the optional time.monotonic() deadline has passed)
+    """
+    return pdf_executor.map_ordered(func, args_list, window, deadline)
+
+
+def parallel_worker_count():
+    """Number of processes available for page-level fan-out (1 when running inline)"""
+    return pdf_executor.max_workers if pdf_executor.enabled else 1
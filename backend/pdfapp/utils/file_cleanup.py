@@ -30,6 +30,7 @@ class FileCleanupManager:
         while self.running:
             try:
                 self.cleanup_old_files()
+                self.release_idle_resources()
                 time.sleep(300)  # Check every 5 minutes
             except Exception as e:
                 print(f"Error in cleanup loop: {e}")
@@ -67,6 +68,16 @@ class FileCleanupManager:
         except Exception as e:
             print(f"Error during file cleanup: {e}")
     
+    def release_idle_resources(self):
+        """Free caches that have not been used recently
+        Idle OCR readers live in the pool workers and are released there, before each task
+        """
+        try:
+            from pdfapp.utils.result_cache import result_cache
+            result_cache.evict()
+        except Exception as e:
+            print(f"Error evicting cached results: {e}")
+    
     @staticmethod
     def create_temp_file(suffix='', prefix='pdf_'):
         """Create a temporary file and return its path"""
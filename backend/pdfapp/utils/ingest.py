@@ -0,0 +1,140 @@
+"""
+Upload ingestion helpers for NexaPDF
+Django spools large uploads to disk (TemporaryUploadedFile) and keeps small
+ones in memory. These helpers hand either kind to PyMuPDF and poppler without
+extra copies: files already on disk are opened by path, and in-memory files
+are passed as the buffer they already live in.
+"""
+import io
+import os
+import tempfile
+from contextlib import contextmanager
+
+import fitz
+
+
+class UploadPath:
+    """Picklable stand-in for an upload that is already on disk
+
+    Pool workers receive the path instead of a pickled copy of the contents
+    and open the file themselves on first read.
+    """
+
+    def __init__(self, path, name=None, size=None):
+        self.path = path
+        self.name = name or os.path.basename(path)
+        self.size = os.path.getsize(path) if size is None else size
+        self._file = None
+
+    def __getstate__(self):
+        return {'path': self.path, 'name': self.name, 'size': self.size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._file = None
+
+    def temporary_file_path(self):
+        return self.path
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, 'rb')
+        return self._file
+
+    def read(self, size=-1):
+        return self._open().read(size)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._open().seek(offset, whence)
+
+    def tell(self):
+        return self._open().tell()
+
+    def chunks(self, chunk_size=64 * 1024):
+        self.seek(0)
+        while True:
+            chunk = self.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def upload_path(uploaded_file):
+    """Path of the file's contents on disk, or None when it only exists in memory"""
+    if hasattr(uploaded_file, 'temporary_file_path'):
+        return uploaded_file.temporary_file_path()
+
+    # django File objects wrapping an open disk file (stored documents, job inputs)
+    inner = getattr(uploaded_file, 'file', uploaded_file)
+    if isinstance(inner, (io.BufferedReader, io.FileIO)):
+        path = getattr(inner, 'name', None)
+        if isinstance(path, str) and os.path.isfile(path):
+            return path
+
+    return None
+
+
+def upload_buffer(uploaded_file):
+    """Contents of an upload as bytes, reusing the in-memory buffer where there is one"""
+    inner = getattr(uploaded_file, 'file', uploaded_file)
+    if isinstance(inner, io.BytesIO):
+        # getvalue() hands back the BytesIO's own buffer rather than a copy
+        return inner.getvalue()
+
+    uploaded_file.seek(0)
+    data = uploaded_file.read()
+    uploaded_file.seek(0)
+    return data
+
+
+def open_pdf(uploaded_file):
+    """Open an upload with PyMuPDF - by path when it is on disk, from its buffer otherwise"""
+    path = upload_path(uploaded_file)
+    if path:
+        return fitz.open(path, filetype='pdf')
+
+    data = upload_buffer(uploaded_file)
+    if not data:
+        raise Exception("PDF file is empty or could not be read")
+    return fitz.open(stream=data, filetype='pdf')
+
+
+@contextmanager
+def local_pdf_path(uploaded_file, suffix='.pdf'):
+    """Yield a path to the upload's contents for tools that need a file name
+    Only in-memory uploads are written to a temporary file (removed afterwards).
+    """
+    path = upload_path(uploaded_file)
+    if path:
+        yield path
+        return
+
+    fd, temp_path = tempfile.mkstemp(suffix=suffix)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(upload_buffer(uploaded_file))
+        yield temp_path
+    finally:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+
+
+@contextmanager
+def working_pdf_path():
+    """Yield the path of an empty temporary file that pool tasks build a PDF in, removed afterwards"""
+    fd, temp_path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        yield temp_path
+    finally:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
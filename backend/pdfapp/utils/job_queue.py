@@ -0,0 +1,226 @@
+"""
+Database-backed background job queue for NexaPDF
+Jobs are rows in ProcessingJob; inputs and results live under
+MEDIA_ROOT/temp/jobs so FileCleanupManager expires them like any other
+temporary file. No external broker is required. Passwords in job params are
+stored encrypted (seal_params) and dropped once the job has run.
+"""
+import threading
+import time
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections
+from django.utils import timezone
+
+from pdfapp.models import ProcessingJob
+from pdfapp.utils.operations import dispatch_operation, scrub_params, seal_params, unseal_params
+
+
+def get_job_dir(job_id):
+    """Return (and create) the working directory for a job"""
+    job_dir = Path(settings.MEDIA_ROOT) / 'temp' / 'jobs' / str(job_id)
+    job_dir.mkdir(parents=True, exist_ok=True)
+    return job_dir
+
+
+def _safe_name(filename):
+    return Path(filename).name.replace(' ', '_') or 'file'
+
+
+def enqueue_job(operation, files, params=None, user=None, session_key=''):
+    """Store the uploaded files and queue an operation
+    Returns the created ProcessingJob
+    """
+    job = ProcessingJob(
+        operation=operation,
+        params=seal_params(params or {}),
+        user=user if user is not None and user.is_authenticated else None,
+        session_key=session_key or '',
+    )
+    job_dir = get_job_dir(job.id)
+
+    input_files = []
+    for i, uploaded_file in enumerate(files):
+        file_path = job_dir / f"input_{i}_{_safe_name(uploaded_file.name)}"
+        uploaded_file.seek(0)
+        with open(file_path, 'wb') as f:
+            for chunk in uploaded_file.chunks():
+                f.write(chunk)
+        input_files.append({'path': str(file_path), 'name': uploaded_file.name})
+
+    job.input_files = input_files
+    # A new row: the insert can never overwrite a job another worker has touched
+    job.save(force_insert=True)
+
+    job_runner.ensure_started()
+    job_runner.notify()
+    return job
+
+
+def fail_stale_jobs():
+    """Mark jobs running for longer than JOB_RUNNING_TIMEOUT_SECONDS as failed
+    Their worker died (process restart, OOM kill) without finishing them. They are
+    not requeued: a job that brought its worker down would take the next one with it.
+    Returns the number of jobs marked failed
+    """
+    cutoff = timezone.now() - timedelta(seconds=getattr(settings, 'JOB_RUNNING_TIMEOUT_SECONDS', 3600))
+    failed = 0
+    for job in ProcessingJob.objects.filter(status='running', started_at__lt=cutoff):
+        failed += ProcessingJob.objects.filter(id=job.id, status='running').update(
+            status='failed',
+            error_message='The job was interrupted, please submit it again',
+            params=scrub_params(job.params),
+            finished_at=timezone.now(),
+        )
+    if failed:
+        print(f"Marked {failed} interrupted job(s) as failed")
+    return failed
+
+
+def claim_next_job():
+    """Atomically move the oldest queued job to running
+    Safe to call from several threads or processes at once.
+    """
+    fail_stale_jobs()
+    queued_ids = ProcessingJob.objects.filter(status='queued').order_by('created_at').values_list('id', flat=True)[:10]
+    for job_id in queued_ids:
+        claimed = ProcessingJob.objects.filter(id=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if claimed:
+            return ProcessingJob.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    """Execute a claimed job and store its result"""
+    open_files = []
+    try:
+        for input_file in job.input_files:
+            if not Path(input_file['path']).exists():
+                raise ValueError("Input file has expired, please upload it again")
+            open_files.append(File(open(input_file['path'], 'rb'), name=input_file['name']))
+
+        # The job thread only waits; the work itself runs in pool worker processes
+        output, filename, content_type = dispatch_operation(job.operation, open_files, unseal_params(job.params))
+
+        result_path = get_job_dir(job.id) / f"result_{_safe_name(filename)}"
+        with open(result_path, 'wb') as f:
+            output.seek(0)
+            while True:
+                chunk = output.read(1024 * 1024)
+                if not chunk:
+                    break
+                f.write(chunk)
+        output.close()  # Releases temporary output files
+
+        job.status = 'completed'
+        job.result_path = str(result_path)
+        job.result_filename = filename
+        job.content_type = content_type
+
+    except Exception as e:
+        print(f"Job {job.id} ({job.operation}) failed: {e}")
+        traceback.print_exc()
+        job.status = 'failed'
+        job.error_message = str(e)
+
+    finally:
+        for open_file in open_files:
+            try:
+                open_file.close()
+            except Exception:
+                pass
+        for input_file in job.input_files:
+            try:
+                Path(input_file['path']).unlink()
+            except OSError:
+                pass
+
+    # Passwords are only needed while the job runs
+    job.params = scrub_params(job.params)
+    job.finished_at = timezone.now()
+    # Only a job still marked running is ours to finish; fail_stale_jobs may have reaped it
+    finished = ProcessingJob.objects.filter(id=job.id, status='running').update(
+        status=job.status,
+        result_path=job.result_path,
+        result_filename=job.result_filename,
+        content_type=job.content_type,
+        error_message=job.error_message,
+        params=job.params,
+        finished_at=job.finished_at,
+    )
+    if not finished:
+        print(f"Job {job.id} ({job.operation}) was reaped while running, discarding its result")
+        if job.result_path:
+            Path(job.result_path).unlink(missing_ok=True)
+        job.refresh_from_db()
+    return job
+
+
+def process_pending_jobs(limit=None):
+    """Run queued jobs on the calling thread until the queue is empty
+    Returns the number of jobs processed
+    """
+    processed = 0
+    while limit is None or processed < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
+
+
+class JobRunner:
+    """In-process worker threads that drain the job queue"""
+
+    def __init__(self):
+        self.threads = []
+        self.running = False
+        self.wakeup = threading.Event()
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        """Start worker threads on first use (JOB_WORKER_THREADS=0 leaves jobs to run_job_worker)"""
+        thread_count = getattr(settings, 'JOB_WORKER_THREADS', 1)
+        with self._lock:
+            if self.running or thread_count <= 0:
+                return
+            self.running = True
+            for i in range(thread_count):
+                thread = threading.Thread(target=self._worker_loop, name=f"pdf-job-worker-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+
+    def stop(self):
+        """Stop worker threads after their current job"""
+        self.running = False
+        self.wakeup.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+
+    def notify(self):
+        """Wake idle workers because a job was queued"""
+        self.wakeup.set()
+
+    def _worker_loop(self):
+        poll_seconds = getattr(settings, 'JOB_POLL_INTERVAL_SECONDS', 5)
+        while self.running:
+            try:
+                close_old_connections()
+                if process_pending_jobs() == 0:
+                    self.wakeup.wait(timeout=poll_seconds)
+                    self.wakeup.clear()
+            except Exception as e:
+                print(f"Error in job worker loop: {e}")
+                time.sleep(poll_seconds)
+
+
+# Global job runner instance
+job_runner = JobRunner()
@@ -0,0 +1,117 @@
+"""
+Process-wide EasyOCR reader pool for NexaPDF
+Readers are expensive to build (detection + recognition models), so each
+worker process loads one per language set on first use and reuses it.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from django.conf import settings
+
+
+class OCRReaderPool:
+    """Lazily loaded, thread-safe cache of EasyOCR readers keyed by language set"""
+
+    def __init__(self, reader_factory=None, idle_seconds=None):
+        self._reader_factory = reader_factory
+        self._idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    @staticmethod
+    def _make_key(languages, gpu):
+        """Normalize a language list so ['fr', 'en'] and ['en', 'fr'] share a reader"""
+        if isinstance(languages, str):
+            languages = [languages]
+        return tuple(sorted(set(languages))), bool(gpu)
+
+    def _get_idle_seconds(self):
+        if self._idle_seconds is not None:
+            return self._idle_seconds
+        return getattr(settings, 'OCR_READER_IDLE_MINUTES', 30) * 60
+
+    def _create_reader(self, languages, gpu):
+        if self._reader_factory:
+            return self._reader_factory(list(languages), gpu)
+
+        try:
+            import easyocr
+        except ImportError:
+            raise Exception("OCR functionality requires 'easyocr' package. Install with: pip install easyocr")
+
+        return easyocr.Reader(list(languages), gpu=gpu, verbose=False)
+
+    def _get_entry(self, key):
+        """Return the pool entry for a key, creating an empty one if needed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {'reader': None, 'lock': threading.Lock(), 'last_used': time.time()}
+                self._entries[key] = entry
+            return entry
+
+    @contextmanager
+    def reader(self, languages=('en',), gpu=False):
+        """Check out a reader for exclusive use
+
+        Usage:
+            with ocr_reader_pool.reader(['en']) as reader:
+                results = reader.readtext(image)
+        """
+        key = self._make_key(languages, gpu)
+        self.evict_idle(exclude=key)
+        entry = self._get_entry(key)
+
+        # EasyOCR readers are not safe to share between threads mid-inference,
+        # so a checkout holds the entry lock until the caller is done.
+        with entry['lock']:
+            if entry['reader'] is None:
+                start_time = time.time()
+                entry['reader'] = self._create_reader(*key)
+                print(f"Loaded OCR reader for {list(key[0])} in {time.time() - start_time:.2f}s")
+            try:
+                yield entry['reader']
+            finally:
+                entry['last_used'] = time.time()
+
+    def evict_idle(self, exclude=None):
+        """Drop readers that have not been used within the idle window"""
+        cutoff = time.time() - self._get_idle_seconds()
+        evicted = []
+
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if key == exclude or entry['last_used'] > cutoff:
+                    continue
+                # Skip readers that are currently checked out
+                if not entry['lock'].acquire(blocking=False):
+                    continue
+                try:
+                    del self._entries[key]
+                    entry['reader'] = None
+                    evicted.append(key)
+                finally:
+                    entry['lock'].release()
+
+        for languages, gpu in evicted:
+            print(f"Evicted idle OCR reader for {list(languages)}")
+        return evicted
+
+    def clear(self):
+        """Release every loaded reader"""
+        with self._lock:
+            self._entries.clear()
+
+    def loaded_languages(self):
+        """Return the language sets that currently have a loaded reader"""
+        with self._lock:
+            return [list(key[0]) for key, entry in self._entries.items() if entry['reader'] is not None]
+
+
+# Global reader pool instance (one per worker process)
+ocr_reader_pool = OCRReaderPool()
+
+
+def get_ocr_reader(languages=('en',), gpu=False):
+    """Check out a pooled OCR reader; use as a context manager"""
+    return ocr_reader_pool.reader(languages, gpu)
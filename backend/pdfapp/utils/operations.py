@@ -0,0 +1,350 @@
+"""
+Operation registry for NexaPDF
+Maps operation names to the PDFProcessor / DocumentConverter / PDFOrganizer
+calls behind each endpoint so they can be run outside the request cycle
+(background jobs, batches).
+"""
+import base64
+import hashlib
+import json
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from io import BytesIO
+
+from cryptography.fernet import Fernet, InvalidToken
+from django.conf import settings
+from pypdf import PdfReader
+
+from pdfapp.utils.executor import pdf_executor, run_pdf_task, parallel_worker_count
+from pdfapp.utils.pdf_helpers import PDFProcessor, DocumentConverter, PDFOrganizer, PDFPipeline
+from pdfapp.utils.size_estimate import parse_size, compress_to_target
+
+
+PDF_CONTENT_TYPE = 'application/pdf'
+ZIP_CONTENT_TYPE = 'application/zip'
+DOCX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'
+PPTX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.presentationml.presentation'
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def _base_name(filename):
+    return filename.rsplit('.', 1)[0]
+
+
+def zip_outputs(outputs, name_template='page_{}.pdf'):
+    """Bundle a list of file-like outputs into a single zip archive"""
+    zip_buffer = BytesIO()
+    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
+        for i, output in enumerate(outputs):
+            output.seek(0)  # Reset pointer before reading
+            zip_file.writestr(name_template.format(i + 1), output.read())
+
+    zip_buffer.seek(0)
+    return zip_buffer
+
+
+def normalize_rotations(rotations):
+    """Convert rotation keys back to page numbers (JSON keys are strings)"""
+    return {int(page): int(angle) for page, angle in (rotations or {}).items()}
+
+
+def _merge(files, params):
+    return PDFProcessor.merge_pdfs(files), 'merged.pdf', PDF_CONTENT_TYPE
+
+
+def _split(files, params):
+    pdf_file = files[0]
+    outputs = PDFProcessor.split_pdf(pdf_file, params.get('split_type', 'each'), params.get('split_value'))
+    if len(outputs) == 1:
+        return outputs[0], f'split_{pdf_file.name}', PDF_CONTENT_TYPE
+    return zip_outputs(outputs), f'split_{pdf_file.name}.zip', ZIP_CONTENT_TYPE
+
+
+def _compress(files, params):
+    pdf_file = files[0]
+    if params.get('target_size'):
+        output, _ = compress_to_target(pdf_file, parse_size(params['target_size']))
+        return output, f'compressed_{pdf_file.name}', PDF_CONTENT_TYPE
+    output = PDFProcessor.compress_pdf(pdf_file, params.get('quality', 'medium'), params.get('mode', 'auto'))
+    return output, f'compressed_{pdf_file.name}', PDF_CONTENT_TYPE
+
+
+def _pdf_to_images(files, params):
+    pdf_file = files[0]
+    output = PDFProcessor.pdf_to_images(pdf_file, params.get('format', 'PNG'), int(params.get('dpi', 200)))
+    return output, f'{_base_name(pdf_file.name)}_images.zip', ZIP_CONTENT_TYPE
+
+
+def _extract_text(files, params):
+    pdf_file = files[0]
+    text_content = PDFProcessor.extract_text(pdf_file)
+    output = BytesIO(text_content.encode('utf-8'))
+    return output, f'{_base_name(pdf_file.name)}.txt', 'text/plain; charset=utf-8'
+
+
+def _watermark(files, params):
+    pdf_file = files[0]
+    if params.get('type', 'text') == 'image':
+        output = PDFProcessor.add_image_watermark(
+            pdf_file, files[1], params.get('position', 'center'), float(params.get('opacity', 0.3)),
+            float(params.get('scale', 1.0)), int(params.get('x_offset', 0)), int(params.get('y_offset', 0))
+        )
+    else:
+        output = PDFProcessor.add_watermark(
+            pdf_file, params.get('text', 'WATERMARK'), params.get('position', 'center'),
+            float(params.get('opacity', 0.3)), int(params.get('font_size', 36)), params.get('color', 'gray'),
+            int(params.get('rotation', 0)), int(params.get('x_offset', 0)), int(params.get('y_offset', 0))
+        )
+    return output, f'watermarked_{pdf_file.name}', PDF_CONTENT_TYPE
+
+
+def _rotate(files, params):
+    pdf_file = files[0]
+    rotations = normalize_rotations(params.get('rotations'))
+    if not rotations and 'angle' in params:
+        # Shared pages/angle (batches) are resolved against each file's own page count
+        pdf_file.seek(0)
+        total_pages = len(PdfReader(pdf_file).pages)
+        pdf_file.seek(0)
+        rotations = PDFProcessor.rotations_for_pages(params.get('pages', 'all'), int(params['angle']), total_pages)
+    output = PDFProcessor.rotate_pages(pdf_file, rotations)
+    return output, f'rotated_{pdf_file.name}', PDF_CONTENT_TYPE
+
+
+def _secure(files, params):
+    pdf_file = files[0]
+    output = PDFProcessor.secure_pdf(pdf_file, params.get('user_password'), params.get('owner_password'))
+    return output, f'secured_{pdf_file.name}', PDF_CONTENT_TYPE
+
+
+def _pdf_to_word(files, params):
+    pdf_file = files[0]
+    return DocumentConverter.pdf_to_docx(pdf_file), f'{_base_name(pdf_file.name)}.docx', DOCX_CONTENT_TYPE
+
+
+def _pdf_to_powerpoint(files, params):
+    pdf_file = files[0]
+    return DocumentConverter.pdf_to_pptx(pdf_file), f'{_base_name(pdf_file.name)}.pptx', PPTX_CONTENT_TYPE
+
+
+def _pdf_to_excel(files, params):
+    pdf_file = files[0]
+    return DocumentConverter.pdf_to_excel(pdf_file), f'{_base_name(pdf_file.name)}.xlsx', XLSX_CONTENT_TYPE
+
+
+def _organize(files, params):
+    pdf_file = files[0]
+    output = PDFOrganizer.organize_pdf(pdf_file, params.get('operation', 'auto'), params.get('page_order'))
+    return output, f'organized_{pdf_file.name}', PDF_CONTENT_TYPE
+
+
+def _pipeline(files, params):
+    # The watermark image, when a step needs one, is queued after the PDFs
+    pdf_files = files[:-1] if params.get('watermark_image') else files
+    watermark_image = files[-1] if params.get('watermark_image') else None
+    output = PDFPipeline.run(pdf_files, params.get('steps', []), watermark_image)
+    return output, f'processed_{pdf_files[0].name}', PDF_CONTENT_TYPE
+
+
+def _batch(files, params):
+    shared_files = files[-1:] if params.get('watermark_image') else []
+    pdf_files = files[:-1] if shared_files else files
+    output, _ = run_batch(params['operation'], pdf_files, params.get('params'), shared_files)
+    return output, f"batch_{params['operation']}.zip", ZIP_CONTENT_TYPE
+
+
+OPERATION_HANDLERS = {
+    'merge': _merge,
+    'split': _split,
+    'compress': _compress,
+    'pdf_to_img': _pdf_to_images,
+    'extract_text': _extract_text,
+    'watermark': _watermark,
+    'rotate': _rotate,
+    'secure': _secure,
+    'pdf_to_word': _pdf_to_word,
+    'pdf_to_powerpoint': _pdf_to_powerpoint,
+    'pdf_to_excel': _pdf_to_excel,
+    'organize': _organize,
+    'pipeline': _pipeline,
+    'batch': _batch,
+}
+
+# Operations that already fan their pages out over the process pool and
+# should be driven from the calling thread rather than a single worker.
+# PyMuPDF is not thread-safe: these only wait on pool tasks from the calling
+# thread and never open a document there, so batch, job and request threads
+# can drive them at the same time.
+SELF_PARALLEL_OPERATIONS = {'pdf_to_img', 'compress', 'batch'}
+
+# Single-file operations that /batch/ can apply to many uploads at once
+BATCH_OPERATIONS = ('compress', 'rotate', 'watermark', 'secure', 'pdf_to_img')
+
+# Parameters that must not outlive the job that needed them
+SENSITIVE_PARAMS = ('user_password', 'owner_password', 'password')
+
+
+def scrub_params(params):
+    """Drop SENSITIVE_PARAMS from job params, including those nested in pipeline steps"""
+    if isinstance(params, list):
+        return [scrub_params(item) for item in params]
+    if isinstance(params, dict):
+        return {key: scrub_params(value) for key, value in params.items() if key not in SENSITIVE_PARAMS}
+    return params
+
+
+def _map_sensitive(params, transform):
+    """Apply transform to every SENSITIVE_PARAMS value, including those nested in pipeline steps"""
+    if isinstance(params, list):
+        return [_map_sensitive(item, transform) for item in params]
+    if isinstance(params, dict):
+        return {
+            key: transform(value) if key in SENSITIVE_PARAMS else _map_sensitive(value, transform)
+            for key, value in params.items()
+        }
+    return params
+
+
+def _params_cipher():
+    """Fernet cipher keyed from SECRET_KEY, so the database alone does not reveal queued passwords"""
+    key = hashlib.sha256(f'pdfapp.job-params:{settings.SECRET_KEY}'.encode('utf-8')).digest()
+    return Fernet(base64.urlsafe_b64encode(key))
+
+
+def seal_params(params):
+    """Encrypt SENSITIVE_PARAMS values before job params are stored
+    Each value becomes {'sealed': token}; unseal_params reverses it in the worker.
+    """
+    cipher = _params_cipher()
+    return _map_sensitive(params, lambda value: {'sealed': cipher.encrypt(str(value).encode('utf-8')).decode('ascii')}
+                          if value else value)
+
+
+def unseal_params(params):
+    """Decrypt the values seal_params encrypted"""
+    cipher = _params_cipher()
+
+    def unseal(value):
+        if not isinstance(value, dict) or 'sealed' not in value:
+            return value
+        try:
+            return cipher.decrypt(value['sealed'].encode('ascii')).decode('utf-8')
+        except InvalidToken:
+            raise ValueError("The job's password can no longer be read (SECRET_KEY changed), please submit it again")
+
+    return _map_sensitive(params, unseal)
+
+
+def run_operation(operation, files, params=None):
+    """Run a registered operation
+    Returns: (output: file-like, filename: str, content_type: str)
+    """
+    handler = OPERATION_HANDLERS.get(operation)
+    if handler is None:
+        raise ValueError(f"Unknown operation: {operation}")
+
+    output, filename, content_type = handler(files, params or {})
+    output.seek(0)
+    return output, filename, content_type
+
+
+
+def dispatch_operation(operation, files, params=None):
+    """Run a registered operation from a request or job thread on the process pool"""
+    if operation in SELF_PARALLEL_OPERATIONS:
+        return run_operation(operation, files, params)
+    return run_pdf_task(run_operation, operation, files, params)
+
+
+def batch_concurrency():
+    """Number of files a batch processes at once
+    Batch threads only wait on pool workers; when tasks run inline (no pool)
+    they would use PyMuPDF from several threads at once, so files go one at a time.
+    """
+    if not pdf_executor.enabled:
+        return 1
+    return max(1, getattr(settings, 'BATCH_CONCURRENCY', 0) or parallel_worker_count())
+
+
+def _unique_name(filename, used_names):
+    name, dot, extension = filename.rpartition('.')
+    if not dot:
+        name, extension = filename, ''
+    candidate, counter = filename, 2
+    while candidate in used_names:
+        candidate = f"{name}_{counter}{dot}{extension}"
+        counter += 1
+    used_names.add(candidate)
+    return candidate
+
+
+def run_batch(operation, files, params=None, shared_files=None):
+    """Apply one operation to every file concurrently and zip the outputs
+    shared_files (e.g. a watermark image) are passed to each call after the PDF.
+    Outputs are written to the archive as they finish, so at most
+    batch_concurrency() results are held in memory.
+    Returns: (zip file on disk, manifest list in input order)
+    """
+    if operation not in BATCH_OPERATIONS:
+        raise ValueError(f"Operation not available in batch mode: {operation}")
+
+    # Read shared inputs once; every call gets its own in-memory copy
+    shared_inputs = []
+    for shared_file in shared_files or []:
+        shared_file.seek(0)
+        shared_inputs.append((shared_file.name, shared_file.read()))
+
+    workers = batch_concurrency()
+    manifest = [{'file': file.name, 'status': 'pending'} for file in files]
+    used_names = {'manifest.json'}
+
+    archive = tempfile.TemporaryFile()
+    with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as zip_file, \
+            ThreadPoolExecutor(max_workers=workers) as pool:
+
+        def task(file):
+            copies = []
+            for name, content in shared_inputs:
+                copy = BytesIO(content)
+                copy.name = name
+                copies.append(copy)
+            return dispatch_operation(operation, [file] + copies, params)
+
+        pending = {}
+        queue = iter(enumerate(files))
+        while True:
+            for index, file in queue:
+                pending[pool.submit(task, file)] = index
+                if len(pending) >= workers:
+                    break
+            if not pending:
+                break
+
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = pending.pop(future)
+                try:
+                    output, filename, _ = future.result()
+                    filename = _unique_name(filename, used_names)
+                    output.seek(0)
+                    with zip_file.open(filename, 'w') as entry:
+                        while True:
+                            chunk = output.read(1024 * 1024)
+                            if not chunk:
+                                break
+                            entry.write(chunk)
+                    output.close()
+                    manifest[index].update(status='success', output=filename)
+                except Exception as e:
+                    manifest[index].update(status='error', error=str(e))
+
+        zip_file.writestr('manifest.json', json.dumps({
+            'operation': operation,
+            'succeeded': sum(1 for item in manifest if item['status'] == 'success'),
+            'failed': sum(1 for item in manifest if item['status'] == 'error'),
+            'files': manifest,
+        }, indent=2))
+
+    archive.seek(0)
+    return archive, manifest
@@ -1,7 +1,12 @@
+import hashlib
+import importlib.util
+import math
 import os
+import re
+import shutil
 import tempfile
 import time
-from pathlib import Path
+import zlib
 from pypdf import PdfReader, PdfWriter
 from pdf2image import convert_from_path
 from PIL import Image
@@ -11,7 +16,18 @@ from reportlab.lib.pagesizes import letter
 import pdfplumber
 from io import BytesIO
 import zipfile
+from contextlib import ExitStack
+from typing import NamedTuple, Optional, Tuple
 import fitz  # PyMuPDF for advanced PDF processing
+from django.conf import settings as django_settings
+
+from pdfapp.utils.ocr_pool import get_ocr_reader
+from pdfapp.utils.document_cache import open_document
+from pdfapp.utils.ingest import upload_path, upload_buffer, open_pdf, local_pdf_path, working_pdf_path
+from pdfapp.utils.profiler import profile_pdf, font_files, stream_length
+from pdfapp.utils.pdf_writer import write_pdf, write_pypdf, save_pdf
+from pdfapp.utils.pixmap import pixmap_to_pil, pixmap_to_numpy, pixmap_to_jpeg
+from pdfapp.utils.executor import map_pdf_tasks, parallel_worker_count, run_pdf_task
 
 # Add poppler to PATH if it exists locally
 poppler_path = os.path.join(os.path.dirname(__file__), '..', '..', 'poppler', 'poppler-23.01.0', 'Library', 'bin')
@@ -19,12 +35,168 @@ if os.path.exists(poppler_path):
     os.environ['PATH'] = os.environ.get('PATH', '') + os.pathsep + os.path.abspath(poppler_path)
 
 
+# Compression presets: JPEG quality, render scale and the extra downscale
+# applied before encoding (scanned pages), the resolution black-and-white
+# pages are stored at as CCITT G4, plus the effective resolution embedded
+# images are downsampled to (image-only mode)
+COMPRESSION_PRESETS = {
+    'low': {'image_quality': 20, 'dpi_reduction': 0.4, 'downscale': 0.8, 'progressive': True, 'bilevel_dpi': 150, 'target_dpi': 96},  # Aggressive
+    'medium': {'image_quality': 50, 'dpi_reduction': 0.6, 'downscale': 1.0, 'progressive': False, 'bilevel_dpi': 200, 'target_dpi': 150},  # Balanced
+    'high': {'image_quality': 90, 'dpi_reduction': 0.9, 'downscale': 1.0, 'progressive': False, 'bilevel_dpi': 300, 'target_dpi': 220},  # Preserve quality
+}
+
+# Near-monochrome detection on a low-resolution render: pages with fewer
+# mid-tone pixels and fewer coloured pixels than this are stored as 1-bit
+BILEVEL_DETECT_DPI = 100
+BILEVEL_MAX_MIDTONES = 0.1
+BILEVEL_MAX_COLOURED = 0.01
+
+# Bilevel detection and encoding need numpy; without it every page stays JPEG
+# and MRC compression is unavailable
+NUMPY_AVAILABLE = importlib.util.find_spec('numpy') is not None
+
+
+# Mixed raster content: the text mask keeps the preset's bilevel_dpi, the
+# background and text-colour layers are stored this many times smaller
+MRC_BACKGROUND_FACTOR = 3
+MRC_FOREGROUND_FACTOR = 6
+MRC_TEXT_CONTRAST = 24  # Grey levels a pixel must be darker than its surroundings to count as text
+
+
+def _embed_image_xobject(doc, data, keys):
+    """Add an already-encoded image stream to doc as a new XObject and return its xref
+    PyMuPDF cannot create CCITT or masked images (and shares identical images
+    between pages), so the object is written directly.
+    """
+    xref = doc.get_new_xref()
+    entries = ''.join(f'/{key} {value}' for key, value in keys.items() if key not in ('Filter', 'DecodeParms'))
+    doc.update_object(xref, f'<</Type/XObject/Subtype/Image{entries}>>')
+    # Writing a raw stream clears Filter/DecodeParms, so they are set afterwards
+    doc.update_stream(xref, data, compress=0)
+    for key in ('Filter', 'DecodeParms'):
+        if key in keys:
+            doc.xref_set_key(xref, key, keys[key])
+    return xref
+
+
+class BilevelImage(NamedTuple):
+    """1-bit page image produced by a pool worker, ready to embed as an image XObject"""
+    width: int
+    height: int
+    data: bytes
+    filter: str        # '/CCITTFaxDecode' or '/FlateDecode'
+    black_is_1: bool
+
+    def embed(self, doc, image_mask=False):
+        """Add the image to doc and return its xref
+        image_mask: write it as a stencil mask (black = painted) for another image's /Mask
+        """
+        keys = {'Width': self.width, 'Height': self.height, 'BitsPerComponent': 1}
+        if image_mask:
+            keys['ImageMask'] = 'true'
+        else:
+            keys['ColorSpace'] = '/DeviceGray'
+        keys['Filter'] = self.filter
+        if self.filter == '/CCITTFaxDecode':
+            keys['DecodeParms'] = (f"<</K -1/Columns {self.width}/Rows {self.height}"
+                                   f"/BlackIs1 {'true' if self.black_is_1 else 'false'}>>")
+        return _embed_image_xobject(doc, self.data, keys)
+
+
+class MRCPage(NamedTuple):
+    """Layers of one mixed-raster-content page produced by a pool worker"""
+    background: bytes                  # JPEG of the page without its text
+    foreground: Optional[bytes]        # JPEG of the text colours, None for pages without text
+    foreground_size: Tuple[int, int]
+    mask: Optional[BilevelImage]       # Text shapes at full resolution
+
+    def place(self, doc, page, rect):
+        """Draw the background, then the foreground through the text mask"""
+        page.insert_image(rect, stream=self.background)
+        if self.mask is None:
+            return
+        
+        mask_xref = self.mask.embed(doc, image_mask=True)
+        width, height = self.foreground_size
+        foreground_xref = _embed_image_xobject(doc, self.foreground, {
+            'Width': width, 'Height': height, 'ColorSpace': '/DeviceRGB', 'BitsPerComponent': 8,
+            'Mask': f'{mask_xref} 0 R', 'Filter': '/DCTDecode',
+        })
+        page.insert_image(rect, xref=foreground_xref)
+
+
+# compress_pdf modes: 'auto' profiles the document and picks one of the others
+COMPRESSION_MODES = ('auto', 'images', 'rasterize', 'mrc', 'basic')
+
+# Lossless recompression: filters that can be decoded and re-deflated without
+# loss, and stream types the writer regenerates anyway
+LOSSLESS_FILTERS = {'FlateDecode', 'LZWDecode', 'ASCII85Decode', 'ASCIIHexDecode', 'RunLengthDecode'}
+SKIPPED_STREAM_TYPES = {'/ObjStm', '/XRef'}
+
+# 'ABCDEF+' tag marking a subset font's name
+SUBSET_PREFIX = re.compile(r'^[A-Z]{6}\+')
+
+def compress_window():
+    """Maximum number of encoded pages in flight during parallel compression"""
+    return max(1, getattr(django_settings, 'PDF_COMPRESS_INFLIGHT_PAGES', 16))
+
+
 class PDFProcessor:
     """Main PDF processing class with all operations"""
     
     @staticmethod
-    def merge_pdfs(pdf_files):
-        """Merge multiple PDF files into one"""
+    def merge_pdfs(pdf_files, engine=None):
+        """Merge multiple PDF files into one
+        engine: 'fitz' or 'pypdf', defaulting to PDF_MERGE_ENGINE
+        """
+        engine = engine or getattr(django_settings, 'PDF_MERGE_ENGINE', 'fitz')
+        if engine == 'fitz':
+            return PDFProcessor.merge_pdfs_fitz(pdf_files)
+        return PDFProcessor.merge_pdfs_pypdf(pdf_files)
+    
+    @staticmethod
+    def merge_pdfs_fitz(pdf_files):
+        """Merge with PyMuPDF: one source open at a time, identical objects stored once
+        Only the sources are bounded: the merged document itself is built up in
+        memory by insert_pdf until save_pdf writes it to a temporary file, so peak
+        memory still grows with the size of the result.
+        """
+        merged = fitz.open()
+        try:
+            for i, pdf_file in enumerate(pdf_files):
+                try:
+                    # Uploads on disk are opened by path, so pages are only read as they are copied
+                    source = open_pdf(pdf_file)
+                except Exception:
+                    raise ValueError(f"File {i+1} ({pdf_file.name}) is not a valid PDF file")
+                
+                try:
+                    if source.needs_pass:
+                        raise ValueError(f"PDF file {i+1} ({pdf_file.name}) is password protected")
+                    if source.page_count == 0:
+                        raise ValueError(f"PDF file {i+1} ({pdf_file.name}) has no pages")
+                    
+                    # Whole-document ranges: resources shared by a source's pages are copied once
+                    merged.insert_pdf(source, from_page=0, to_page=source.page_count - 1)
+                except ValueError:
+                    raise
+                except Exception as e:
+                    raise ValueError(f"Error processing file {i+1} ({pdf_file.name}): {str(e)}")
+                finally:
+                    source.close()
+            
+            # garbage=4 merges identical objects (fonts, images, ICC profiles) across sources
+            return save_pdf(merged, garbage=4)
+        
+        except Exception as e:
+            raise Exception(f"PDF merge failed: {str(e)}")
+        
+        finally:
+            merged.close()
+    
+    @staticmethod
+    def merge_pdfs_pypdf(pdf_files):
+        """Merge with pypdf, page by page"""
         try:
             writer = PdfWriter()
             
@@ -49,9 +221,7 @@ class PDFProcessor:
                     else:
                         raise ValueError(f"Error processing file {i+1} ({pdf_file.name}): {str(e)}")
             
-            output = BytesIO()
-            writer.write(output)
-            output.seek(0)
+            output = write_pypdf(writer)
             return output
             
         except Exception as e:
@@ -75,9 +245,7 @@ class PDFProcessor:
             for page_num in pages_to_extract:
                 writer.add_page(reader.pages[page_num])
             
-            output = BytesIO()
-            writer.write(output)
-            output.seek(0)
+            output = write_pypdf(writer)
             return [output]
         
         elif split_type == 'each':
@@ -87,9 +255,7 @@ class PDFProcessor:
                 writer = PdfWriter()
                 writer.add_page(reader.pages[i])
                 
-                output = BytesIO()
-                writer.write(output)
-                output.seek(0)
+                output = write_pypdf(writer)
                 outputs.append(output)
             
             return outputs
@@ -113,9 +279,7 @@ class PDFProcessor:
                     if i < total_pages:
                         writer.add_page(reader.pages[i])
                 
-                output = BytesIO()
-                writer.write(output)
-                output.seek(0)
+                output = write_pypdf(writer)
                 outputs.append(output)
             
             return outputs
@@ -123,163 +287,658 @@ class PDFProcessor:
         return []
     
     @staticmethod
-    def compress_pdf(pdf_file, quality='medium'):
-        """Compress PDF to reduce file size - supports both text and scanned PDFs"""
-        # Get original file size
-        pdf_file.seek(0, 2)
-        original_size = pdf_file.tell()
-        pdf_file.seek(0)
-        
-        # Try advanced compression first (for scanned PDFs and large files)
-        if original_size > 1024 * 1024:  # Files larger than 1MB
+    def compress_pdf(pdf_file, quality='medium', mode='auto', profile=None):
+        """Compress PDF to reduce file size - supports both text and scanned PDFs
+        quality 'lossless' never changes content: fonts are optimized and every
+        stream is re-deflated at the highest level, whatever the mode
+        mode: 'images' shrinks embedded images only, 'rasterize' rebuilds every
+        page as a JPEG, 'mrc' rebuilds every page as a sharp text layer over a
+        low-resolution background, 'basic' only compresses streams, 'auto'
+        profiles the document (or uses the given profile) and picks one of them
+        """
+        if quality == 'lossless':
+            return PDFProcessor.lossless_compress_pdf(pdf_file)
+        
+        if mode == 'auto':
+            if profile is None:
+                profile = run_pdf_task(profile_pdf, pdf_file)
+            mode = profile['strategy']
+        
+        if mode == 'images':
+            return run_pdf_task(PDFProcessor.recompress_images_pdf, pdf_file, quality)
+        
+        if mode == 'mrc':
+            # Asked for explicitly, so it is not swapped for another strategy
+            if not NUMPY_AVAILABLE:
+                raise ValueError("MRC compression requires numpy, which is not installed")
+            advanced_result = PDFProcessor.advanced_compress_pdf(pdf_file, quality, layered=True)
+            if advanced_result is None:
+                raise Exception("MRC compression failed")
+            return advanced_result
+        
+        if mode == 'rasterize':
             advanced_result = PDFProcessor.advanced_compress_pdf(pdf_file, quality)
             if advanced_result:
                 return advanced_result
         
-        # Fallback to basic compression for smaller files or if advanced fails
-        return PDFProcessor.basic_compress_pdf(pdf_file, quality)
+        # Lossless stream optimization, also the fallback if rasterizing fails
+        return run_pdf_task(PDFProcessor.basic_compress_pdf, pdf_file, quality)
     
     @staticmethod
-    def advanced_compress_pdf(pdf_file, quality='medium'):
-        """Advanced compression using PyMuPDF for scanned PDFs and large files"""
+    def advanced_compress_pdf(pdf_file, quality='medium', preset=None, layered=False):
+        """Advanced compression using PyMuPDF for scanned PDFs and large files
+        preset: explicit settings (same keys as COMPRESSION_PRESETS) overriding quality
+        layered: split pages into mixed raster content layers instead of one JPEG each
+        Every PyMuPDF call runs in a pool worker, so several of these can be
+        driven from threads of one process (batches, job runners) at once.
+        """
+        input_path = temp_input_path = None
         try:
-            # Save uploaded file to temporary location for PyMuPDF
-            with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_input:
-                pdf_file.seek(0)
-                temp_input.write(pdf_file.read())
-                temp_input.flush()  # Ensure data is written
-                temp_input_path = temp_input.name
+            # Workers open the upload where Django spooled it; only in-memory
+            # uploads are written to a temporary file for them
+            input_path = upload_path(pdf_file)
+            if input_path is None:
+                with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_input:
+                    temp_input.write(upload_buffer(pdf_file))
+                    temp_input_path = input_path = temp_input.name
             
-            # Open with PyMuPDF
-            doc = fitz.open(temp_input_path)
+            page_count = run_pdf_task(PDFProcessor.page_count, input_path)
             
             # Get original size
-            original_size = os.path.getsize(temp_input_path)
+            original_size = os.path.getsize(input_path)
             
             # Compression settings based on quality
-            if quality == 'low':
-                # Aggressive compression for scanned documents
-                image_quality = 20  # JPEG quality 0-100 (very low)
-                dpi_reduction = 0.4  # Reduce resolution by 60%
-                print(f"Using LOW quality: JPEG={image_quality}, DPI reduction={dpi_reduction}")
-            elif quality == 'high':
-                # Minimal compression - preserve quality
-                image_quality = 90
-                dpi_reduction = 0.9  # Reduce resolution by 10%
-                print(f"Using HIGH quality: JPEG={image_quality}, DPI reduction={dpi_reduction}")
-            else:  # medium
-                # Balanced compression
-                image_quality = 50
-                dpi_reduction = 0.6  # Reduce resolution by 40%
-                print(f"Using MEDIUM quality: JPEG={image_quality}, DPI reduction={dpi_reduction}")
-            
-            # Create new PDF with compressed images
-            new_doc = fitz.open()
-            
-            for page_num in range(len(doc)):
-                page = doc[page_num]
-                
-                # Get page as image and compress it
-                mat = fitz.Matrix(dpi_reduction, dpi_reduction)  # Scale down resolution
-                pix = page.get_pixmap(matrix=mat)
-                
-                # Convert to PIL Image for compression
-                img_data = pix.tobytes("png")
-                pil_image = Image.open(BytesIO(img_data))
-                
-                # Convert to RGB if RGBA (for JPEG compression)
-                if pil_image.mode == 'RGBA':
-                    rgb_image = Image.new('RGB', pil_image.size, (255, 255, 255))
-                    rgb_image.paste(pil_image, mask=pil_image.split()[-1])
-                    pil_image = rgb_image
-                
-                # Additional processing for low quality
-                if quality == 'low':
-                    # Further reduce image size for aggressive compression
-                    width, height = pil_image.size
-                    new_size = (int(width * 0.8), int(height * 0.8))
-                    pil_image = pil_image.resize(new_size, Image.Resampling.LANCZOS)
-                
-                # Compress image with quality-specific settings
-                compressed_img = BytesIO()
-                if quality == 'low':
-                    # Use more aggressive compression for low quality
-                    pil_image.save(compressed_img, format='JPEG', quality=image_quality, optimize=True, progressive=True)
-                else:
-                    pil_image.save(compressed_img, format='JPEG', quality=image_quality, optimize=True)
-                compressed_img.seek(0)
-                
-                # Create new page from compressed image
-                page_rect = page.rect  # Get original page dimensions
-                new_page = new_doc.new_page(width=page_rect.width, height=page_rect.height)
-                
-                # Insert the compressed image into the new page
-                compressed_img.seek(0)
-                new_page.insert_image(page_rect, stream=compressed_img.read())
-            
-            # Save compressed PDF to a temporary file path
-            temp_output_path = tempfile.mktemp(suffix='.pdf')
-            new_doc.save(temp_output_path, deflate=True, clean=True)
+            settings = preset or COMPRESSION_PRESETS.get(quality, COMPRESSION_PRESETS['medium'])
+            print(f"Using {quality.upper()} quality: JPEG={settings['image_quality']}, DPI reduction={settings['dpi_reduction']}")
+            
+            # Pages are rasterized and encoded in pool workers; at most
+            # PDF_COMPRESS_INFLIGHT_PAGES are in flight at once and the
+            # encoded pages come back strictly in page order
+            page_args = [(input_path, page_num, settings) for page_num in range(page_count)]
+            page_task = PDFProcessor._mrc_page if layered else PDFProcessor._compress_page
+            window = compress_window()
+            
+            # The new PDF is built in a temporary file a window of pages at a
+            # time, so no more than two windows of encoded pages are ever held
+            with working_pdf_path() as assembly_path:
+                chunk = []
+                for page in map_pdf_tasks(page_task, page_args, window):
+                    chunk.append(page)
+                    if len(chunk) >= window:
+                        run_pdf_task(PDFProcessor._append_pages, assembly_path, chunk)
+                        chunk = []
+                if chunk:
+                    run_pdf_task(PDFProcessor._append_pages, assembly_path, chunk)
+                
+                output = run_pdf_task(PDFProcessor._write_working_copy, assembly_path, deflate=True, clean=True)
             
             # Check compression effectiveness
-            compressed_size = os.path.getsize(temp_output_path)
+            compressed_size = output.getbuffer().nbytes
             compression_ratio = compressed_size / original_size
             
             print(f"Advanced compression ({quality}): {original_size} -> {compressed_size} bytes ({compression_ratio:.2%})")
             
             # Always return advanced compression result if it completed successfully
             # (Don't check effectiveness ratio - let user see the quality difference)
-            with open(temp_output_path, 'rb') as f:
-                output = BytesIO(f.read())
-            
-            # Cleanup
-            new_doc.close()
-            doc.close()
+            output.seek(0)
+            return output
             
-            # Cleanup temporary files with retry (Windows file handle issue)
-            import time
+        except Exception as e:
+            print(f"Advanced compression failed: {e}")
+        
+        finally:
+            # Cleanup temporary file with retry (Windows file handle issue)
             for attempt in range(3):
                 try:
-                    if os.path.exists(temp_input_path):
+                    if temp_input_path and os.path.exists(temp_input_path):
                         os.unlink(temp_input_path)
-                    if os.path.exists(temp_output_path):
-                        os.unlink(temp_output_path)
                     break
                 except OSError:
                     if attempt < 2:  # Not the last attempt
                         time.sleep(0.1)  # Brief delay
                     # Ignore cleanup errors on last attempt
+        
+        return None  # Fall back to basic compression
+    
+    @staticmethod
+    def _append_pages(doc_path, pages):
+        """Add encoded pages to the PDF being built in doc_path - runs in a pool worker
+        pages: [(page_rect, jpeg bytes / BilevelImage / MRCPage)] in page order
+        The first call writes the file, later ones append to it incrementally.
+        """
+        started = os.path.getsize(doc_path) > 0
+        new_doc = fitz.open(doc_path, filetype='pdf') if started else fitz.open()
+        try:
+            for page_rect, image_data in pages:
+                # Create new page from compressed image
+                new_page = new_doc.new_page(width=page_rect.width, height=page_rect.height)
+                
+                # Insert the compressed image into the new page
+                if isinstance(image_data, MRCPage):
+                    image_data.place(new_doc, new_page, page_rect)
+                elif isinstance(image_data, BilevelImage):
+                    new_page.insert_image(page_rect, xref=image_data.embed(new_doc))
+                else:
+                    new_page.insert_image(page_rect, stream=image_data)
             
-            output.seek(0)
-            return output
+            if started:
+                new_doc.saveIncr()
+            else:
+                new_doc.save(doc_path)
+        finally:
+            new_doc.close()
+    
+    @staticmethod
+    def _write_working_copy(doc_path, **options):
+        """Serialize a document built up across tasks with the writer profile - runs in a pool worker"""
+        with fitz.open(doc_path, filetype='pdf') as doc:
+            return write_pdf(doc, **options)
+    
+    @staticmethod
+    def _compress_page(pdf_path, page_num, settings):
+        """Rasterize one page and encode it - runs in a pool worker
+        Returns (page_rect, jpeg_bytes), or (page_rect, BilevelImage) for black-and-white pages
+        """
+        # Opened per task, not kept in the document cache: the input is deleted
+        # when the operation ends and every worker would keep its copy open
+        with fitz.open(pdf_path, filetype='pdf') as doc:
+            page = doc[page_num]
+            page_rect = page.rect
             
-        except Exception as e:
-            print(f"Advanced compression failed: {e}")
-            # Cleanup in case of error
-            try:
-                if 'doc' in locals(): doc.close()
-                if 'new_doc' in locals(): new_doc.close()
+            if settings.get('bilevel_dpi') and NUMPY_AVAILABLE and PDFProcessor._is_bilevel_page(page):
+                return page_rect, PDFProcessor._encode_bilevel_page(page, settings['bilevel_dpi'])
+            
+            # Get page as image and compress it (rendered without alpha, so it is JPEG-ready)
+            mat = fitz.Matrix(settings['dpi_reduction'], settings['dpi_reduction'])  # Scale down resolution
+            pix = page.get_pixmap(matrix=mat, alpha=False)
+        
+        # Presets without extra resampling encode straight from the pixmap
+        if settings['downscale'] >= 1 and not settings['progressive']:
+            return page_rect, pixmap_to_jpeg(pix, settings['image_quality'])
+        
+        # Further reduce image size for aggressive compression
+        pil_image = pixmap_to_pil(pix)
+        if settings['downscale'] < 1:
+            width, height = pil_image.size
+            new_size = (int(width * settings['downscale']), int(height * settings['downscale']))
+            pil_image = pil_image.resize(new_size, Image.Resampling.LANCZOS)
+        
+        # Compress image with quality-specific settings
+        compressed_img = BytesIO()
+        pil_image.save(compressed_img, format='JPEG', quality=settings['image_quality'],
+                       optimize=True, progressive=settings['progressive'])
+        
+        return page_rect, compressed_img.getvalue()
+    
+    @staticmethod
+    def _mrc_page(pdf_path, page_num, settings):
+        """Split one rendered page into text mask, text colour and background layers - runs in a pool worker
+        Returns (page_rect, MRCPage)
+        """
+        import numpy as np
+        
+        with fitz.open(pdf_path, filetype='pdf') as doc:
+            page = doc[page_num]
+            page_rect = page.rect
+            pix = page.get_pixmap(dpi=settings.get('bilevel_dpi', 200), colorspace=fitz.csRGB, alpha=False)
+        
+        rgb = pixmap_to_numpy(pix)
+        # Integer luma (ITU-R BT.601 weights out of 256)
+        gray = ((rgb[..., 0] * np.uint16(77) + rgb[..., 1] * np.uint16(150) + rgb[..., 2] * np.uint16(29)) >> 8).astype(np.uint8)
+        text = PDFProcessor._text_mask(gray, settings.get('bilevel_dpi', 200))
+        
+        background = PDFProcessor._layer_image(rgb, ~text, MRC_BACKGROUND_FACTOR, fill=255)
+        if not text.any():
+            return page_rect, MRCPage(PDFProcessor._jpeg_bytes(background, settings), None, (0, 0), None)
+        
+        foreground = PDFProcessor._layer_image(rgb, text, MRC_FOREGROUND_FACTOR, fill=0)
+        return page_rect, MRCPage(
+            PDFProcessor._jpeg_bytes(background, settings),
+            PDFProcessor._jpeg_bytes(foreground, settings),
+            foreground.size,
+            PDFProcessor._encode_bilevel(~text),
+        )
+    
+    @staticmethod
+    def _text_mask(gray, dpi):
+        """Pixels noticeably darker than their neighbourhood (about 1/6 inch around them)"""
+        import numpy as np
+        
+        window = max(3, dpi // 6) | 1
+        try:
+            import cv2
+            local_mean = cv2.blur(gray, (window, window), borderType=cv2.BORDER_REPLICATE).astype(np.int16)
+        except ImportError:
+            # Box filter from an integral image
+            height, width = gray.shape
+            integral = np.zeros((height + 1, width + 1), dtype=np.uint32)
+            np.cumsum(np.cumsum(gray, axis=0, dtype=np.uint32), axis=1, out=integral[1:, 1:])
+            radius = window // 2
+            y0 = np.clip(np.arange(height) - radius, 0, height)
+            y1 = np.clip(np.arange(height) + radius + 1, 0, height)
+            x0 = np.clip(np.arange(width) - radius, 0, width)
+            x1 = np.clip(np.arange(width) + radius + 1, 0, width)
+            sums = (integral[np.ix_(y1, x1)] - integral[np.ix_(y0, x1)]
+                    - integral[np.ix_(y1, x0)] + integral[np.ix_(y0, x0)])
+            local_mean = (sums // np.outer(y1 - y0, x1 - x0)).astype(np.int16)
+        
+        return gray.astype(np.int16) < local_mean - MRC_TEXT_CONTRAST
+    
+    @staticmethod
+    def _layer_image(rgb, selected, factor, fill):
+        """Average the selected pixels over factor x factor blocks into a smaller RGB image
+        Blocks with no selected pixel take the mean colour of the layer (or fill if it is empty).
+        """
+        import numpy as np
+        
+        height, width = selected.shape
+        rows, cols = -(-height // factor), -(-width // factor)
+        pad = ((0, rows * factor - height), (0, cols * factor - width))
+        
+        weights = np.pad(selected, pad).reshape(rows, factor, cols, factor)
+        pixels = np.pad(np.where(selected[..., None], rgb, 0), pad + ((0, 0),)).reshape(rows, factor, cols, factor, 3)
+        
+        counts = weights.sum(axis=(1, 3), dtype=np.uint32)
+        sums = pixels.sum(axis=(1, 3), dtype=np.uint32)
+        layer = sums // np.maximum(counts, 1)[..., None]
+        
+        empty = counts == 0
+        if empty.all():
+            layer[:] = fill
+        elif empty.any():
+            layer[empty] = sums.sum(axis=(0, 1)) // counts.sum()
+        return Image.fromarray(layer.astype(np.uint8), 'RGB')
+    
+    @staticmethod
+    def _jpeg_bytes(image, settings):
+        buffer = BytesIO()
+        image.save(buffer, format='JPEG', quality=settings['image_quality'], optimize=True)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def _is_bilevel_page(page):
+        """Whether a page is near-monochrome (text, line art, forms) judging from a low-res render"""
+        import numpy as np
+        
+        pix = page.get_pixmap(dpi=BILEVEL_DETECT_DPI, alpha=False)
+        pixels = pixmap_to_numpy(pix)
+        if pixels.ndim == 3:
+            # Any noticeable colour keeps the page in JPEG
+            spread = pixels.max(axis=2).astype(np.int16) - pixels.min(axis=2)
+            if np.count_nonzero(spread > 40) > BILEVEL_MAX_COLOURED * spread.size:
+                return False
+            pixels = pixels.min(axis=2)
+        
+        histogram = np.bincount(pixels.ravel(), minlength=256)
+        midtones = histogram[64:192].sum()
+        return midtones <= BILEVEL_MAX_MIDTONES * pixels.size
+    
+    @staticmethod
+    def _encode_bilevel_page(page, dpi):
+        """Render a page in grayscale, threshold it (Otsu) and encode it as CCITT G4"""
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False)
+        gray = pixmap_to_numpy(pix)
+        return PDFProcessor._encode_bilevel(gray > PDFProcessor._otsu_threshold(gray))
+    
+    @staticmethod
+    def _otsu_threshold(gray):
+        """Otsu's threshold: the grey level maximising the between-class variance"""
+        import numpy as np
+        
+        histogram = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+        weights = np.cumsum(histogram)
+        means = np.cumsum(histogram * np.arange(256))
+        total_weight, total_mean = weights[-1], means[-1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = (total_mean * weights - means * total_weight) ** 2 / (weights * (total_weight - weights))
+        return int(np.nanargmax(variance)) if np.isfinite(variance).any() else 127
+    
+    @staticmethod
+    def _encode_bilevel(white):
+        """Encode a boolean array (True = white) as CCITT G4, or 1-bit Flate as a fallback"""
+        import numpy as np
+        
+        height, width = white.shape
+        
+        # Pillow's libtiff encoder does the G4 coding; the single strip is the PDF stream
+        tiff = BytesIO()
+        Image.fromarray(white).save(tiff, format='TIFF', compression='group4', tiffinfo={278: height})
+        tiff.seek(0)
+        with Image.open(tiff) as encoded:
+            offsets = encoded.tag_v2.get(273)
+            byte_counts = encoded.tag_v2.get(279)
+            photometric = encoded.tag_v2.get(262)
+        offsets = (offsets,) if isinstance(offsets, int) else offsets
+        byte_counts = (byte_counts,) if isinstance(byte_counts, int) else byte_counts
+        
+        if offsets and len(offsets) == 1:
+            data = tiff.getbuffer()[offsets[0]:offsets[0] + byte_counts[0]].tobytes()
+            return BilevelImage(width, height, data, '/CCITTFaxDecode', photometric == 1)
+        
+        # Several strips cannot be joined into one G4 stream: store 1-bit Flate instead
+        return BilevelImage(width, height, zlib.compress(np.packbits(white, axis=1).tobytes(), 9), '/FlateDecode', False)
+    
+    @staticmethod
+    def recompress_images_pdf(pdf_file, quality='medium'):
+        """Downsample and re-encode embedded images only
+        Text, vector graphics, fonts and content streams are left untouched.
+        """
+        doc = open_pdf(pdf_file)
+        try:
+            saved = PDFProcessor._recompress_images(doc, quality)
+            print(f"Image recompression ({quality}): {saved} bytes saved in image streams")
+            
+            # garbage=4 also merges the identical image objects left behind
+            output = write_pdf(doc, garbage=4, deflate=True)
+        finally:
+            doc.close()
+        
+        output.seek(0)
+        return output
+    
+    @staticmethod
+    def _image_scales(doc, target_dpi):
+        """Downsampling factor each image XObject can take: {xref: scale <= 1}
+        An image drawn several times keeps enough pixels for its largest placement.
+        """
+        scales = {}
+        for page in doc:
+            for info in page.get_image_info(xrefs=True):
+                xref = info.get('xref')
+                if not xref:
+                    continue  # Inline images live in the content stream
+                
+                # Displayed size in inches from the image's transformation matrix
+                a, b, c, d = info['transform'][:4]
+                shown_width = math.hypot(a, b) / 72
+                shown_height = math.hypot(c, d) / 72
+                if shown_width <= 0 or shown_height <= 0:
+                    continue
                 
-                # Cleanup with retry for Windows
-                import time
-                for attempt in range(2):
-                    try:
-                        if 'temp_input_path' in locals() and os.path.exists(temp_input_path):
-                            os.unlink(temp_input_path)
-                        if 'temp_output_path' in locals() and os.path.exists(temp_output_path):
-                            os.unlink(temp_output_path)
-                        break
-                    except OSError:
-                        if attempt < 1:
-                            time.sleep(0.1)
-            except:
-                pass
+                effective_dpi = min(info['width'] / shown_width, info['height'] / shown_height)
+                scale = min(1.0, target_dpi / effective_dpi)
+                scales[xref] = max(scales.get(xref, 0.0), scale)
+        return scales
+    
+    @staticmethod
+    def _recompress_images(doc, quality='medium'):
+        """Re-encode image XObjects of an open document in place
+        Returns the number of bytes saved in image streams
+        """
+        settings = COMPRESSION_PRESETS.get(quality, COMPRESSION_PRESETS['medium'])
+        encoded = {}  # Content hash -> result, so identical images are encoded once
+        saved = 0
+        
+        for xref, scale in PDFProcessor._image_scales(doc, settings['target_dpi']).items():
+            # Stencil masks and bilevel scans are already as small as they get here
+            if doc.xref_get_key(xref, 'ImageMask')[1] == 'true' or \
+                    doc.xref_get_key(xref, 'BitsPerComponent')[1] == '1':
+                continue
+            
+            original = doc.xref_stream_raw(xref)
+            digest = hashlib.sha256(original)
+            for key in ('Width', 'Height', 'ColorSpace', 'BitsPerComponent', 'Filter', 'Decode', 'DecodeParms'):
+                digest.update(doc.xref_get_key(xref, key)[1].encode('utf-8'))
+            cache_key = (digest.hexdigest(), round(scale, 3))
+            
+            if cache_key not in encoded:
+                try:
+                    encoded[cache_key] = PDFProcessor._encode_image(doc, xref, scale, settings, len(original))
+                except Exception as e:
+                    print(f"Skipping image {xref}: {e}")
+                    encoded[cache_key] = None
+            
+            if encoded[cache_key] is None:
+                continue
+            
+            stream, keys = encoded[cache_key]
+            doc.update_stream(xref, stream, compress=0)
+            for key, value in keys.items():
+                doc.xref_set_key(xref, key, value)
+            saved += len(original) - len(stream)
         
-        return None  # Fall back to basic compression
+        return saved
+    
+    @staticmethod
+    def _encode_image(doc, xref, scale, settings, original_size):
+        """Decode one image XObject, downsample it and encode it again
+        Photos (JPEG/JPEG 2000 sources) become JPEG, everything else stays lossless Flate.
+        Returns (stream, dictionary keys) or None when the result would not be smaller
+        """
+        pix = fitz.Pixmap(doc, xref)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)  # The soft mask is a separate XObject and stays as it is
+        if pix.n not in (1, 3):
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        
+        is_photo = any(name in doc.xref_get_key(xref, 'Filter')[1] for name in ('DCTDecode', 'JPXDecode'))
+        
+        if scale < 0.95:
+            image = pixmap_to_pil(pix)
+            new_size = (max(1, round(pix.width * scale)), max(1, round(pix.height * scale)))
+            image = image.resize(new_size, Image.Resampling.LANCZOS)
+            width, height = image.size
+            if is_photo:
+                buffer = BytesIO()
+                image.save(buffer, format='JPEG', quality=settings['image_quality'], optimize=True)
+                stream = buffer.getvalue()
+            else:
+                stream = zlib.compress(image.tobytes(), 9)
+        else:
+            # Already at or below the target resolution: only a cheaper encoding can help
+            width, height = pix.width, pix.height
+            if is_photo:
+                stream = pixmap_to_jpeg(pix, settings['image_quality'])
+            else:
+                stream = zlib.compress(pix.samples, 9)
+        
+        if len(stream) >= original_size:
+            return None
+        
+        return stream, {
+            'Filter': '/DCTDecode' if is_photo else '/FlateDecode',
+            'Width': str(width),
+            'Height': str(height),
+            'BitsPerComponent': '8',
+            'ColorSpace': '/DeviceGray' if pix.n == 1 else '/DeviceRGB',
+            'DecodeParms': 'null',
+            'Decode': 'null',
+        }
+    
+    @staticmethod
+    def _font_file_sizes(doc):
+        """Embedded font bytes per font name, counting each font program once"""
+        sizes = {}
+        seen = set()
+        for _, _, font_xref, font_name in font_files(doc):
+            name = SUBSET_PREFIX.sub('', font_name)
+            sizes.setdefault(name, 0)
+            if font_xref not in seen:
+                seen.add(font_xref)
+                sizes[name] += stream_length(doc, font_xref)
+        return sizes
+    
+    @staticmethod
+    def _optimize_fonts(doc):
+        """Merge byte-identical embedded font programs and subset fonts to the glyphs used
+        Lossless; orphaned font streams are dropped when the document is saved with garbage collection.
+        Returns [{'font', 'original_bytes', 'optimized_bytes', 'saved_bytes'}], largest saving first
+        """
+        original = PDFProcessor._font_file_sizes(doc)
+        if not original:
+            return []
+        
+        # Point every copy of a font program (e.g. one per merged source) at the first one
+        canonical = {}
+        for descriptor, key, font_xref, _ in font_files(doc):
+            digest = hashlib.sha256(key.encode('ascii') + doc.xref_stream_raw(font_xref)).hexdigest()
+            target = canonical.setdefault(digest, font_xref)
+            if target != font_xref:
+                doc.xref_set_key(descriptor, key, f'{target} 0 R')
+        
+        try:
+            try:
+                import fontTools  # noqa: F401 - tighter subsets when installed
+                doc.subset_fonts()
+            except ImportError:
+                doc.subset_fonts(fallback=True)  # MuPDF's built-in subsetter
+        except Exception as e:
+            print(f"Font subsetting skipped: {e}")
+        
+        optimized = PDFProcessor._font_file_sizes(doc)
+        report = [
+            {
+                'font': name,
+                'original_bytes': size,
+                'optimized_bytes': optimized.get(name, 0),
+                'saved_bytes': size - optimized.get(name, 0),
+            }
+            for name, size in original.items()
+        ]
+        report.sort(key=lambda entry: entry['saved_bytes'], reverse=True)
+        
+        for entry in report:
+            if entry['saved_bytes'] > 0:
+                print(f"Font {entry['font']}: {entry['original_bytes']} -> {entry['optimized_bytes']} bytes")
+        return report
+    
+    @staticmethod
+    def optimize_fonts_pdf(pdf_file):
+        """Run the font stage on an upload; returns (pdf, report) with the original file when nothing was saved"""
+        doc = open_pdf(pdf_file)
+        try:
+            report = PDFProcessor._optimize_fonts(doc)
+            if not any(entry['saved_bytes'] > 0 for entry in report):
+                pdf_file.seek(0)
+                return pdf_file, report
+            # Intermediate file for pypdf: dropping the orphaned fonts is all that matters
+            output = write_pdf(doc, 'fast', garbage=3, deflate=True)
+        finally:
+            doc.close()
+        return output, report
+    
+    @staticmethod
+    def lossless_compress_pdf(pdf_file):
+        """Lossless compression: font optimization, then every decodable stream re-deflated
+        at level 9 with the stream work spread over the process pool
+        """
+        # Font stage from basic compression (subsetting and duplicate merging)
+        pdf_file, font_report = run_pdf_task(PDFProcessor.optimize_fonts_pdf, pdf_file)
+        
+        # Documents are only ever opened in pool workers: one lists the streams
+        # and starts a working copy, the batches are deflated in parallel and
+        # each batch is stored in the copy as it arrives
+        with working_pdf_path() as work_path:
+            with local_pdf_path(pdf_file) as pdf_path:
+                batches = run_pdf_task(PDFProcessor._stream_batches, pdf_path, parallel_worker_count() * 4, work_path)
+                batch_args = [(pdf_path, batch) for batch in batches]
+                streams = saved = 0
+                for results in map_pdf_tasks(PDFProcessor._deflate_stream_batch, batch_args, compress_window()):
+                    if results:
+                        saved += run_pdf_task(PDFProcessor._store_deflated_streams, work_path, results)
+                        streams += len(results)
+            
+            print(f"Lossless compression: {streams} streams re-deflated, {saved} bytes saved")
+            output = run_pdf_task(PDFProcessor._write_working_copy, work_path, garbage=4)
+        
+        output.font_report = font_report
+        return output
+    
+    @staticmethod
+    def _stream_batches(pdf_path, batch_count, work_path=None):
+        """Recompressible streams split into size-balanced batches - runs in a pool worker
+        A few batches per worker, so slow ones do not hold up the rest.
+        work_path: also save a copy there (same object numbers) to store the results in
+        Returns a list of xref lists.
+        """
+        doc = fitz.open(pdf_path, filetype='pdf')
+        try:
+            streams = PDFProcessor._recompressible_streams(doc)
+            if work_path:
+                # A fresh save, so a repaired input can still take incremental writes
+                doc.save(work_path)
+        finally:
+            doc.close()
+        
+        batch_count = max(1, min(len(streams), batch_count))
+        batches = [[] for _ in range(batch_count)]
+        loads = [0] * batch_count
+        for xref, length in sorted(streams, key=lambda stream: stream[1], reverse=True):
+            lightest = loads.index(min(loads))
+            batches[lightest].append(xref)
+            loads[lightest] += length
+        return [batch for batch in batches if batch]
+    
+    @staticmethod
+    def _store_deflated_streams(doc_path, results):
+        """Store one batch of re-deflated streams in a working copy - runs in a pool worker
+        Returns bytes saved
+        """
+        with fitz.open(doc_path, filetype='pdf') as doc:
+            saved = PDFProcessor._apply_deflated_streams(doc, results)
+            doc.saveIncr()
+        return saved
+    
+    @staticmethod
+    def _recompressible_streams(doc):
+        """(xref, stored length) of every stream whose filters can be re-deflated losslessly"""
+        streams = []
+        for xref in range(1, doc.xref_length()):
+            if not doc.xref_is_stream(xref):
+                continue
+            if doc.xref_get_key(xref, 'Type')[1] in SKIPPED_STREAM_TYPES:
+                continue
+            kind, value = doc.xref_get_key(xref, 'Filter')
+            filters = set(re.findall(r'/(\w+)', value)) if kind != 'null' else set()
+            if filters - LOSSLESS_FILTERS:
+                continue  # JPEG, JPEG 2000, CCITT and JBIG2 data is left as it is
+            streams.append((xref, stream_length(doc, xref)))
+        return streams
+    
+    @staticmethod
+    def _deflate_stream_batch(pdf_path, xrefs):
+        """Re-deflate streams of a file at level 9 - runs in a pool worker"""
+        with fitz.open(pdf_path, filetype='pdf') as doc:
+            return PDFProcessor._deflate_streams(doc, xrefs)
+    
+    @staticmethod
+    def _deflate_streams(doc, xrefs):
+        """Decode each stream and deflate it at the highest level
+        Returns [(xref, data)] for the streams that got smaller
+        """
+        results = []
+        for xref in xrefs:
+            try:
+                data = zlib.compress(doc.xref_stream(xref), 9)
+            except Exception as e:
+                print(f"Skipping stream {xref}: {e}")
+                continue
+            if len(data) < len(doc.xref_stream_raw(xref)):
+                results.append((xref, data))
+        return results
+    
+    @staticmethod
+    def _apply_deflated_streams(doc, results):
+        """Store re-deflated streams; returns bytes saved"""
+        saved = 0
+        for xref, data in results:
+            saved += len(doc.xref_stream_raw(xref)) - len(data)
+            # A raw update clears Filter/DecodeParms (predictors are undone by decoding)
+            doc.update_stream(xref, data, compress=0)
+            doc.xref_set_key(xref, 'Filter', '/FlateDecode')
+        return saved
     
     @staticmethod
     def basic_compress_pdf(pdf_file, quality='medium'):
         """Basic compression using pypdf for text-based PDFs"""
+        # Lossless font stage first: subset fonts and merge duplicated font programs
+        try:
+            pdf_file, font_report = PDFProcessor.optimize_fonts_pdf(pdf_file)
+        except Exception as e:
+            print(f"Font optimization failed: {e}")
+            pdf_file.seek(0)
+            font_report = []
+        
         reader = PdfReader(pdf_file)
         writer = PdfWriter()
         
@@ -330,114 +989,139 @@ class PDFProcessor:
                 pass
         
         # Write with compression
-        output = BytesIO()
-        writer.write(output)
-        output.seek(0)
+        output = write_pypdf(writer)
+        output.font_report = font_report  # Travels with the buffer out of pool workers
         return output
     
     @staticmethod
     def pdf_to_images(pdf_file, image_format='PNG', dpi=200):
-        """Convert PDF pages to images - supports both text and scanned PDFs"""
+        """Convert PDF pages to images - supports both text and scanned PDFs
+        Returns a zip of all pages; see page_images for streaming them one by one
+        """
+        # Create zip file with images (already compressed, so store them as-is)
+        zip_buffer = BytesIO()
+        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_STORED) as zip_file:
+            for name, image in PDFProcessor.page_images(pdf_file, image_format, dpi):
+                if isinstance(image, bytes):
+                    zip_file.writestr(name, image)
+                else:
+                    zip_file.write(image, name)
+        
+        zip_buffer.seek(0)
+        return zip_buffer
+    
+    @staticmethod
+    def page_images(pdf_file, image_format='PNG', dpi=200):
+        """Convert PDF pages to images lazily
+        Returns a generator of (filename, image bytes or path) in page order.
+        Conversion errors are raised here, before the first page is handed out.
+        """
         try:
             # First try with pdf2image (poppler-based) - best quality
-            return PDFProcessor._pdf_to_images_pdf2image(pdf_file, image_format, dpi)
+            return PDFProcessor._page_images_pdf2image(pdf_file, image_format, dpi)
         except Exception as pdf2image_error:
             print(f"pdf2image failed, trying PyMuPDF fallback: {pdf2image_error}")
             try:
                 # Fallback to PyMuPDF - works without external dependencies
-                return PDFProcessor._pdf_to_images_pymupdf(pdf_file, image_format, dpi)
+                return PDFProcessor._page_images_pymupdf(pdf_file, image_format, dpi)
             except Exception as pymupdf_error:
                 raise Exception(f"PDF to image conversion failed with both methods. "
                               f"pdf2image: {str(pdf2image_error)}. "
                               f"PyMuPDF: {str(pymupdf_error)}")
     
     @staticmethod
-    def _pdf_to_images_pdf2image(pdf_file, image_format='PNG', dpi=200):
+    def _page_images_pdf2image(pdf_file, image_format='PNG', dpi=200):
         """Convert PDF to images using pdf2image (poppler)"""
-        # Save PDF to temporary file for pdf2image
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            pdf_file.seek(0)
-            temp_pdf.write(pdf_file.read())
-            temp_pdf_path = temp_pdf.name
+        is_jpeg = image_format.upper() in ['JPG', 'JPEG']
+        file_extension = 'jpg' if is_jpeg else 'png'
+        output_dir = tempfile.mkdtemp()
         
         try:
-            # Convert PDF to images
-            pages = convert_from_path(temp_pdf_path, dpi=dpi)
-            
-            # Create zip file with images
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for i, page in enumerate(pages):
-                    img_buffer = BytesIO()
-                    # Convert format for PIL compatibility
-                    pil_format = 'JPEG' if image_format.upper() in ['JPG', 'JPEG'] else image_format
-                    file_extension = 'jpg' if image_format.upper() in ['JPG', 'JPEG'] else image_format.lower()
-                    
-                    page.save(img_buffer, format=pil_format)
-                    img_buffer.seek(0)
-                    
-                    zip_file.writestr(f'page_{i+1}.{file_extension}', img_buffer.getvalue())
-            
-            zip_buffer.seek(0)
-            return zip_buffer
+            # poppler reads the upload where it is (in-memory uploads get a temp copy)
+            with local_pdf_path(pdf_file) as pdf_path:
+                # Let poppler encode the images straight to disk, splitting the
+                # page range across several pdftoppm processes
+                page_paths = convert_from_path(
+                    pdf_path, dpi=dpi,
+                    fmt='jpeg' if is_jpeg else 'png',
+                    output_folder=output_dir,
+                    paths_only=True,
+                    thread_count=parallel_worker_count()
+                )
+        except Exception:
+            shutil.rmtree(output_dir, ignore_errors=True)
+            raise
         
-        finally:
-            # Clean up temporary file
+        def entries():
+            # The rendered pages stay on disk until they have been handed out
             try:
-                os.unlink(temp_pdf_path)
-            except:
-                pass
+                for i, page_path in enumerate(page_paths):
+                    yield f'page_{i+1}.{file_extension}', page_path
+            finally:
+                shutil.rmtree(output_dir, ignore_errors=True)
+        
+        return entries()
     
     @staticmethod
-    def _pdf_to_images_pymupdf(pdf_file, image_format='PNG', dpi=200):
-        """Convert PDF to images using PyMuPDF (fallback method)"""
-        # Save PDF to temporary file for PyMuPDF
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as temp_pdf:
-            pdf_file.seek(0)
-            temp_pdf.write(pdf_file.read())
-            temp_pdf_path = temp_pdf.name
+    def _render_page_range(pdf_path, start_page, end_page, image_format='PNG', dpi=200):
+        """Render pages [start_page, end_page) to encoded images - runs in a pool worker
+        Returns a list of (page_number, file_extension, image_bytes) in page order
+        """
+        # Calculate zoom factor for desired DPI (default is 72 DPI)
+        zoom = dpi / 72.0
+        mat = fitz.Matrix(zoom, zoom)
         
+        rendered = []
+        doc = fitz.open(pdf_path)
         try:
-            # Open PDF with PyMuPDF
-            doc = fitz.open(temp_pdf_path)
-            
-            # Create zip file with images
-            zip_buffer = BytesIO()
-            with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-                for page_num in range(len(doc)):
-                    page = doc[page_num]
-                    
-                    # Calculate zoom factor for desired DPI (default is 72 DPI)
-                    zoom = dpi / 72.0
-                    mat = fitz.Matrix(zoom, zoom)
-                    
-                    # Render page to image
-                    pix = page.get_pixmap(matrix=mat)
-                    
-                    # Convert to desired format
-                    if image_format.upper() == 'PNG':
-                        img_data = pix.tobytes("png")
-                        file_extension = 'png'
-                    elif image_format.upper() in ['JPG', 'JPEG']:
-                        img_data = pix.tobytes("jpeg")
-                        file_extension = 'jpg'
-                    else:
-                        # Default to PNG for other formats
-                        img_data = pix.tobytes("png")
-                        file_extension = 'png'
-                    
-                    zip_file.writestr(f'page_{page_num+1}.{file_extension}', img_data)
-            
+            for page_num in range(start_page, end_page):
+                # Render page to image
+                pix = doc[page_num].get_pixmap(matrix=mat)
+                
+                # Convert to desired format (default to PNG for other formats)
+                if image_format.upper() in ['JPG', 'JPEG']:
+                    rendered.append((page_num, 'jpg', pixmap_to_jpeg(pix)))
+                else:
+                    rendered.append((page_num, 'png', pix.tobytes("png")))
+        finally:
             doc.close()
-            zip_buffer.seek(0)
-            return zip_buffer
         
-        finally:
-            # Clean up temporary file
-            try:
-                os.unlink(temp_pdf_path)
-            except:
-                pass
+        return rendered
+    
+    @staticmethod
+    def _page_shards(total_pages, max_shard_size=8):
+        """Split a page count into contiguous (start, end) ranges for the worker pool"""
+        workers = parallel_worker_count()
+        shard_size = max(1, min(max_shard_size, -(-total_pages // workers)))
+        return [(start, min(start + shard_size, total_pages)) for start in range(0, total_pages, shard_size)]
+    
+    @staticmethod
+    def _page_images_pymupdf(pdf_file, image_format='PNG', dpi=200):
+        """Convert PDF to images using PyMuPDF (fallback method)"""
+        # Workers open the upload by path; in-memory uploads get a temporary
+        # copy that lives until the last page has been handed out
+        cleanup = ExitStack()
+        try:
+            pdf_path = cleanup.enter_context(local_pdf_path(pdf_file))
+            total_pages = run_pdf_task(PDFProcessor.page_count, pdf_path)
+        except Exception:
+            cleanup.close()
+            raise
+        
+        # Each shard opens the document independently in a worker process;
+        # shards come back in page order while later ones are still rendering
+        shard_args = [
+            (pdf_path, start, end, image_format, dpi)
+            for start, end in PDFProcessor._page_shards(total_pages)
+        ]
+        
+        def entries():
+            with cleanup:
+                for rendered in map_pdf_tasks(PDFProcessor._render_page_range, shard_args):
+                    for page_num, file_extension, img_data in rendered:
+                        yield f'page_{page_num+1}.{file_extension}', img_data
+        
+        return entries()
     
     @staticmethod
     def images_to_pdf(image_files, rotations=None):
@@ -536,10 +1220,10 @@ class PDFProcessor:
             raise Exception("No valid images could be processed")
         
         # Save PDF to bytes
-        pdf_bytes = doc.tobytes()
+        output = write_pdf(doc)
         doc.close()
         
-        return BytesIO(pdf_bytes)
+        return output
     
     @staticmethod
     def extract_text(pdf_file):
@@ -567,51 +1251,46 @@ class PDFProcessor:
     @staticmethod
     def _extract_text_with_ocr(pdf_file):
         """Extract text using OCR for scanned PDFs"""
+        import importlib.util
         import tempfile
         import os
-        from pdf2image import convert_from_bytes
         
-        try:
-            import easyocr
-        except ImportError:
+        # Fail before rendering pages; the reader itself comes from the OCR pool
+        if importlib.util.find_spec('easyocr') is None:
             raise Exception("OCR functionality requires 'easyocr' package. Install with: pip install easyocr")
         
         text_content = ""
         temp_files = []
         
         try:
-            # Initialize EasyOCR reader (supports multiple languages)
-            reader = easyocr.Reader(['en'])  # Add more languages as needed: ['en', 'es', 'fr']
-            
-            # Convert PDF to images
-            pdf_file.seek(0)
-            pdf_bytes = pdf_file.read()
-            
-            # Convert PDF pages to images
-            images = convert_from_bytes(pdf_bytes, dpi=300)  # Higher DPI for better OCR
-            
-            for page_num, image in enumerate(images, 1):
-                # Save image to temporary file
-                with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
-                    temp_files.append(temp_img.name)
-                    image.save(temp_img.name, 'PNG')
-                
-                # Perform OCR on the image
-                try:
-                    results = reader.readtext(temp_img.name)
+            # Convert PDF pages to images (poppler reads the upload by path)
+            with local_pdf_path(pdf_file) as pdf_path:
+                images = convert_from_path(pdf_path, dpi=300)  # Higher DPI for better OCR
+            
+            # Check out the pooled EasyOCR reader (loaded once per worker)
+            with get_ocr_reader(['en']) as reader:  # Add more languages as needed: ['en', 'es', 'fr']
+                for page_num, image in enumerate(images, 1):
+                    # Save image to temporary file
+                    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_img:
+                        temp_files.append(temp_img.name)
+                        image.save(temp_img.name, 'PNG')
                     
-                    # Extract text from OCR results
-                    page_text = ""
-                    for (bbox, text, confidence) in results:
-                        if confidence > 0.3:  # Only include text with reasonable confidence
-                            page_text += text + " "
+                    # Perform OCR on the image
+                    try:
+                        results = reader.readtext(temp_img.name)
+                        
+                        # Extract text from OCR results
+                        page_text = ""
+                        for (bbox, text, confidence) in results:
+                            if confidence > 0.3:  # Only include text with reasonable confidence
+                                page_text += text + " "
+                        
+                        if page_text.strip():
+                            text_content += f"--- Page {page_num} (OCR) ---\n{page_text.strip()}\n\n"
                     
-                    if page_text.strip():
-                        text_content += f"--- Page {page_num} (OCR) ---\n{page_text.strip()}\n\n"
-                
-                except Exception as ocr_error:
-                    print(f"OCR error on page {page_num}: {ocr_error}")
-                    text_content += f"--- Page {page_num} (OCR Failed) ---\nError processing this page\n\n"
+                    except Exception as ocr_error:
+                        print(f"OCR error on page {page_num}: {ocr_error}")
+                        text_content += f"--- Page {page_num} (OCR Failed) ---\nError processing this page\n\n"
         
         except Exception as e:
             print(f"OCR processing error: {e}")
@@ -640,12 +1319,21 @@ class PDFProcessor:
     def add_watermark(pdf_file, watermark_text, position='center', opacity=0.3, 
                      font_size=36, color='gray', rotation=0, x_offset=0, y_offset=0):
         """Add enhanced text watermark to PDF with customizable options"""
-        import fitz  # PyMuPDF for better watermark control
-        import math
-        
         # Read PDF with PyMuPDF for better control
-        doc = fitz.open("pdf", pdf_file.read())
+        doc = open_pdf(pdf_file)
+        PDFProcessor._draw_text_watermark(doc, watermark_text, position, opacity, font_size,
+                                          color, rotation, x_offset, y_offset)
         
+        # Save to BytesIO
+        output = write_pdf(doc)
+        doc.close()
+        
+        return output
+    
+    @staticmethod
+    def _draw_text_watermark(doc, watermark_text, position='center', opacity=0.3,
+                             font_size=36, color='gray', rotation=0, x_offset=0, y_offset=0):
+        """Stamp a text watermark onto every page of an open fitz document"""
         # Color mapping
         color_map = {
             'red': (1, 0, 0),
@@ -737,25 +1425,25 @@ class PDFProcessor:
                     fill_opacity=0.3 * (1 - opacity)  # Reduce opacity further
                 )
                 shape.commit()
-        
-        # Save to BytesIO
-        pdf_bytes = doc.tobytes()
-        doc.close()
-        
-        return BytesIO(pdf_bytes)
     
     @staticmethod
     def add_image_watermark(pdf_file, image_file, position='center', opacity=0.3, 
                            scale=1.0, x_offset=0, y_offset=0):
         """Add image watermark to PDF with customizable options"""
-        import fitz  # PyMuPDF for better watermark control
-        from PIL import Image
-        import tempfile
-        import os
-        
         # Read PDF with PyMuPDF
-        doc = fitz.open("pdf", pdf_file.read())
+        doc = open_pdf(pdf_file)
+        PDFProcessor._draw_image_watermark(doc, image_file, position, opacity, scale, x_offset, y_offset)
         
+        # Save to BytesIO
+        output = write_pdf(doc)
+        doc.close()
+        
+        return output
+    
+    @staticmethod
+    def _draw_image_watermark(doc, image_file, position='center', opacity=0.3,
+                              scale=1.0, x_offset=0, y_offset=0):
+        """Stamp an image watermark onto every page of an open fitz document"""
         # Create temporary file for the image
         temp_image_path = None
         try:
@@ -835,12 +1523,6 @@ class PDFProcessor:
                     os.unlink(temp_image_path)
                 except:
                     pass
-        
-        # Save to BytesIO
-        pdf_bytes = doc.tobytes()
-        doc.close()
-        
-        return BytesIO(pdf_bytes)
     
     @staticmethod
     def rotate_pages(pdf_file, rotations):
@@ -862,49 +1544,61 @@ class PDFProcessor:
     @staticmethod
     def _rotate_pages_pymupdf(pdf_file, rotations):
         """Rotate pages using PyMuPDF (primary method - better for scanned PDFs)"""
-        import fitz  # PyMuPDF
-        
-        # Ensure we're at the beginning and read content
-        pdf_file.seek(0)
-        pdf_content = pdf_file.read()
-        
-        # Verify we have content
-        if not pdf_content:
-            raise Exception("PDF file is empty or could not be read")
-        
-        # Open PDF with PyMuPDF
-        pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+        # Open PDF with PyMuPDF straight from the upload (by path when it is on disk)
+        pdf_doc = open_pdf(pdf_file)
         
         try:
-            # Rotate specified pages
-            for page_num, rotation_angle in rotations.items():
-                if 1 <= page_num <= pdf_doc.page_count:
-                    page = pdf_doc[page_num - 1]  # PyMuPDF uses 0-based indexing
-                    
-                    # Apply rotation (normalize angle to 0, 90, 180, 270)
-                    normalized_angle = rotation_angle % 360
-                    if normalized_angle == 90:
-                        page.set_rotation(90)
-                    elif normalized_angle == 180:
-                        page.set_rotation(180)
-                    elif normalized_angle == 270:
-                        page.set_rotation(270)
-                    elif normalized_angle == 0:
-                        page.set_rotation(0)
-                    else:
-                        # Round to nearest 90-degree increment
-                        nearest_angle = round(normalized_angle / 90) * 90
-                        page.set_rotation(nearest_angle % 360)
+            PDFProcessor._apply_rotations(pdf_doc, rotations)
             
             # Save to BytesIO
-            output = BytesIO()
-            output.write(pdf_doc.write())
+            output = write_pdf(pdf_doc)
             output.seek(0)
             return output
             
         finally:
             pdf_doc.close()
 
+    @staticmethod
+    def rotations_for_pages(pages_str, angle, total_pages):
+        """Build {page_number: angle} from a page spec such as 'all', '1,3,5' or '1-5'"""
+        pages_str = str(pages_str or 'all')
+        if pages_str == 'all':
+            return {page: angle for page in range(1, total_pages + 1)}
+        
+        page_numbers = []
+        for part in pages_str.split(','):
+            part = part.strip()
+            if '-' in part:
+                # Handle range like "1-5"
+                start, end = part.split('-', 1)
+                page_numbers.extend(range(int(start.strip()), int(end.strip()) + 1))
+            elif part:
+                page_numbers.append(int(part))
+        
+        return {page: angle for page in page_numbers if 1 <= page <= total_pages}
+
+    @staticmethod
+    def _apply_rotations(pdf_doc, rotations):
+        """Set page rotations on an open fitz document (1-based page numbers)"""
+        for page_num, rotation_angle in rotations.items():
+            if 1 <= page_num <= pdf_doc.page_count:
+                page = pdf_doc[page_num - 1]  # PyMuPDF uses 0-based indexing
+                
+                # Apply rotation (normalize angle to 0, 90, 180, 270)
+                normalized_angle = rotation_angle % 360
+                if normalized_angle == 90:
+                    page.set_rotation(90)
+                elif normalized_angle == 180:
+                    page.set_rotation(180)
+                elif normalized_angle == 270:
+                    page.set_rotation(270)
+                elif normalized_angle == 0:
+                    page.set_rotation(0)
+                else:
+                    # Round to nearest 90-degree increment
+                    nearest_angle = round(normalized_angle / 90) * 90
+                    page.set_rotation(nearest_angle % 360)
+
     @staticmethod
     def _rotate_pages_pypdf(pdf_file, rotations):
         """Rotate pages using pypdf (fallback method)"""
@@ -935,9 +1629,7 @@ class PDFProcessor:
                 # For 0 degrees or other angles, don't rotate
             writer.add_page(page)
         
-        output = BytesIO()
-        writer.write(output)
-        output.seek(0)
+        output = write_pypdf(writer)
         return output
     
     @staticmethod
@@ -958,46 +1650,41 @@ class PDFProcessor:
     @staticmethod
     def _secure_pdf_pymupdf(pdf_file, user_password=None, owner_password=None):
         """Secure PDF using PyMuPDF (primary method - better encryption)"""
-        import fitz  # PyMuPDF
-        
-        # Ensure we're at the beginning and read content
-        pdf_file.seek(0)
-        pdf_content = pdf_file.read()
-        
-        if not pdf_content:
-            raise Exception("PDF file is empty or could not be read")
-        
-        # Open PDF with PyMuPDF
-        pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+        # Open PDF with PyMuPDF straight from the upload (by path when it is on disk)
+        pdf_doc = open_pdf(pdf_file)
         
         try:
-            # Set passwords and permissions
-            user_pwd = user_password or ""
-            owner_pwd = owner_password or user_password or ""
-            
-            # Define permissions (restrict printing, copying, etc.)
-            permissions = (
-                fitz.PDF_PERM_PRINT |      # Allow printing
-                fitz.PDF_PERM_COPY |       # Allow copying
-                fitz.PDF_PERM_ANNOTATE |   # Allow annotations
-                fitz.PDF_PERM_FORM |       # Allow form filling
-                fitz.PDF_PERM_ACCESSIBILITY  # Allow accessibility
-            )
-            
             # Save with encryption
-            output = BytesIO()
-            output.write(pdf_doc.write(
-                encryption=fitz.PDF_ENCRYPT_AES_256,  # Strong AES-256 encryption
-                user_pw=user_pwd,
-                owner_pw=owner_pwd,
-                permissions=permissions
-            ))
+            output = write_pdf(pdf_doc, **PDFProcessor._encryption_options(user_password, owner_password))
             output.seek(0)
             return output
             
         finally:
             pdf_doc.close()
 
+    @staticmethod
+    def _encryption_options(user_password=None, owner_password=None):
+        """fitz save/write keyword arguments for AES-256 password protection"""
+        # Set passwords and permissions
+        user_pwd = user_password or ""
+        owner_pwd = owner_password or user_password or ""
+        
+        # Define permissions (restrict printing, copying, etc.)
+        permissions = (
+            fitz.PDF_PERM_PRINT |      # Allow printing
+            fitz.PDF_PERM_COPY |       # Allow copying
+            fitz.PDF_PERM_ANNOTATE |   # Allow annotations
+            fitz.PDF_PERM_FORM |       # Allow form filling
+            fitz.PDF_PERM_ACCESSIBILITY  # Allow accessibility
+        )
+        
+        return {
+            'encryption': fitz.PDF_ENCRYPT_AES_256,  # Strong AES-256 encryption
+            'user_pw': user_pwd,
+            'owner_pw': owner_pwd,
+            'permissions': permissions,
+        }
+
     @staticmethod 
     def _secure_pdf_pypdf(pdf_file, user_password=None, owner_password=None):
         """Secure PDF using pypdf (fallback method)"""
@@ -1026,9 +1713,8 @@ class PDFProcessor:
             use_128bit=True  # Use 128-bit encryption
         )
         
-        output = BytesIO()
-        writer.write(output)
-        output.seek(0)
+        # Already encrypted, so it is written as is
+        output = write_pypdf(writer, encrypted=True)
         return output
     
     @staticmethod
@@ -1049,17 +1735,8 @@ class PDFProcessor:
     @staticmethod
     def _unlock_pdf_pymupdf(pdf_file, password):
         """Unlock PDF using PyMuPDF (primary method - better encrypted PDF support)"""
-        import fitz  # PyMuPDF
-        
-        # Ensure we're at the beginning and read content
-        pdf_file.seek(0)
-        pdf_content = pdf_file.read()
-        
-        if not pdf_content:
-            raise Exception("PDF file is empty or could not be read")
-        
-        # Open PDF with PyMuPDF
-        pdf_doc = fitz.open(stream=pdf_content, filetype="pdf")
+        # Open PDF with PyMuPDF straight from the upload (by path when it is on disk)
+        pdf_doc = open_pdf(pdf_file)
         
         try:
             # Check if PDF is encrypted
@@ -1069,8 +1746,7 @@ class PDFProcessor:
                     raise ValueError("Invalid password - could not decrypt PDF")
             
             # Create unlocked copy (without password protection)
-            output = BytesIO()
-            output.write(pdf_doc.write())  # Save without encryption
+            output = write_pdf(pdf_doc, encryption=fitz.PDF_ENCRYPT_NONE)
             output.seek(0)
             return output
             
@@ -1099,9 +1775,7 @@ class PDFProcessor:
         for page in reader.pages:
             writer.add_page(page)
         
-        output = BytesIO()
-        writer.write(output)
-        output.seek(0)
+        output = write_pypdf(writer)
         return output
 
     @staticmethod
@@ -1113,7 +1787,7 @@ class PDFProcessor:
             import os
             
             # Use PyMuPDF for high-quality preview generation
-            doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            doc = open_pdf(pdf_file)
             preview_urls = []
             
             for page_num in range(len(doc)):
@@ -1134,6 +1808,43 @@ class PDFProcessor:
             
         except Exception as e:
             raise ValueError(f"Failed to generate preview images: {str(e)}")
+    
+    @staticmethod
+    def page_count(pdf_file):
+        """Number of pages of an upload or a file path - runs in a pool worker"""
+        doc = fitz.open(pdf_file, filetype='pdf') if isinstance(pdf_file, str) else open_pdf(pdf_file)
+        try:
+            return doc.page_count
+        finally:
+            doc.close()
+    
+    @staticmethod
+    def get_page_sizes(pdf_path):
+        """Return [(width, height), ...] in points for every page, without rendering"""
+        with open_document(pdf_path) as doc:
+            if doc.needs_pass:
+                raise ValueError("PDF is password protected")
+            return [(round(page.rect.width, 2), round(page.rect.height, 2)) for page in doc]
+    
+    @staticmethod
+    def render_page_thumbnail(pdf_path, page_num, width=200, image_format='webp', quality=80):
+        """Render a single page scaled to the given pixel width
+        Returns encoded image bytes (WebP or JPEG)
+        """
+        # Thumbnails of one document are requested in bursts, so keep it parsed
+        with open_document(pdf_path) as doc:
+            if not 0 <= page_num < len(doc):
+                raise IndexError(f"Page {page_num + 1} does not exist")
+            
+            page = doc[page_num]
+            zoom = width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        
+        if image_format == 'webp':
+            output = BytesIO()
+            pixmap_to_pil(pix).save(output, format='WEBP', quality=quality)
+            return output.getvalue()
+        return pixmap_to_jpeg(pix, quality)
 
 
 class DocumentConverter:
@@ -1146,7 +1857,7 @@ class DocumentConverter:
             # Reset file pointer
             pdf_file.seek(0)
             
-            doc = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            doc = open_pdf(pdf_file)
             total_chars = 0
             total_pages = len(doc)
             
@@ -1551,8 +2262,6 @@ class DocumentConverter:
             from docx.shared import Inches, Pt, RGBColor
             from docx.enum.text import WD_ALIGN_PARAGRAPH
             from docx.enum.style import WD_STYLE_TYPE
-            import numpy as np
-            from PIL import Image
             import re
             
             # Detect if PDF is scanned
@@ -1627,7 +2336,7 @@ class DocumentConverter:
                                 continue
                 
             # Extract content from PDF using PyMuPDF with enhanced text extraction
-            doc_fitz = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            doc_fitz = open_pdf(pdf_file)
             
             total_pages = len(doc_fitz)
             
@@ -1692,24 +2401,17 @@ class DocumentConverter:
                         # High-resolution image conversion for better OCR
                         resolution_matrix = fitz.Matrix(4, 4) if is_scanned else fitz.Matrix(2, 2)
                         pix = page.get_pixmap(matrix=resolution_matrix)
-                        img_data = pix.tobytes("png")
                         
-                        # Use EasyOCR with better configuration
-                        import easyocr
-                        
-                        # Initialize OCR reader
-                        reader = easyocr.Reader(['en'], gpu=False, verbose=False)
-                        
-                        # Convert to image and enhance for OCR
-                        img = Image.open(BytesIO(img_data))
-                        img_array = np.array(img)
+                        # View the pixels as an array and enhance for OCR
+                        img_array = pixmap_to_numpy(pix)
                         
                         # Enhance image for better OCR results
                         enhanced_img = DocumentConverter.enhance_image_for_ocr(img_array)
                         
                         # Extract text with bounding boxes for layout preservation
-                        ocr_results = reader.readtext(enhanced_img, detail=1, paragraph=True,
-                                                    width_ths=0.8, height_ths=0.8)
+                        with get_ocr_reader(['en']) as reader:
+                            ocr_results = reader.readtext(enhanced_img, detail=1, paragraph=True,
+                                                        width_ths=0.8, height_ths=0.8)
                         
                         # Sort OCR results by vertical position for better text flow
                         ocr_results.sort(key=lambda x: (x[0][0][1], x[0][0][0]))  # Sort by Y then X
@@ -1909,7 +2611,7 @@ class DocumentConverter:
             
             # Simple text extraction
             pdf_file.seek(0)
-            doc_fitz = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            doc_fitz = open_pdf(pdf_file)
             doc = Document()
             
             total_text_found = ""
@@ -1997,7 +2699,7 @@ class DocumentConverter:
             from pptx.dml.color import RGBColor
             
             # Extract content from PDF
-            doc_fitz = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            doc_fitz = open_pdf(pdf_file)
             
             # Create new presentation
             prs = Presentation()
@@ -2021,22 +2723,13 @@ class DocumentConverter:
                     try:
                         # Convert page to image for OCR
                         pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Higher resolution
-                        img_data = pix.tobytes("png")
-                        
-                        # Use EasyOCR for text extraction
-                        import easyocr
-                        import numpy as np
-                        from PIL import Image
-                        
-                        # Initialize OCR reader
-                        reader = easyocr.Reader(['en'])
                         
-                        # Convert to numpy array for EasyOCR
-                        img = Image.open(BytesIO(img_data))
-                        img_array = np.array(img)
+                        # View the pixels as a numpy array for EasyOCR
+                        img_array = pixmap_to_numpy(pix)
                         
                         # Extract text using OCR
-                        results = reader.readtext(img_array)
+                        with get_ocr_reader(['en']) as reader:
+                            results = reader.readtext(img_array)
                         ocr_text = ' '.join([result[1] for result in results])
                         
                         if ocr_text.strip():
@@ -2080,7 +2773,7 @@ class DocumentConverter:
             from openpyxl.utils.dataframe import dataframe_to_rows
             
             # Extract text from PDF
-            doc_fitz = fitz.open(stream=pdf_file.read(), filetype="pdf")
+            doc_fitz = open_pdf(pdf_file)
             
             # Create workbook
             wb = Workbook()
@@ -2095,22 +2788,13 @@ class DocumentConverter:
                     try:
                         # Convert page to image for OCR
                         pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))  # Higher resolution
-                        img_data = pix.tobytes("png")
                         
-                        # Use EasyOCR for text extraction
-                        import easyocr
-                        import numpy as np
-                        from PIL import Image
-                        
-                        # Initialize OCR reader
-                        reader = easyocr.Reader(['en'])
-                        
-                        # Convert to numpy array for EasyOCR
-                        img = Image.open(BytesIO(img_data))
-                        img_array = np.array(img)
+                        # View the pixels as a numpy array for EasyOCR
+                        img_array = pixmap_to_numpy(pix)
                         
                         # Extract text using OCR
-                        results = reader.readtext(img_array)
+                        with get_ocr_reader(['en']) as reader:
+                            results = reader.readtext(img_array)
                         ocr_text = ' '.join([result[1] for result in results])
                         
                         if ocr_text.strip():
@@ -2272,29 +2956,40 @@ class PDFOrganizer:
     def organize_pdf(pdf_file, operation='auto', page_order=None):
         """Organize PDF pages based on content or user specifications"""
         try:
-            doc_fitz = fitz.open(stream=pdf_file.read(), filetype="pdf")
-            
-            if operation == 'manual' and page_order:
-                # Manual reordering based on user-specified page order
-                return PDFOrganizer._manual_reorder(doc_fitz, page_order)
-            elif operation == 'auto':
-                # Auto-organize based on content analysis
-                return PDFOrganizer._auto_organize(doc_fitz)
-            elif operation == 'bookmark':
-                # Organize based on bookmarks/outline
-                return PDFOrganizer._organize_by_bookmarks(doc_fitz)
-            elif operation == 'blank_remove':
-                # Remove blank pages
-                return PDFOrganizer._remove_blank_pages(doc_fitz)
-            elif operation == 'duplicate_remove':
-                # Remove duplicate pages
-                return PDFOrganizer._remove_duplicate_pages(doc_fitz)
-            else:
-                raise ValueError(f"Unknown organization operation: {operation}")
+            doc_fitz = open_pdf(pdf_file)
+            organized_doc = PDFOrganizer.organize_document(doc_fitz, operation, page_order)
+            
+            # Save to BytesIO
+            buffer = write_pdf(organized_doc)
+            if organized_doc is not doc_fitz:
+                organized_doc.close()
+            doc_fitz.close()
+            return buffer
                 
         except Exception as e:
             raise ValueError(f"Failed to organize PDF: {str(e)}")
     
+    @staticmethod
+    def organize_document(doc_fitz, operation='auto', page_order=None):
+        """Return the organized fitz document (doc_fitz itself when nothing changes)"""
+        if operation == 'manual' and page_order:
+            # Manual reordering based on user-specified page order
+            return PDFOrganizer._manual_reorder(doc_fitz, page_order)
+        elif operation == 'auto':
+            # Auto-organize based on content analysis
+            return PDFOrganizer._auto_organize(doc_fitz)
+        elif operation == 'bookmark':
+            # Organize based on bookmarks/outline
+            return PDFOrganizer._organize_by_bookmarks(doc_fitz)
+        elif operation == 'blank_remove':
+            # Remove blank pages
+            return PDFOrganizer._remove_blank_pages(doc_fitz)
+        elif operation == 'duplicate_remove':
+            # Remove duplicate pages
+            return PDFOrganizer._remove_duplicate_pages(doc_fitz)
+        else:
+            raise ValueError(f"Unknown organization operation: {operation}")
+    
     @staticmethod
     def _manual_reorder(doc_fitz, page_order):
         """Manually reorder PDF pages based on user specification"""
@@ -2307,13 +3002,7 @@ class PDFOrganizer:
                 organized_doc.new_page(width=source_page.rect.width, height=source_page.rect.height)
                 organized_doc[-1].show_pdf_page(source_page.rect, doc_fitz, page_index)
         
-        # Save to BytesIO
-        buffer = BytesIO()
-        organized_doc.save(buffer)
-        organized_doc.close()
-        doc_fitz.close()
-        buffer.seek(0)
-        return buffer
+        return organized_doc
     
     @staticmethod
     def _auto_organize(doc_fitz):
@@ -2341,13 +3030,7 @@ class PDFOrganizer:
         for page_num in text_pages + mixed_pages + image_pages:
             organized_doc.insert_pdf(doc_fitz, from_page=page_num, to_page=page_num)
         
-        # Save to BytesIO
-        buffer = BytesIO()
-        organized_doc.save(buffer)
-        organized_doc.close()
-        doc_fitz.close()
-        buffer.seek(0)
-        return buffer
+        return organized_doc
     
     @staticmethod
     def _organize_by_bookmarks(doc_fitz):
@@ -2356,10 +3039,7 @@ class PDFOrganizer:
         
         if not toc:
             # No bookmarks found, return original
-            buffer = BytesIO()
-            doc_fitz.save(buffer)
-            buffer.seek(0)
-            return buffer
+            return doc_fitz
         
         organized_doc = fitz.open()
         
@@ -2377,12 +3057,7 @@ class PDFOrganizer:
             if page_num not in processed_pages:
                 organized_doc.insert_pdf(doc_fitz, from_page=page_num, to_page=page_num)
         
-        buffer = BytesIO()
-        organized_doc.save(buffer)
-        organized_doc.close()
-        doc_fitz.close()
-        buffer.seek(0)
-        return buffer
+        return organized_doc
     
     @staticmethod
     def _remove_blank_pages(doc_fitz):
@@ -2398,12 +3073,7 @@ class PDFOrganizer:
             if len(text) > 50 or image_list:
                 organized_doc.insert_pdf(doc_fitz, from_page=page_num, to_page=page_num)
         
-        buffer = BytesIO()
-        organized_doc.save(buffer)
-        organized_doc.close()
-        doc_fitz.close()
-        buffer.seek(0)
-        return buffer
+        return organized_doc
     
     @staticmethod
     def _remove_duplicate_pages(doc_fitz):
@@ -2422,9 +3092,123 @@ class PDFOrganizer:
                 organized_doc.insert_pdf(doc_fitz, from_page=page_num, to_page=page_num)
                 seen_content.add(content_hash)
         
-        buffer = BytesIO()
-        organized_doc.save(buffer)
-        organized_doc.close()
-        doc_fitz.close()
-        buffer.seek(0)
-        return buffer
\ No newline at end of file
+        return organized_doc
+
+# Steps the fused pipeline can run on a single open document
+PIPELINE_STEPS = ('merge', 'rotate', 'organize', 'watermark', 'secure', 'compress')
+
+
+class PDFPipeline:
+    """Run several operations on one in-memory fitz document and write it once"""
+    
+    @staticmethod
+    def run(pdf_files, steps, watermark_image=None):
+        """Apply steps in order to the first PDF and serialize the result a single time
+        steps: list of dicts such as {'step': 'rotate', 'pages': 'all', 'angle': 90}
+        'merge' appends the remaining pdf_files; 'secure' and 'compress' only change
+        how the final document is written, so they take effect when it is saved.
+        """
+        if not steps:
+            raise ValueError("At least one pipeline step is required")
+        
+        for step in steps:
+            if step.get('step') not in PIPELINE_STEPS:
+                raise ValueError(f"Unknown pipeline step: {step.get('step')}")
+        
+        extra_files = list(pdf_files[1:])
+        if extra_files and not any(step['step'] == 'merge' for step in steps):
+            raise ValueError("Multiple PDF files require a merge step")
+        
+        doc = open_pdf(pdf_files[0])
+        write_options = {}
+        
+        try:
+            for step in steps:
+                name = step['step']
+                
+                if name == 'merge':
+                    for i, pdf_file in enumerate(extra_files):
+                        other = open_pdf(pdf_file)
+                        try:
+                            if other.page_count == 0:
+                                raise ValueError(f"PDF file {i+2} ({pdf_file.name}) has no pages")
+                            doc.insert_pdf(other)
+                        finally:
+                            other.close()
+                    extra_files = []
+                
+                elif name == 'rotate':
+                    rotations = PDFPipeline._step_rotations(step, doc.page_count)
+                    PDFProcessor._apply_rotations(doc, rotations)
+                
+                elif name == 'organize':
+                    organized_doc = PDFOrganizer.organize_document(
+                        doc, step.get('operation', 'auto'), step.get('page_order')
+                    )
+                    if organized_doc is not doc:
+                        doc.close()
+                        doc = organized_doc
+                
+                elif name == 'watermark':
+                    position = step.get('position', 'center')
+                    opacity = float(step.get('opacity', 0.3))
+                    x_offset = int(step.get('x_offset', 0))
+                    y_offset = int(step.get('y_offset', 0))
+                    
+                    if step.get('type', 'text') == 'image':
+                        if watermark_image is None:
+                            raise ValueError("Watermark image file is required")
+                        watermark_image.seek(0)
+                        PDFProcessor._draw_image_watermark(
+                            doc, watermark_image, position, opacity,
+                            float(step.get('scale', 1.0)), x_offset, y_offset
+                        )
+                    else:
+                        PDFProcessor._draw_text_watermark(
+                            doc, step.get('text', 'WATERMARK'), position, opacity,
+                            int(step.get('font_size', 36)), step.get('color', 'gray'),
+                            int(step.get('rotation', 0)), x_offset, y_offset
+                        )
+                
+                elif name == 'secure':
+                    user_password = step.get('user_password') or step.get('password')
+                    if not user_password:
+                        raise ValueError("Password is required for the secure step")
+                    write_options.update(PDFProcessor._encryption_options(user_password, step.get('owner_password')))
+                
+                elif name == 'compress':
+                    # Structural compression, optionally shrinking embedded images first;
+                    # rasterizing scanned pages needs the standalone endpoint.
+                    # Lossless never re-encodes images, whatever the mode: streams are only re-deflated
+                    lossless = step.get('quality') == 'lossless'
+                    if step.get('mode') == 'images' and not lossless:
+                        PDFProcessor._recompress_images(doc, step.get('quality', 'medium'))
+                    PDFProcessor._optimize_fonts(doc)
+                    if lossless:
+                        streams = [xref for xref, _ in PDFProcessor._recompressible_streams(doc)]
+                        PDFProcessor._apply_deflated_streams(doc, PDFProcessor._deflate_streams(doc, streams))
+                    if step.get('quality') == 'low':
+                        PDFPipeline._remove_annotations(doc)
+                    write_options.update(garbage=4, deflate=True, deflate_images=True,
+                                         deflate_fonts=True, clean=True)
+            
+            return write_pdf(doc, **write_options)
+        
+        finally:
+            doc.close()
+    
+    @staticmethod
+    def _step_rotations(step, total_pages):
+        """Build {page_number: angle} from either 'rotations' or 'pages' + 'angle'"""
+        if step.get('rotations'):
+            return {int(page): int(angle) for page, angle in step['rotations'].items()}
+        
+        return PDFProcessor.rotations_for_pages(step.get('pages', 'all'), int(step.get('angle', 90)), total_pages)
+    
+    @staticmethod
+    def _remove_annotations(doc):
+        """Drop every annotation, matching basic_compress_pdf at low quality"""
+        for page in doc:
+            annot = page.first_annot
+            while annot:
+                annot = page.delete_annot(annot)
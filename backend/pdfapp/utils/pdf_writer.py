@@ -0,0 +1,168 @@
+"""
+Output writer for NexaPDF
+Every PDF produced by PDFProcessor / PDFOrganizer / PDFPipeline is
+serialized here, so output size and the CPU spent writing it are traded in
+one place. Profiles (PDF_WRITER_PROFILE setting):
+- fast: write objects as they are, cheapest to produce
+- compact: drop unreferenced objects, pack objects into object streams and
+  deflate uncompressed streams
+- web: linearized ("fast web view") so viewers can show the first page
+  before the rest of the file has arrived
+Options the installed MuPDF cannot honour are dropped rather than failing
+the operation; the output then carries writer_fallback (the dropped option
+names), which responses report in the X-Writer-Fallback header.
+"""
+import os
+import tempfile
+from functools import lru_cache
+from io import BytesIO
+
+import fitz
+from django.conf import settings
+
+from pdfapp.utils.ingest import UploadPath
+
+
+WRITER_PROFILES = {
+    'fast': {},
+    'compact': {'garbage': 3, 'deflate': True, 'use_objstms': 1},
+    'web': {'garbage': 3, 'deflate': True, 'linear': True},
+}
+
+# Options MuPDF may refuse in combination with others (e.g. linearization)
+_OPTIONAL_OPTIONS = ('use_objstms', 'linear')
+
+
+def writer_profile(profile=None):
+    """Save options of a named profile, defaulting to PDF_WRITER_PROFILE"""
+    profile = profile or getattr(settings, 'PDF_WRITER_PROFILE', 'compact')
+    return WRITER_PROFILES.get(profile, WRITER_PROFILES['compact'])
+
+
+def write_options(profile=None, **overrides):
+    """Profile options merged with what an operation asks for
+    Operations only ever add work: the higher garbage level wins and flags are combined.
+    """
+    options = dict(writer_profile(profile))
+    for key, value in overrides.items():
+        if key == 'garbage':
+            options[key] = max(options.get(key, 0), value)
+        else:
+            options[key] = value
+    return options
+
+
+class TemporaryOutput(UploadPath):
+    """Output PDF written to a temporary file, deleted when it is closed
+
+    Picklable like UploadPath, so pool workers hand back the path instead of
+    the contents; FileResponse closes (and so removes) it once it is sent.
+    """
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        if hasattr(self, 'writer_fallback'):
+            state['writer_fallback'] = self.writer_fallback
+        return state
+
+    def close(self):
+        super().close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
+
+
+@lru_cache(maxsize=None)
+def linearization_supported():
+    """Whether the installed MuPDF writes linearized files (newer releases dropped it)"""
+    doc = fitz.open()
+    doc.new_page()
+    try:
+        with fitz.open(stream=doc.tobytes(linear=True), filetype='pdf') as written:
+            return bool(written.is_fast_webaccess)
+    except Exception:
+        return False
+    finally:
+        doc.close()
+
+
+def _without(options, keys):
+    return {key: value for key, value in options.items() if key not in keys}
+
+
+def _with_fallback(write, options):
+    """Call write(options), dropping the options MuPDF cannot honour
+    Returns (result, dropped option names); every drop is logged.
+    """
+    dropped = []
+    if options.get('linear') and not linearization_supported():
+        dropped.append('linear')
+    if options.get('use_objstms') and options.get('encryption', fitz.PDF_ENCRYPT_KEEP) > fitz.PDF_ENCRYPT_NONE:
+        # MuPDF silently writes an unencrypted file when both are asked for
+        dropped.append('use_objstms')
+    options = _without(options, dropped)
+
+    try:
+        result = write(options)
+    except Exception as e:
+        refused = [key for key in _OPTIONAL_OPTIONS if key in options]
+        if not refused:
+            raise
+        print(f"Writer refused {', '.join(refused)} ({e}), saving without them")
+        dropped += refused
+        result = write(_without(options, refused))
+
+    if dropped:
+        print(f"PDF written without {', '.join(dropped)}")
+    return result, dropped
+
+
+def write_pdf(doc, profile=None, **overrides):
+    """Serialize a fitz document to a BytesIO with the writer profile"""
+    output, dropped = _with_fallback(lambda options: BytesIO(doc.tobytes(**options)), write_options(profile, **overrides))
+    if dropped:
+        output.writer_fallback = dropped  # Travels with the buffer out of pool workers
+    return output
+
+
+def save_pdf(doc, profile=None, **overrides):
+    """Save a fitz document straight to a temporary file with the writer profile
+    The serialized file is written to disk as it is produced rather than built up in memory.
+    Returns a TemporaryOutput.
+    """
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    os.close(fd)
+    try:
+        _, dropped = _with_fallback(lambda options: doc.save(path, **options), write_options(profile, **overrides))
+    except Exception:
+        os.unlink(path)
+        raise
+
+    output = TemporaryOutput(path, name='output.pdf')
+    if dropped:
+        output.writer_fallback = dropped
+    return output
+
+
+def write_pypdf(writer, profile=None, encrypted=False):
+    """Serialize a pypdf PdfWriter; profiles other than 'fast' re-save the result with MuPDF
+    encrypted: the writer was encrypted by pypdf, so its output is returned as written
+    """
+    output = BytesIO()
+    writer.write(output)
+    output.seek(0)
+    if encrypted or not writer_profile(profile):
+        return output
+
+    try:
+        doc = fitz.open(stream=output.getvalue(), filetype='pdf')
+    except Exception as e:
+        print(f"Could not reopen pypdf output ({e}), keeping it as written")
+        output.seek(0)
+        return output
+
+    try:
+        return write_pdf(doc, profile)
+    finally:
+        doc.close()
@@ -0,0 +1,54 @@
+"""
+Pixmap adapters for NexaPDF
+Move rendered pages from PyMuPDF to Pillow / NumPy / JPEG without a PNG
+encode-decode round trip. The PIL and NumPy views share memory with the
+pixmap, so keep the pixmap referenced for as long as the view is used.
+"""
+from io import BytesIO
+
+from PIL import Image
+
+
+def _pil_mode(pix):
+    """Pillow mode matching the pixmap's colorspace and alpha channel"""
+    if pix.n == 1:
+        return 'L'
+    if pix.n == 2 and pix.alpha:
+        return 'LA'
+    if pix.n == 3:
+        return 'RGB'
+    if pix.n == 4:
+        return 'RGBA' if pix.alpha else 'CMYK'
+    raise ValueError(f"Unsupported pixmap layout: {pix.n} channels (alpha={pix.alpha})")
+
+
+def pixmap_to_pil(pix):
+    """Wrap Pixmap.samples as a PIL image without re-encoding"""
+    mode = _pil_mode(pix)
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, 'raw', mode, pix.stride, 1)
+
+
+def pixmap_to_numpy(pix):
+    """Expose Pixmap.samples as an (height, width[, channels]) uint8 array view"""
+    import numpy as np
+
+    array = np.ndarray(
+        (pix.height, pix.width, pix.n), dtype=np.uint8,
+        buffer=pix.samples_mv, strides=(pix.stride, pix.n, 1)
+    )
+    # Grayscale pages come back 2-D, which is what OpenCV / EasyOCR expect
+    return array[:, :, 0] if pix.n == 1 else array
+
+
+def pixmap_to_jpeg(pix, quality=95):
+    """Encode a pixmap straight to JPEG bytes with MuPDF's encoder"""
+    if pix.alpha:
+        # JPEG has no alpha channel; flatten onto white like the PIL paths do
+        image = pixmap_to_pil(pix)
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image.convert('RGBA'), mask=image.getchannel('A'))
+        buffer = BytesIO()
+        background.save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
+
+    return pix.tobytes('jpeg', jpg_quality=quality)
@@ -0,0 +1,141 @@
+"""
+Document profiler for NexaPDF
+A quick pre-pass that looks at what a PDF is made of (how much of its pages
+images cover, how many of its bytes are image and font streams) so
+compression can pick the cheapest strategy that will actually help:
+- 'basic': lossless stream optimization for text and vector documents,
+- 'images': downsample/re-encode embedded images, keep text as text,
+- 'rasterize': rebuild every page as a JPEG, for scanned documents.
+Only object dictionaries are read; no stream is decompressed and only a
+handful of pages are sampled, so profiling takes milliseconds.
+"""
+import json
+import re
+
+from django.conf import settings
+
+from pdfapp.utils.ingest import open_pdf
+
+
+# Sampled pages this image-covered and this text-free are treated as scans
+SCANNED_IMAGE_AREA = 0.85
+SCANNED_TEXT_CHARS = 20
+
+# Documents whose bytes are at least this much image data get image recompression
+IMAGE_HEAVY_BYTES = 0.5
+
+FONT_FILE_KEYS = ('FontFile', 'FontFile2', 'FontFile3')
+
+_REFERENCE = re.compile(r'^(\d+) 0 R$')
+
+
+def sample_pages(page_count, sample_size):
+    """Evenly spaced page numbers, always including the first page"""
+    if page_count <= sample_size:
+        return list(range(page_count))
+    step = page_count / sample_size
+    return sorted({int(i * step) for i in range(sample_size)})
+
+
+def _reference(value):
+    """Xref number of an indirect reference such as '12 0 R', or None"""
+    match = _REFERENCE.match(value or '')
+    return int(match.group(1)) if match else None
+
+
+def stream_length(doc, xref):
+    """Stored (compressed) length of a stream object from its dictionary"""
+    kind, value = doc.xref_get_key(xref, 'Length')
+    if kind == 'xref':
+        # Length kept in a separate object: '15 0 R'
+        value = doc.xref_object(_reference(value)).strip()
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+def font_files(doc):
+    """Yield (descriptor_xref, key, font_file_xref, font_name) for every embedded font program"""
+    for xref in range(1, doc.xref_length()):
+        if doc.xref_get_key(xref, 'Type')[1] != '/FontDescriptor':
+            continue
+        font_name = doc.xref_get_key(xref, 'FontName')[1].lstrip('/')
+        for key in FONT_FILE_KEYS:
+            font_xref = _reference(doc.xref_get_key(xref, key)[1])
+            if font_xref:
+                yield xref, key, font_xref, font_name
+
+
+def profile_document(doc, file_size, sample_size=None):
+    """Measure an open fitz document; returns a dict including the chosen 'strategy'"""
+    if sample_size is None:
+        sample_size = max(1, getattr(settings, 'PDF_PROFILE_SAMPLE_PAGES', 4))
+
+    pages = sample_pages(doc.page_count, sample_size)
+    image_area = 0.0
+    text_chars = 0
+
+    for page_num in pages:
+        page = doc[page_num]
+        page_area = abs(page.rect) or 1
+        covered = 0.0
+        for info in page.get_image_info():
+            covered += abs(page.rect & info['bbox'])
+        image_area += min(1.0, covered / page_area)
+        text_chars += len(page.get_text().strip())
+
+    streams = unfiltered_streams = 0
+    image_bytes = 0
+    font_bytes = sum(stream_length(doc, xref) for xref in {font[2] for font in font_files(doc)})
+
+    for xref in range(1, doc.xref_length()):
+        if not doc.xref_is_stream(xref):
+            continue
+
+        streams += 1
+        if doc.xref_get_key(xref, 'Filter')[0] == 'null':
+            unfiltered_streams += 1
+        if doc.xref_get_key(xref, 'Subtype')[1] == '/Image':
+            image_bytes += stream_length(doc, xref)
+
+    profile = {
+        'pages': doc.page_count,
+        'sampled_pages': len(pages),
+        'image_area': round(image_area / len(pages), 3) if pages else 0.0,
+        'text_chars_per_page': round(text_chars / len(pages)) if pages else 0,
+        'image_bytes': round(image_bytes / file_size, 3) if file_size else 0.0,
+        'font_bytes': font_bytes,
+        'streams': streams,
+        'unfiltered_streams': unfiltered_streams,
+    }
+    profile['strategy'] = choose_strategy(profile)
+    return profile
+
+
+def choose_strategy(profile):
+    """Cheapest compression strategy that is expected to pay off for a profile"""
+    if profile['image_area'] >= SCANNED_IMAGE_AREA and profile['text_chars_per_page'] < SCANNED_TEXT_CHARS:
+        return 'rasterize'
+    if profile['image_bytes'] >= IMAGE_HEAVY_BYTES:
+        return 'images'
+    return 'basic'
+
+
+def profile_pdf(pdf_file):
+    """Profile an upload without changing its read position - callers run it in a pool worker"""
+    position = pdf_file.tell()
+    pdf_file.seek(0, 2)
+    file_size = pdf_file.tell()
+    pdf_file.seek(position)
+
+    doc = open_pdf(pdf_file)
+    try:
+        return profile_document(doc, file_size)
+    finally:
+        doc.close()
+
+
+def profile_header(profile):
+    """Compact single-line form of a profile for the X-Compression-Profile header"""
+    return json.dumps(profile, separators=(',', ':'), sort_keys=True)
@@ -0,0 +1,214 @@
+"""
+Content-addressed result cache for NexaPDF
+Outputs are stored under MEDIA_ROOT/temp/cache keyed by SHA-256 of the input
+files, the operation and its normalized parameters. Entries expire after
+TEMP_FILE_CLEANUP_MINUTES without a hit, and the least recently used entries
+are evicted once the store grows past RESULT_CACHE_MAX_BYTES.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+
+
+# Parameters that only change how the request is delivered, not its result
+IGNORED_PARAMS = ('async',)
+
+# Response headers replayed on a cache hit
+CACHED_HEADERS = ('Content-Disposition',)
+
+
+def get_cache_dir():
+    return Path(settings.MEDIA_ROOT) / 'temp' / 'cache'
+
+
+def hash_file(uploaded_file):
+    """SHA-256 of an uploaded file's contents"""
+    # Computed by the upload handler while the file was streaming in
+    if getattr(uploaded_file, 'sha256', None):
+        return uploaded_file.sha256
+
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def make_cache_key(operation, files, params):
+    """Build a key from the operation, (field, file hash) pairs and normalized params
+    files: iterable of (field_name, uploaded_file)
+    params: dict of name -> list of values
+    """
+    normalized = {
+        'operation': operation,
+        'files': [[field, hash_file(uploaded_file)] for field, uploaded_file in files],
+        'params': sorted(
+            (key, sorted(str(value) for value in values))
+            for key, values in params.items()
+            if key not in IGNORED_PARAMS
+        ),
+    }
+    return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def request_cache_key(request, operation):
+    """Cache key for a DRF request: uploaded files plus form and query parameters"""
+    files = [
+        (field, uploaded_file)
+        for field in sorted(request.FILES.keys())
+        for uploaded_file in request.FILES.getlist(field)
+    ]
+
+    params = {}
+    for source in (request.query_params, request.data):
+        if not hasattr(source, 'lists'):
+            continue
+        for key, values in source.lists():
+            values = [value for value in values if not isinstance(value, UploadedFile)]
+            if values:
+                params.setdefault(key, []).extend(values)
+
+    # The same request written with another writer profile is a different output
+    params['_writer_profile'] = [getattr(settings, 'PDF_WRITER_PROFILE', 'compact')]
+    return make_cache_key(operation, files, params)
+
+
+class ResultCache:
+    """Size-bounded on-disk store of operation outputs"""
+
+    def __init__(self, cache_dir=None, max_bytes=None, ttl_seconds=None):
+        self._cache_dir = cache_dir
+        self._max_bytes = max_bytes
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    @property
+    def cache_dir(self):
+        return Path(self._cache_dir) if self._cache_dir else get_cache_dir()
+
+    @property
+    def max_bytes(self):
+        if self._max_bytes is not None:
+            return self._max_bytes
+        return getattr(settings, 'RESULT_CACHE_MAX_BYTES', 0)
+
+    @property
+    def ttl_seconds(self):
+        if self._ttl_seconds is not None:
+            return self._ttl_seconds
+        return getattr(settings, 'TEMP_FILE_CLEANUP_MINUTES', 30) * 60
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def _paths(self, key):
+        entry_dir = self.cache_dir / key[:2]
+        return entry_dir / f'{key}.bin', entry_dir / f'{key}.json'
+
+    def get(self, key):
+        """Return (data_path, metadata) for a live entry, or None"""
+        data_path, meta_path = self._paths(key)
+        try:
+            if time.time() - data_path.stat().st_mtime > self.ttl_seconds:
+                self._remove(key)
+                return None
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                metadata = json.load(f)
+            # mtime doubles as the last-access time for TTL and LRU eviction
+            now = time.time()
+            os.utime(data_path, (now, now))
+            os.utime(meta_path, (now, now))
+            return data_path, metadata
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, data, metadata):
+        """Store an output (bytes or a seekable file-like object, which is left rewound)
+        Entries larger than the whole cache are skipped.
+        """
+        if hasattr(data, 'read'):
+            data.seek(0, os.SEEK_END)
+            size = data.tell()
+            data.seek(0)
+        else:
+            size = len(data)
+        if size > self.max_bytes:
+            return False
+
+        data_path, meta_path = self._paths(key)
+        data_path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # Write then rename so concurrent readers never see a partial entry
+            for path, payload in ((data_path, data), (meta_path, json.dumps(metadata).encode('utf-8'))):
+                fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    if hasattr(payload, 'read'):
+                        shutil.copyfileobj(payload, f)
+                        payload.seek(0)
+                    else:
+                        f.write(payload)
+                os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Failed to store cached result {key}: {e}")
+            self._remove(key)
+            return False
+
+        self.evict()
+        return True
+
+    def _remove(self, key):
+        for path in self._paths(key):
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _entries(self):
+        """(mtime, size, key) for every stored entry"""
+        entries = []
+        if not self.cache_dir.exists():
+            return entries
+        for data_path in self.cache_dir.glob('*/*.bin'):
+            try:
+                stat = data_path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, data_path.stem))
+        return entries
+
+    def evict(self):
+        """Drop expired entries, then least recently used ones until under the size cap
+        Returns the number of entries removed
+        """
+        with self._lock:
+            cutoff = time.time() - self.ttl_seconds
+            entries = sorted(self._entries())
+            total_size = sum(size for _, size, _ in entries)
+            removed = 0
+
+            for mtime, size, key in entries:
+                if mtime >= cutoff and total_size <= self.max_bytes:
+                    break
+                self._remove(key)
+                total_size -= size
+                removed += 1
+
+            return removed
+
+    def clear(self):
+        with self._lock:
+            for _, _, key in self._entries():
+                self._remove(key)
+
+
+# Global result cache instance (shared by every worker through the filesystem)
+result_cache = ResultCache()
@@ -0,0 +1,261 @@
+"""
+Compressed-size estimation for NexaPDF
+Rasterizing compression (advanced_compress_pdf) produces one JPEG per page,
+so its output size is close to the sum of those JPEGs. Encoding a few
+evenly spread pages at several JPEG qualities and render scales and
+extrapolating to the whole document predicts the output size of every
+setting without compressing the file; only the chosen setting is then run
+over every page. The whole-document strategies ('images', 'basic') are
+estimated from the ratio they achieve on single-page copies of the samples.
+"""
+import re
+import time
+from io import BytesIO
+
+import fitz
+from django.conf import settings
+
+from pdfapp.utils.executor import map_pdf_tasks, parallel_worker_count, run_pdf_task
+from pdfapp.utils.ingest import local_pdf_path
+from pdfapp.utils.pdf_helpers import PDFProcessor, BilevelImage, COMPRESSION_PRESETS
+from pdfapp.utils.pixmap import pixmap_to_jpeg
+from pdfapp.utils.profiler import profile_pdf, sample_pages
+from pdfapp.utils.streaming import file_size
+
+
+# Search grid for target-size compression (render scale x JPEG quality)
+TARGET_SCALES = (1.0, 0.8, 0.6, 0.45, 0.3)
+TARGET_QUALITIES = (85, 70, 55, 40, 30, 20, 12)
+
+# Pages sampled for an estimate, and the headroom kept below a target size
+ESTIMATE_SAMPLE_PAGES = 4
+TARGET_SAFETY_MARGIN = 0.92
+
+# Quality presets from the most to the least detail kept
+QUALITY_ORDER = ('high', 'medium', 'low')
+
+# Page object, content stream and image dictionary of a rasterized page, plus
+# the document's fixed overhead (catalog, page tree, xref table)
+PAGE_OVERHEAD_BYTES = 400
+DOCUMENT_OVERHEAD_BYTES = 1500
+
+_SIZE = re.compile(r'^\s*(?:under|below|max|<=?)?\s*([\d.]+)\s*(b|kb|k|mb|m|gb|g)?\s*$', re.IGNORECASE)
+_UNITS = {'b': 1, 'k': 1024, 'kb': 1024, 'm': 1024 ** 2, 'mb': 1024 ** 2, 'g': 1024 ** 3, 'gb': 1024 ** 3}
+
+
+def parse_size(value):
+    """Parse '2MB', 'under 2 MB', '500 kb' or a plain byte count into bytes"""
+    match = _SIZE.match(str(value))
+    if not match:
+        raise ValueError(f"Invalid target size: {value}")
+    size = int(float(match.group(1)) * _UNITS[(match.group(2) or 'b').lower()])
+    if size <= 0:
+        raise ValueError(f"Invalid target size: {value}")
+    return size
+
+
+def _measure_page(pdf_path, page_num, scales, qualities):
+    """JPEG size of one page at every (scale, quality) pair - runs in a pool worker
+    Each scale is rendered once and encoded at every quality.
+    """
+    sizes = {}
+    with fitz.open(pdf_path, filetype='pdf') as doc:
+        page = doc[page_num]
+        for scale in scales:
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            for quality in qualities:
+                sizes[(scale, quality)] = len(pixmap_to_jpeg(pix, quality))
+    return sizes
+
+
+def estimate_rasterized_sizes(pdf_file, scales, qualities, sample_size=ESTIMATE_SAMPLE_PAGES):
+    """Predicted advanced_compress_pdf output size for each (scale, quality) pair"""
+    page_count = run_pdf_task(PDFProcessor.page_count, pdf_file)
+    if page_count == 0:
+        raise ValueError("PDF has no pages")
+
+    pages = sample_pages(page_count, sample_size)
+    totals = dict.fromkeys(((scale, quality) for scale in scales for quality in qualities), 0)
+
+    with local_pdf_path(pdf_file) as pdf_path:
+        page_args = [(pdf_path, page_num, scales, qualities) for page_num in pages]
+        for sizes in map_pdf_tasks(_measure_page, page_args):
+            for key, size in sizes.items():
+                totals[key] += size
+
+    return {
+        key: round(total / len(pages) * page_count) + PAGE_OVERHEAD_BYTES * page_count + DOCUMENT_OVERHEAD_BYTES
+        for key, total in totals.items()
+    }
+
+
+def choose_target_preset(pdf_file, target_bytes):
+    """Pick the render scale and JPEG quality that keep the most detail within target_bytes
+    Returns (preset, estimated_size, fits); when nothing fits the smallest setting is used.
+    """
+    estimates = estimate_rasterized_sizes(pdf_file, TARGET_SCALES, TARGET_QUALITIES)
+    budget = target_bytes * TARGET_SAFETY_MARGIN
+
+    fitting = [(size, key) for key, size in estimates.items() if size <= budget]
+    fits = bool(fitting)
+    # The largest output under the budget keeps the most image data
+    estimated_size, (scale, quality) = max(fitting) if fits else min((size, key) for key, size in estimates.items())
+
+    preset = {'image_quality': quality, 'dpi_reduction': scale, 'downscale': 1.0, 'progressive': False}
+    return preset, estimated_size, fits
+
+
+def compress_to_target(pdf_file, target_bytes):
+    """Compress once with the settings predicted to land under target_bytes
+    The strategy auto mode would pick is tried first, at the best quality it is
+    predicted to fit at; rasterizing is the fallback when it cannot get there.
+    Returns (output, report) where report describes the choice for response headers
+    """
+    pdf_file.seek(0, 2)
+    original_size = pdf_file.tell()
+    pdf_file.seek(0)
+
+    if original_size <= target_bytes:
+        # Already small enough: lossless optimization only, kept only if it helps
+        output = run_pdf_task(PDFProcessor.basic_compress_pdf, pdf_file, 'high')
+        output_size = file_size(output)
+        if output_size > original_size or output_size > target_bytes:
+            print(f"Basic optimization grew the file to {output_size} bytes, returning the original")
+            output.close()
+            pdf_file.seek(0)
+            output = BytesIO(pdf_file.read())
+            pdf_file.seek(0)
+            return output, {'strategy': 'original', 'estimated_size': original_size, 'target_met': True}
+        return output, {'strategy': 'basic', 'estimated_size': output_size, 'target_met': True}
+
+    profile = run_pdf_task(profile_pdf, pdf_file)
+    if profile['strategy'] != 'rasterize':
+        estimates = estimate_presets(pdf_file, profile=profile)['estimates']
+        budget = target_bytes * TARGET_SAFETY_MARGIN
+        fitting = [quality for quality in QUALITY_ORDER if estimates[quality]['estimated_size'] <= budget]
+        if fitting:
+            quality = fitting[0]
+            output = PDFProcessor.compress_pdf(pdf_file, quality, profile['strategy'], profile)
+            if file_size(output) <= target_bytes:
+                return output, {
+                    'strategy': profile['strategy'],
+                    'quality': quality,
+                    'estimated_size': estimates[quality]['estimated_size'],
+                    'target_met': True,
+                }
+            print(f"{profile['strategy']} at {quality} missed the target, rasterizing instead")
+            output.close()
+            pdf_file.seek(0)
+
+    preset, estimated_size, fits = choose_target_preset(pdf_file, target_bytes)
+    output = PDFProcessor.advanced_compress_pdf(pdf_file, 'target', preset=preset)
+    if output is None:
+        raise Exception("Compression failed")
+
+    return output, {
+        'strategy': 'rasterize',
+        'image_quality': preset['image_quality'],
+        'dpi_reduction': preset['dpi_reduction'],
+        'estimated_size': estimated_size,
+        'target_met': output.getbuffer().nbytes <= target_bytes,
+        'estimate_fits': fits,
+    }
+
+
+def _timed_sample(pdf_path, page_num, strategy, quality):
+    """Compress one sampled page the way the strategy would - runs in a pool worker
+    Returns (input_size, output_size, seconds); rasterize measures the encoded page
+    image, the whole-document strategies a single-page copy of the document.
+    """
+    started = time.perf_counter()
+    if strategy == 'rasterize':
+        _, image_data = PDFProcessor._compress_page(pdf_path, page_num, COMPRESSION_PRESETS[quality])
+        if isinstance(image_data, BilevelImage):
+            image_data = image_data.data
+        return 0, len(image_data), time.perf_counter() - started
+
+    with fitz.open(pdf_path, filetype='pdf') as doc:
+        doc.select([page_num])
+        sample = BytesIO(doc.tobytes(garbage=1))  # Only what the page references
+    sample.name = 'sample.pdf'
+    input_size = sample.getbuffer().nbytes
+
+    started = time.perf_counter()
+    if strategy == 'images':
+        output = PDFProcessor.recompress_images_pdf(sample, quality)
+    else:
+        output = PDFProcessor.basic_compress_pdf(sample, quality)
+    output_size = file_size(output)
+    output.close()
+    return input_size, output_size, time.perf_counter() - started
+
+
+def estimate_presets(pdf_file, sample_size=ESTIMATE_SAMPLE_PAGES, time_budget=None, profile=None):
+    """Predicted output size and processing time per quality preset of the
+    strategy compress_pdf's auto mode picks for this file (profile: a profile_pdf result)
+    Sampled pages are compressed exactly as the full pass would; waiting stops
+    once time_budget seconds have passed (the first page is always sampled).
+    """
+    if time_budget is None:
+        time_budget = getattr(settings, 'PDF_ESTIMATE_TIME_BUDGET', 3)
+    started = time.monotonic()
+
+    pdf_file.seek(0, 2)
+    original_size = pdf_file.tell()
+    pdf_file.seek(0)
+
+    if profile is None:
+        profile = run_pdf_task(profile_pdf, pdf_file)
+    strategy = profile['strategy']
+    page_count = profile['pages']
+    if page_count == 0:
+        raise ValueError("PDF has no pages")
+
+    qualities = list(COMPRESSION_PRESETS)
+    pages = sample_pages(page_count, sample_size)
+    input_sizes = dict.fromkeys(qualities, 0)
+    sizes = dict.fromkeys(qualities, 0)
+    seconds = dict.fromkeys(qualities, 0.0)
+    sampled = 0
+
+    with local_pdf_path(pdf_file) as pdf_path:
+        # Page-major order, so every preset is measured on the same pages;
+        # the first page is waited for in full, the rest only until the deadline
+        for page_group, deadline in ((pages[:1], None), (pages[1:], started + time_budget)):
+            page_args = [(pdf_path, page_num, strategy, quality) for page_num in page_group for quality in qualities]
+            page_results = []
+            for result in map_pdf_tasks(_timed_sample, page_args, parallel_worker_count(), deadline):
+                page_results.append(result)
+                if len(page_results) < len(qualities):
+                    continue
+                # Only pages measured at every preset count
+                for quality, (input_size, size, elapsed) in zip(qualities, page_results):
+                    input_sizes[quality] += input_size
+                    sizes[quality] += size
+                    seconds[quality] += elapsed
+                page_results = []
+                sampled += 1
+
+    # Rasterized pages are compressed in parallel during the full pass
+    workers = max(1, min(parallel_worker_count(), page_count)) if strategy == 'rasterize' else 1
+    estimates = {}
+    for quality in qualities:
+        if strategy == 'rasterize':
+            size = round(sizes[quality] / sampled * page_count) + PAGE_OVERHEAD_BYTES * page_count + DOCUMENT_OVERHEAD_BYTES
+        else:
+            # Shared resources are counted on every sample page, on both sides of the ratio
+            size = round(original_size * sizes[quality] / input_sizes[quality]) if input_sizes[quality] else original_size
+        estimates[quality] = {
+            'estimated_size': size,
+            'estimated_ratio': round(size / original_size, 3) if original_size else None,
+            'estimated_seconds': round(seconds[quality] / sampled * page_count / workers, 2),
+        }
+
+    return {
+        'original_size': original_size,
+        'pages': page_count,
+        'strategy': strategy,
+        'sampled_pages': sampled,
+        'complete_sample': sampled == len(pages),
+        'estimates': estimates,
+    }
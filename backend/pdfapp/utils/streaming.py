@@ -0,0 +1,117 @@
+"""
+Streaming response helpers for NexaPDF
+Large outputs are sent straight from the file-like object the operation
+produced. Multi-file results are zipped entry by entry into a spooled
+temporary file (memory up to ZIP_SPOOL_MAX_MEMORY, disk beyond), so an
+archive is never held in memory as a whole, yet it is complete before the
+response starts: a failure on the last page is still a 500 rather than a
+truncated download, and the archive can go into the result cache.
+"""
+import io
+import os
+import tempfile
+import zipfile
+
+from django.http import FileResponse
+
+
+ZIP_SPOOL_MAX_MEMORY = 8 * 1024 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer that hands written bytes back in chunks
+
+    Because it cannot seek, zipfile writes each entry with a trailing data
+    descriptor instead of going back to patch its header.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self.pending = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.pending += len(data)
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.pending = 0
+        return data
+
+
+def stream_zip(entries, compression=zipfile.ZIP_DEFLATED, chunk_size=1024 * 1024):
+    """Yield a zip archive piece by piece
+    entries: iterable of (name, data) where data is bytes, a file path or a
+    file-like object. Entries are only pulled from the iterable when the
+    previous one has been sent.
+    """
+    sink = _ChunkSink()
+    try:
+        with zipfile.ZipFile(sink, 'w', compression) as zip_file:
+            for name, data in entries:
+                if isinstance(data, (bytes, bytearray)):
+                    zip_file.writestr(name, data)
+                elif isinstance(data, (str, os.PathLike)):
+                    zip_file.write(data, name)
+                else:
+                    data.seek(0)
+                    with zip_file.open(name, 'w') as entry:
+                        while True:
+                            chunk = data.read(chunk_size)
+                            if not chunk:
+                                break
+                            entry.write(chunk)
+                            if sink.pending >= chunk_size:
+                                yield sink.drain()
+
+                chunk = sink.drain()
+                if chunk:
+                    yield chunk
+
+        # Central directory
+        yield sink.drain()
+    finally:
+        # Let a generator of entries release its temp files if the client disconnects
+        if hasattr(entries, 'close'):
+            entries.close()
+
+
+def spool_zip(entries, compression=zipfile.ZIP_DEFLATED):
+    """Zip entries into a spooled temporary file and return it rewound
+    Errors from producing an entry are raised here, before any response exists.
+    """
+    archive = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX_MEMORY)
+    try:
+        for chunk in stream_zip(entries, compression):
+            archive.write(chunk)
+    except Exception:
+        archive.close()
+        raise
+    archive.seek(0)
+    return archive
+
+
+def file_size(output):
+    """Size in bytes of a seekable file-like object, leaving it rewound"""
+    output.seek(0, io.SEEK_END)
+    size = output.tell()
+    output.seek(0)
+    return size
+
+
+def file_streaming_response(output, filename, content_type='application/pdf'):
+    """FileResponse that sends output in chunks without copying it first"""
+    size = file_size(output)
+    response = FileResponse(output, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['X-File-Size'] = str(size)  # Add actual file size header
+    if getattr(output, 'writer_fallback', None):
+        # Writer profile options the installed MuPDF could not apply (e.g. linear)
+        response['X-Writer-Fallback'] = ','.join(output.writer_fallback)
+    return response
@@ -0,0 +1,128 @@
+"""
+Upload handler for NexaPDF
+Replaces Django's memory/temporary-file handler pair with a single handler
+that, while the upload is still streaming in:
+- computes its SHA-256 (exposed as `uploaded_file.sha256`),
+- checks its leading bytes against the file extension and stops the upload
+  when the content does not match (e.g. a renamed executable sent as
+  `.pdf`): the rest of the body is not read, so a bad file costs its first
+  chunk rather than its full size,
+- keeps it in memory up to FILE_UPLOAD_MAX_MEMORY_SIZE and spills to a
+  temporary file on disk beyond that.
+Rejected files are listed in `request.rejected_uploads`. The request is
+refused anyway, so stopping also drops any files that followed; behind some
+servers a client still sending a large body sees a connection reset instead
+of the 400 response.
+"""
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import InMemoryUploadedFile, TemporaryUploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+
+
+# PDF allows up to 1 KB of junk before the header; other formats start at byte 0
+SNIFF_BYTES = 1024
+
+OFFICE_ZIP = (b'PK\x03\x04',)
+OLE_COMPOUND = (b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1',)
+
+# Extension -> accepted leading byte signatures
+MAGIC_BYTES = {
+    '.png': (b'\x89PNG\r\n\x1a\n',),
+    '.jpg': (b'\xff\xd8\xff',),
+    '.jpeg': (b'\xff\xd8\xff',),
+    '.gif': (b'GIF87a', b'GIF89a'),
+    '.bmp': (b'BM',),
+    '.tif': (b'II*\x00', b'MM\x00*'),
+    '.tiff': (b'II*\x00', b'MM\x00*'),
+    '.docx': OFFICE_ZIP,
+    '.pptx': OFFICE_ZIP,
+    '.xlsx': OFFICE_ZIP,
+    '.xls': OLE_COMPOUND,
+}
+
+
+def content_matches(file_name, header):
+    """Check the first bytes of a file against what its extension promises
+    Extensions without a known signature are always accepted.
+    """
+    extension = os.path.splitext(file_name or '')[1].lower()
+    if extension == '.pdf':
+        return b'%PDF-' in header[:SNIFF_BYTES]
+    if extension == '.webp':
+        return header[:4] == b'RIFF' and header[8:12] == b'WEBP'
+    signatures = MAGIC_BYTES.get(extension)
+    if signatures is None:
+        return True
+    return header.startswith(signatures)
+
+
+class InspectingUploadHandler(FileUploadHandler):
+    """Hash and sniff uploads as they stream in; small files stay in memory, larger ones go to disk"""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        if not hasattr(self.request, 'rejected_uploads'):
+            self.request.rejected_uploads = []
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+        self.header = b''
+        self.checked = False
+        # MultiPartParser closes `file` when an upload is skipped
+        self.file = BytesIO()
+        self.on_disk = False
+
+    def reject(self):
+        self.request.rejected_uploads.append(self.file_name)
+        # SkipFile would still read (and discard) the rest of the body
+        raise StopUpload(connection_reset=True)
+
+    def receive_data_chunk(self, raw_data, start):
+        if not self.checked:
+            self.header += raw_data[:SNIFF_BYTES - len(self.header)]
+            if len(self.header) >= SNIFF_BYTES or content_matches(self.file_name, self.header):
+                self.checked = True
+                if not content_matches(self.file_name, self.header):
+                    self.reject()
+
+        self.digest.update(raw_data)
+
+        if not self.on_disk and self.file.tell() + len(raw_data) > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            # Too big to keep in memory: move what we have to a temporary file
+            disk_file = TemporaryUploadedFile(
+                self.file_name, self.content_type, 0, self.charset, self.content_type_extra
+            )
+            disk_file.write(self.file.getvalue())
+            self.file = disk_file
+            self.on_disk = True
+
+        self.file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        # Files shorter than SNIFF_BYTES are checked once they are complete
+        if not self.checked and not content_matches(self.file_name, self.header):
+            self.file.close()
+            self.request.rejected_uploads.append(self.file_name)
+            return None
+
+        self.file.seek(0)
+        if self.on_disk:
+            uploaded_file = self.file
+            uploaded_file.size = file_size
+        else:
+            uploaded_file = InMemoryUploadedFile(
+                file=self.file,
+                field_name=self.field_name,
+                name=self.file_name,
+                content_type=self.content_type,
+                size=file_size,
+                charset=self.charset,
+                content_type_extra=self.content_type_extra,
+            )
+        uploaded_file.sha256 = self.digest.hexdigest()
+        return uploaded_file
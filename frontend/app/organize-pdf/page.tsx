@@ -103,7 +103,8 @@ export default function OrganizePDFPage() {
       const formData = new FormData()
       formData.append('pdf', file)
       
-      const response = await axios.post(`${API_URL}/pdf/preview/`, formData, {
+      // The session only returns the page layout; each thumbnail is fetched as its own image
+      const response = await axios.post(`${API_URL}/pdf/preview/sessions/`, formData, {
         headers: {
           'Content-Type': 'multipart/form-data',
         },
@@ -112,10 +113,10 @@ export default function OrganizePDFPage() {
       })
       
       if (response.data.pages) {
-        const pages: PDFPage[] = response.data.pages.map((pageUrl: string, index: number) => ({
+        const pages: PDFPage[] = response.data.pages.map((pageInfo: { page: number }, index: number) => ({
           id: `page-${index}`,
-          pageNumber: index + 1,
-          imageUrl: pageUrl,
+          pageNumber: pageInfo.page,
+          imageUrl: `${response.data.thumbnail_url}${pageInfo.page}/?size=200`,
           selected: true
         }))
         
@@ -113,7 +113,7 @@ export function PDFPreviewGrid({ files, onFilesReorder, onFileRemove, className
               const formData = new FormData()
               formData.append('pdf', item.file)
               
-              const response = await axios.post(`${API_URL}/pdf/preview/`, formData, {
+              const response = await axios.post(`${API_URL}/pdf/preview/sessions/`, formData, {
                 headers: {
                   'Content-Type': 'multipart/form-data',
                 },
@@ -122,14 +122,17 @@ export function PDFPreviewGrid({ files, onFilesReorder, onFileRemove, className
               })
               
               if (response.data.pages && response.data.pages.length > 0) {
-                // Use the first page as thumbnail, store all pages for later use
+                // Page thumbnails are separate image requests, so only the first one is loaded here
+                const previewPages: string[] = response.data.pages.map(
+                  (pageInfo: { page: number }) => `${response.data.thumbnail_url}${pageInfo.page}/?size=150`
+                )
                 setPreviewItems(prevItems => 
                   prevItems.map(prevItem => 
                     prevItem.id === item.id 
                       ? { 
                           ...prevItem, 
-                          thumbnail: response.data.pages[0], // First page as thumbnail
-                          previewPages: response.data.pages,
+                          thumbnail: previewPages[0], // First page as thumbnail
+                          previewPages,
                           showFirstPageOnly: true
                         }
                       : prevItem